@@ -0,0 +1,35 @@
+import pytest
+
+from conftest import make_config
+from observability_testing_tool.config import executor
+from observability_testing_tool.config.common import set_batch_size, set_queue_size
+from observability_testing_tool.config.parser import prepare_config
+
+
+def _prepared(jobs: int, entries: int):
+    def setup():
+        config = make_config(jobs=jobs, entries=entries)
+        prepare_config(config)
+        executor._config = config
+        return (), {}
+    return setup
+
+
+# 2 jobs x 10 entries x 60 points = 1200 points per round
+
+@pytest.mark.parametrize("batch", [0, 1000])
+def bench_run_logging_jobs(benchmark, batch):
+    set_batch_size(batch)
+    benchmark.pedantic(executor.run_logging_jobs, setup=_prepared(2, 10), rounds=5)
+
+
+@pytest.mark.parametrize("batch", [0, 200])
+def bench_run_monitoring_jobs(benchmark, batch):
+    set_batch_size(batch)
+    benchmark.pedantic(executor.run_monitoring_jobs, setup=_prepared(2, 10), rounds=5)
+
+
+@pytest.mark.parametrize("queue_size", [0, 1000])
+def bench_run_logging_jobs_pipeline(benchmark, queue_size):
+    set_queue_size(queue_size)
+    benchmark.pedantic(executor.run_logging_jobs, setup=_prepared(2, 10), rounds=5)
@@ -0,0 +1,38 @@
+import copy
+
+import pytest
+import yaml
+
+from conftest import make_config
+from observability_testing_tool.config.parser import parse_timedelta_interval, parse_config, prepare_config, FrequencyTemplate
+
+
+@pytest.mark.parametrize("interval", ["30s", "1h30m", "2d4h15m30s", "5s~15s", "1m~1h"])
+def bench_parse_timedelta_interval(benchmark, interval):
+    benchmark(parse_timedelta_interval, interval)
+
+
+@pytest.mark.parametrize("template", ["{freq}s", "{low}s~{high}s"])
+def bench_frequency_template(benchmark, template):
+    # evaluated for every point of an entry with a variable frequency
+    benchmark(FrequencyTemplate(template), {"freq": 4.0, "low": 5, "high": 15})
+
+
+@pytest.mark.parametrize("jobs", [10, 100])
+def bench_prepare_config(benchmark, jobs):
+    config = make_config(jobs=jobs, entries=10)
+    # prepare_config changes the configuration, so every round gets a fresh copy
+    benchmark.pedantic(prepare_config, setup=lambda: ((copy.deepcopy(config),), {}), rounds=10)
+
+
+@pytest.mark.parametrize("jobs", [10, 100])
+def bench_parse_config(benchmark, tmp_path, jobs):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(yaml.safe_dump(make_config(jobs=jobs, entries=10)))
+    benchmark(parse_config, str(config_file))
+
+
+@pytest.mark.parametrize("jobs", [10, 100])
+def bench_prepare_config_validated(benchmark, jobs):
+    config = make_config(jobs=jobs, entries=10)
+    benchmark.pedantic(prepare_config, setup=lambda: ((copy.deepcopy(config),), {"validate": True}), rounds=10)
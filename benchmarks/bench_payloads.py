@@ -0,0 +1,22 @@
+import pytest
+
+from conftest import deep_payload
+from observability_testing_tool.config.executor import format_dict_payload, format_str_payload
+from observability_testing_tool.config.templates import compile_template
+
+vars_dict = {"host": "host-1", "zone": "europe-west3-a", "latency": 12.5, "status": 200}
+
+
+@pytest.mark.parametrize("depth", [1, 3, 5])
+def bench_format_dict_payload(benchmark, depth):
+    benchmark(format_dict_payload, vars_dict, deep_payload(depth))
+
+
+@pytest.mark.parametrize("depth", [1, 3, 5])
+def bench_render_dict_template(benchmark, depth):
+    template = compile_template(deep_payload(depth))
+    benchmark(template.render, vars_dict)
+
+
+def bench_format_str_payload(benchmark):
+    benchmark(format_str_payload, vars_dict, "Request from {host} in {zone} took {latency}ms with status {status}")
@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+
+# Seconds that importing the command line tool may take, well above what it takes on a laptop
+importBudget = 0.3
+
+# Modules that only a run sending to the Google Cloud APIs, or validating a configuration, needs
+heavy_modules = [
+    "grpc",
+    "google.cloud.logging_v2",
+    "google.cloud.monitoring_v3",
+    "google.protobuf",
+    "jsonschema",
+    "requests",
+    "yaml"
+]
+
+_import_script = f"""
+import json, sys
+from time import perf_counter
+started = perf_counter()
+import observability_testing_tool.main
+elapsed = perf_counter() - started
+print(json.dumps({{"elapsed": elapsed, "loaded": [name for name in {heavy_modules!r} if name in sys.modules]}}))
+"""
+
+
+def _import_tool() -> dict:
+    # a fresh interpreter each time, as the tool is started by test harnesses
+    result = subprocess.run([sys.executable, "-c", _import_script], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def bench_import(benchmark):
+    result = benchmark.pedantic(_import_tool, rounds=5)
+    assert result["loaded"] == []
+    assert result["elapsed"] < importBudget
+
+
+@pytest.mark.parametrize("args", [["--version"], ["--help"]])
+def bench_cli(benchmark, args):
+    benchmark.pedantic(subprocess.run, ([sys.executable, "-m", "observability_testing_tool.main", *args],), {"capture_output": True, "check": True}, rounds=5)
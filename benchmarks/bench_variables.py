@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import data_sources, variables
+from observability_testing_tool.config.executor import expand_variables
+from observability_testing_tool.config.parser import configure_data_source
+from observability_testing_tool.config.variables import compile_variables, run_expanders
+
+
+@pytest.fixture
+def sources():
+    sources = {name: dict(source) for name, source in data_sources.items()}
+    for source in sources.values():
+        configure_data_source(source)
+    return sources
+
+
+@pytest.mark.parametrize("variable", variables, ids=lambda v: v if isinstance(v, str) else v["name"])
+def bench_expand_variable(benchmark, sources, variable):
+    benchmark(expand_variables, [variable], sources, datetime.now())
+
+
+def bench_expand_all_variables(benchmark, sources):
+    benchmark(expand_variables, variables, sources, datetime.now())
+
+
+def bench_run_compiled_expanders(benchmark, sources):
+    expanders = compile_variables(variables, sources)
+    benchmark(run_expanders, expanders, datetime.now())
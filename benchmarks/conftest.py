@@ -0,0 +1,81 @@
+import copy
+
+import pytest
+
+from observability_testing_tool.config.common import set_dry_run, set_not_gce, set_batch_size, set_queue_size, set_workers
+
+
+# One of each kind of data source, as far as they work without Google Cloud
+data_sources = {
+    "hosts": {"sourceType": "list", "value": [f"host-{i}" for i in range(50)]},
+    "zone": {"sourceType": "fixed", "value": "projects/228638176398/zones/europe-west3-a"},
+    "status": {"sourceType": "random", "value": "int", "range": "200~599"},
+    "latency": {"sourceType": "random", "value": "float", "range": "0.5~250.0"},
+    "home": {"sourceType": "env", "value": "HOME"},
+    "instance": {"sourceType": "gce-metadata", "value": "instance/name"},
+    "load": {"sourceType": "dynamic", "formula": "linear", "slope": 0.5, "intercept": 10},
+    "growth": {"sourceType": "dynamic", "formula": "exponential", "base": 1.0, "factor": 0.001},
+    "wave": {"sourceType": "dynamic", "formula": "sinusoidal", "base": 50, "amplitude": 20, "period": 600},
+    "retries": {"sourceType": "dynamic", "formula": "backoff", "base": 1.0, "factor": 1.01}
+}
+
+variables = [
+    {"name": "host", "dataSource": "hosts"},
+    {"name": "firstHost", "dataSource": "hosts", "selector": "first"},
+    {"name": "zone", "extractor": r"\/zones\/([a-z0-9\-]+)$"},
+    "status", "latency", "home", "instance", "load", "growth", "wave", "retries"
+]
+
+
+def deep_payload(depth: int = 4, width: int = 4) -> dict:
+    """A JSON payload with `width` keys per level, half of them with placeholders."""
+    if depth == 0:
+        return {"message": "Request from {host} in {zone} took {latency}ms", "status": "{status}", "static": "value"}
+    payload = {}
+    for idx in range(width):
+        payload[f"static{idx}"] = {"a": 1, "b": [1, 2, 3], "c": "no placeholders"} if idx % 2 else "plain text"
+        payload[f"nested{idx}"] = deep_payload(depth - 1, width)
+    return payload
+
+
+def make_config(jobs: int = 10, entries: int = 10, frequency: str = "1m", start_offset: str = "-1h") -> dict:
+    """
+    A configuration with logging and monitoring jobs using all the data sources.
+    Each entry produces 60 points with the default frequency and offset.
+    """
+    return {
+        "dataSources": copy.deepcopy(data_sources),
+        "loggingJobs": [{
+            "id": f"log{job}",
+            "frequency": frequency,
+            "startOffset": start_offset,
+            "level": "INFO",
+            "logName": "benchmark",
+            "labels": {"host": "{host}", "zone": "{zone}", "static": "yes"},
+            "jsonPayload": deep_payload(2, 3),
+            "variables": variables,
+            "logEntries": [{"id": f"e{entry}"} for entry in range(entries)]
+        } for job in range(jobs)],
+        "monitoringJobs": [{
+            "id": f"mon{job}",
+            "frequency": frequency,
+            "startOffset": start_offset,
+            "metricType": "benchmark/metric",
+            "metricValue": "{wave}",
+            "metricLabels": {"host": "{firstHost}", "status": "{status}"},
+            "variables": variables,
+            "metricEntries": [{"id": f"m{entry}", "metricLabels": {"host": f"host-{entry}", "status": "{status}"}} for entry in range(entries)]
+        } for job in range(jobs)]
+    }
+
+
+@pytest.fixture(autouse=True)
+def offline():
+    # nothing leaves the machine: entries go to the null sink, no metadata requests
+    set_dry_run(True)
+    set_not_gce(True)
+    set_batch_size(0)
+    set_workers(1)
+    set_queue_size(1000)
+    yield
+    set_dry_run(False)
@@ -0,0 +1,77 @@
+import hashlib
+import pickle
+import sys
+from os import makedirs, path, replace
+
+from observability_testing_tool.config.common import flags, info_log, debug_log
+
+
+# Changed whenever the prepared configuration changes shape, so that older cache files are no longer used
+cacheFormat = 1
+
+# Settings of the entries that refresh_config() makes again in every run, left out of the cache file
+# as they would make up most of it: the state of a random number stream alone takes 2.5KB
+_run_keys = ("__random__", "__expanders__")
+
+
+def is_enabled() -> bool:
+    return flags.config_cache is not None
+
+
+def _tool_version() -> str:
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        return version("observability-testing-tool")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def cache_file_name(config_file: str) -> str:
+    """
+    Returns the name of the cache file of a configuration file, in the cache directory. It is named after
+    the hash of the contents of the configuration file, and of what else changes the prepared configuration.
+    """
+    digest = hashlib.sha256()
+    with open(config_file, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    digest.update(f"/{_tool_version()}/{cacheFormat}/{sys.version_info[0]}.{sys.version_info[1]}/{flags.skip_schema}".encode())
+    return path.join(flags.config_cache, digest.hexdigest() + ".pickle")
+
+
+def load_config(file_name: str) -> dict | None:
+    """
+    Reads a configuration prepared in an earlier run, which `refresh_config()` must bring up to date before it is used.
+
+    :return dict: The prepared configuration, or None if it is not in the cache
+    """
+    if not path.exists(file_name): return None
+    try:
+        with open(file_name, "rb") as file:
+            config = pickle.load(file)
+    except Exception as e:
+        info_log("Config Cache: Ignoring unreadable cache file %s", file_name, ex=e)
+        return None
+    info_log("Config Cache: Using the configuration prepared in an earlier run from %s", file_name)
+    return config
+
+
+def _entries(config: dict):
+    for jobs_key, entries_key in (("loggingJobs", "logEntries"), ("monitoringJobs", "metricEntries")):
+        for job in config[jobs_key]:
+            yield from job[entries_key]
+
+
+def save_config(file_name: str, config: dict):
+    makedirs(flags.config_cache, exist_ok=True)
+    temp_file_name = f"{file_name}.tmp"
+    run_settings = [{key: entry.pop(key) for key in _run_keys if key in entry} for entry in _entries(config)]
+    try:
+        with open(temp_file_name, "wb") as file:
+            pickle.dump(config, file, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        for entry, settings in zip(_entries(config), run_settings):
+            entry.update(settings)
+    # the cache file is replaced in one go, so that another run never reads it half written
+    replace(temp_file_name, file_name)
+    debug_log("Config Cache: Saved the prepared configuration to %s", file_name)
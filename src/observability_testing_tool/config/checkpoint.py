@@ -0,0 +1,162 @@
+import json
+import random
+from collections import deque
+from datetime import datetime
+from os import makedirs, path, replace
+from urllib.parse import quote
+
+from observability_testing_tool.config.common import flags, info_log, debug_log
+
+
+# Seconds between two checkpoints of the historical entries in progress
+checkpointInterval = 10.0
+# Points between two resume marks of an entry, which is also the most points generated again when resuming
+markInterval = 1000
+
+_dynamic_state_keys = ("__t0__", "__counter__")
+
+
+class EntryProgress:
+    """
+    The progress of a historical entry, saved to a state file in the checkpoint directory.
+
+    The timeline of the entry records a mark every `markInterval` points, with the time of the point
+    and the state needed to generate it again: the random number streams of the entry and of its variables,
+    and the state of its dynamic data sources.
+    The sink records the time of the last point submitted. A checkpoint saves the last mark before that
+    point, so that a resumed run generates the timeline again from the mark, with the same values,
+    and skips the points up to the last one submitted.
+    """
+
+    def __init__(self, entry: dict, data_sources: dict):
+        self.entry_id = entry["id"]
+        self.file_name = path.join(flags.checkpoint, quote(self.entry_id, safe="") + ".json")
+        self.start_time = entry["startTime"]
+        self.end_time = entry["endTime"]
+        self.random = entry.get("__random__", random)
+        expanders = list(_unwrapped(entry.get("__expanders__") or []))
+        self.streams = {expander.name: expander.rng for expander in expanders if hasattr(expander, "rng")}
+        # the state of the dynamic data sources used by the entry, which moves along with the timeline
+        names = {id(source): name for name, source in data_sources.items()}
+        self.states = {names[id(expander.data_source)]: expander.state for expander in expanders if hasattr(expander, "state")}
+        # marks are added by the timeline thread and consumed by the sink thread
+        self.marks = deque()
+        self.mark_state = None
+        self.last = None
+        self.done = False
+        self.saved = None
+
+    def mark(self, submit_time: datetime):
+        self.marks.append((submit_time, {
+            "time": submit_time.isoformat(),
+            "random": self.random.getstate(),
+            "variables": {name: rng.getstate() for name, rng in self.streams.items()},
+            "dataSources": {
+                name: {key: state[key] for key in _dynamic_state_keys if key in state}
+                for name, state in self.states.items()
+            }
+        }))
+
+    def load(self) -> bool:
+        """
+        Reads the state file of the entry, if there is one.
+
+        :return bool: True if the entry was in progress or done in an earlier run
+        """
+        if not path.exists(self.file_name): return False
+        with open(self.file_name, encoding="utf-8") as file:
+            state = json.load(file)
+        # now-relative start and end times are those of the run that is resumed
+        self.start_time = datetime.fromisoformat(state["startTime"])
+        self.end_time = datetime.fromisoformat(state["endTime"])
+        self.last = datetime.fromisoformat(state["last"]) if state.get("last") else None
+        self.done = state.get("done", False)
+        self.mark_state = state.get("mark")
+        self.saved = self.last
+        return True
+
+    def restore(self, entry: dict) -> datetime | None:
+        """
+        Sets the entry up to generate its timeline again from the saved mark.
+
+        :return datetime: The time of the last point already submitted, up to which points are skipped
+        """
+        entry["endTime"] = self.end_time
+        if self.mark_state is None:
+            entry["startTime"] = self.start_time
+            return None
+        state = self.mark_state
+        entry["startTime"] = datetime.fromisoformat(state["time"])
+        _set_random_state(self.random, state["random"])
+        for name, rng_state in state.get("variables", {}).items():
+            rng = self.streams.get(name)
+            if rng is not None:
+                _set_random_state(rng, rng_state)
+        for name, values in state["dataSources"].items():
+            source_state = self.states.get(name)
+            if source_state is None: continue
+            for key, value in values.items():
+                source_state[key] = datetime.fromisoformat(value) if key == "__t0__" else value
+        info_log("%s: Resuming from %s, after %s", self.entry_id, entry["startTime"], self.last)
+        return self.last
+
+    def save(self, done: bool = False):
+        """
+        Writes the state file of the entry. Only call this once the points submitted so far have been written.
+        """
+        if done:
+            self.done = True
+        elif self.last is None or self.last == self.saved:
+            return
+        # the last mark that is not after the last point submitted
+        while len(self.marks) > 1 and self.marks[1][0] <= self.last:
+            self.marks.popleft()
+        if self.marks and self.marks[0][0] <= self.last:
+            self.mark_state = self.marks[0][1]
+        state = {
+            "id": self.entry_id,
+            "startTime": self.start_time.isoformat(),
+            "endTime": self.end_time.isoformat(),
+            "last": self.last.isoformat() if self.last is not None else None,
+            "done": self.done,
+            "mark": self.mark_state
+        }
+        temp_file_name = self.file_name + ".tmp"
+        with open(temp_file_name, "w", encoding="utf-8") as file:
+            json.dump(state, file, default=str)
+        # the state file is replaced in one go, so that it is never found half written
+        replace(temp_file_name, self.file_name)
+        self.saved = self.last
+        debug_log("%s: Saved checkpoint at %s", self.entry_id, self.last)
+
+
+def _set_random_state(rng, state: list):
+    version, internal_state, gauss_next = state
+    rng.setstate((version, tuple(internal_state), gauss_next))
+
+
+def _unwrapped(expanders: list):
+    for expander in expanders:
+        while hasattr(expander, "expander"):
+            expander = expander.expander
+        yield expander
+
+
+def is_enabled() -> bool:
+    return flags.checkpoint is not None
+
+
+def entry_progress(entry: dict, data_sources: dict) -> EntryProgress:
+    """
+    Returns the progress of a historical entry, read from its state file when resuming a run.
+    """
+    makedirs(flags.checkpoint, exist_ok=True)
+    progress = EntryProgress(entry, data_sources)
+    if flags.resume and progress.load() and progress.done:
+        info_log("%s: Already completed in the run that is resumed", progress.entry_id)
+    return progress
+
+
+def save_progress(progresses: list, done: bool = False):
+    for progress in progresses:
+        progress.save(done)
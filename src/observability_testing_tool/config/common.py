@@ -1,4 +1,51 @@
-from os import getenv, environ
+import atexit
+import sys
+import threading
+from datetime import datetime
+from multiprocessing.util import Finalize, register_after_fork
+from os import getenv, environ, getpid, register_at_fork
+from traceback import format_exception
+
+
+class Flags:
+    """
+    The settings of the tool, resolved from the environment variables once.
+
+    The setters below update both the environment variables, which child processes inherit,
+    and these attributes, so that checking a flag in the hot path is a plain attribute read.
+    """
+
+    def __init__(self):
+        self.reload()
+
+    def reload(self):
+        self.log_level = int(getenv("OBSTOOL_DEBUG", 0))
+        self.log_file = getenv("OBSTOOL_LOG_FILE") or None
+        self.skip_schema = getenv("OBSTOOL_SKIP_VALIDATION") == "True"
+        self.dry_run = getenv("OBSTOOL_DRY_RUN") == "True"
+        self.not_gce = getenv("OBSTOOL_NO_GCE_METADATA") == "True"
+        self.batch_size = int(getenv("OBSTOOL_BATCH_SIZE", 0))
+        self.workers = int(getenv("OBSTOOL_WORKERS", 1))
+        self.queue_size = int(getenv("OBSTOOL_QUEUE_SIZE", 1000))
+        self.live_engine = getenv("OBSTOOL_LIVE_ENGINE", "sched")
+        self.catch_up = getenv("OBSTOOL_CATCH_UP", "burst")
+        self.vectorize = getenv("OBSTOOL_VECTORIZE") == "True"
+        self.output = getenv("OBSTOOL_OUTPUT") or None
+        self.output_format = getenv("OBSTOOL_OUTPUT_FORMAT", "ndjson")
+        # configured in megabytes, kept in bytes
+        self.output_rotate_size = int(float(getenv("OBSTOOL_OUTPUT_ROTATE_SIZE", 0)) * 1024 * 1024)
+        self.endpoint = getenv("OBSTOOL_ENDPOINT") or None
+        port = getenv("OBSTOOL_STATS_PORT")
+        self.stats_port = int(port) if port else None
+        self.error_budget = int(getenv("OBSTOOL_ERROR_BUDGET", 0))
+        self.checkpoint = getenv("OBSTOOL_CHECKPOINT") or None
+        self.resume = getenv("OBSTOOL_RESUME") == "True"
+        seed = getenv("OBSTOOL_SEED")
+        self.seed = int(seed) if seed else None
+        self.config_cache = getenv("OBSTOOL_CONFIG_CACHE") or None
+
+
+flags = Flags()
 
 
 def set_skip_schema(skip: bool):
@@ -6,18 +53,30 @@ def set_skip_schema(skip: bool):
         environ["OBSTOOL_SKIP_VALIDATION"] = "True"
     else:
         environ["OBSTOOL_SKIP_VALIDATION"] = "False"
+    flags.skip_schema = skip
 
 
 def should_skip_schema() -> bool:
-    return getenv("OBSTOOL_SKIP_VALIDATION") == "True"
+    return flags.skip_schema
 
 
 def set_log_level(level: int):
     environ["OBSTOOL_DEBUG"] = str(level)
+    flags.log_level = level
 
 
 def get_log_level() -> int:
-    return int(getenv("OBSTOOL_DEBUG", 0))
+    return flags.log_level
+
+
+def set_log_file(file_name: str):
+    environ["OBSTOOL_LOG_FILE"] = file_name
+    flags.log_file = file_name or None
+    _close_log_stream()
+
+
+def get_log_file() -> str | None:
+    return flags.log_file
 
 
 def set_dry_run(dry_run: bool):
@@ -25,10 +84,11 @@ def set_dry_run(dry_run: bool):
         environ["OBSTOOL_DRY_RUN"] = "True"
     else:
         environ["OBSTOOL_DRY_RUN"] = "False"
+    flags.dry_run = dry_run
 
 
 def is_dry_run() -> bool:
-    return getenv("OBSTOOL_DRY_RUN") == "True"
+    return flags.dry_run
 
 
 def set_not_gce(no_meta: bool):
@@ -36,38 +96,290 @@ def set_not_gce(no_meta: bool):
         environ["OBSTOOL_NO_GCE_METADATA"] = "True"
     else:
         environ["OBSTOOL_NO_GCE_METADATA"] = "False"
+    flags.not_gce = no_meta
 
 
 def is_not_gce() -> bool:
-    return getenv("OBSTOOL_NO_GCE_METADATA") == "True"
+    return flags.not_gce
+
+
+def set_batch_size(size: int):
+    environ["OBSTOOL_BATCH_SIZE"] = str(size)
+    flags.batch_size = size
+
+
+def get_batch_size() -> int:
+    return flags.batch_size
+
+
+def set_workers(workers: int):
+    environ["OBSTOOL_WORKERS"] = str(workers)
+    flags.workers = workers
+
+
+def get_workers() -> int:
+    return flags.workers
+
+
+def set_queue_size(size: int):
+    environ["OBSTOOL_QUEUE_SIZE"] = str(size)
+    flags.queue_size = size
+
+
+def get_queue_size() -> int:
+    return flags.queue_size
+
+
+def set_live_engine(engine: str):
+    environ["OBSTOOL_LIVE_ENGINE"] = engine
+    flags.live_engine = engine
+
+
+def get_live_engine() -> str:
+    return flags.live_engine
+
+
+def set_catch_up(policy: str):
+    environ["OBSTOOL_CATCH_UP"] = policy
+    flags.catch_up = policy
+
+
+def get_catch_up() -> str:
+    return flags.catch_up
+
+
+def set_vectorize(vectorize: bool):
+    if vectorize:
+        environ["OBSTOOL_VECTORIZE"] = "True"
+    else:
+        environ["OBSTOOL_VECTORIZE"] = "False"
+    flags.vectorize = vectorize
+
+
+def should_vectorize() -> bool:
+    return flags.vectorize
+
+
+def set_output(directory: str):
+    environ["OBSTOOL_OUTPUT"] = directory
+    flags.output = directory or None
+
+
+def get_output() -> str | None:
+    return flags.output
+
+
+def set_output_format(output_format: str):
+    environ["OBSTOOL_OUTPUT_FORMAT"] = output_format
+    flags.output_format = output_format
+
+
+def get_output_format() -> str:
+    return flags.output_format
+
+
+def set_output_rotate_size(size_mb: float):
+    environ["OBSTOOL_OUTPUT_ROTATE_SIZE"] = str(size_mb)
+    # configured in megabytes, returned in bytes
+    flags.output_rotate_size = int(float(size_mb) * 1024 * 1024)
+
+
+def get_output_rotate_size() -> int:
+    return flags.output_rotate_size
 
 
-def debug_log(message: str, obj = None, ex: Exception = None):
+def set_endpoint(endpoint: str):
+    environ["OBSTOOL_ENDPOINT"] = endpoint
+    flags.endpoint = endpoint or None
 
-    if get_log_level() >= 2:
-        error_log(message, obj, ex, level="D")
 
+def get_endpoint() -> str | None:
+    return flags.endpoint
 
-def info_log(message: str, obj = None, ex: Exception = None):
 
-    if get_log_level() >= 1:
-        error_log(message, obj, ex, level="I")
+def set_stats_port(port: int):
+    environ["OBSTOOL_STATS_PORT"] = str(port)
+    flags.stats_port = port
 
 
-def error_log(message: str, obj = None, ex: Exception = None, level: str = "E"):
+def get_stats_port() -> int | None:
+    return flags.stats_port
 
-    from datetime import datetime
-    from os import getpid
-    from traceback import format_exception
 
-    log_header = f"{datetime.now().isoformat(timespec="seconds")} {level[0]} {getpid():07d}"
+def set_error_budget(budget: int):
+    environ["OBSTOOL_ERROR_BUDGET"] = str(budget)
+    flags.error_budget = budget
 
-    print(f"{log_header} {message}")
+
+def get_error_budget() -> int:
+    return flags.error_budget
+
+
+def set_checkpoint(directory: str):
+    environ["OBSTOOL_CHECKPOINT"] = directory
+    flags.checkpoint = directory or None
+
+
+def get_checkpoint() -> str | None:
+    return flags.checkpoint
+
+
+def set_resume(resume: bool):
+    if resume:
+        environ["OBSTOOL_RESUME"] = "True"
+    else:
+        environ["OBSTOOL_RESUME"] = "False"
+    flags.resume = resume
+
+
+def should_resume() -> bool:
+    return flags.resume
+
+
+def set_seed(seed: int):
+    environ["OBSTOOL_SEED"] = str(seed)
+    flags.seed = seed
+
+
+def get_seed() -> int | None:
+    return flags.seed
+
+
+def set_config_cache(directory: str):
+    environ["OBSTOOL_CONFIG_CACHE"] = directory
+    flags.config_cache = directory or None
+
+
+def get_config_cache() -> str | None:
+    return flags.config_cache
+
+
+def set_rate_limit(api: str, rate: float):
+    environ[f"OBSTOOL_{api.upper()}_RATE_LIMIT"] = str(rate)
+
+
+def get_rate_limit(api: str) -> float | None:
+    rate = getenv(f"OBSTOOL_{api.upper()}_RATE_LIMIT")
+    return float(rate) if rate is not None else None
+
+
+# Log records are collected and written out together when there are this many bytes of them,
+# or at most this many seconds after the first one, so that a busy run does not make a system call per line
+logBufferSize = 64 * 1024
+logFlushInterval = 0.5
+
+_log_lock = threading.Lock()
+_log_buffer = []
+_log_buffered = 0
+_log_timer = None
+_log_stream = None
+_pid = getpid()
+
+
+def debug_log(message: str, *args, obj = None, ex: Exception = None):
+    """
+    Logs a message at debug level (`-vv`). The message is only formatted with `args`,
+    %-style, if it is logged at all.
+    """
+    if flags.log_level >= 2:
+        _log_record("D", message % args if args else message, obj, ex)
+
+
+def info_log(message: str, *args, obj = None, ex: Exception = None):
+    """
+    Logs a message at info level (`-v`). The message is only formatted with `args`,
+    %-style, if it is logged at all.
+    """
+    if flags.log_level >= 1:
+        _log_record("I", message % args if args else message, obj, ex)
+
+
+def error_log(message: str, *args, obj = None, ex: Exception = None, level: str = "E"):
+    """
+    Logs a message at every log level. Errors are written out straight away.
+    """
+    _log_record(level[0], message % args if args else message, obj, ex)
+    if level[0] == "E":
+        flush_log()
+
+
+def _log_record(level: str, message: str, obj, ex: Exception):
+    log_header = f"{datetime.now().isoformat(timespec="seconds")} {level} {_pid:07d}"
+    record = f"{log_header} {message}\n"
     if obj is not None:
-        print(f"{log_header} ", obj, sep="| ")
+        record += f"{log_header} | {obj}\n"
     if ex is not None:
-        if get_log_level() >= 2:
-            print(f"{log_header} ", "".join(format_exception(ex, limit=None, chain=True)), sep="| ")
+        if flags.log_level >= 2:
+            record += f"{log_header} | {"".join(format_exception(ex, limit=None, chain=True))}\n"
         else:
-            print(f"{log_header} ", repr(ex), sep="| ")
-    print()
+            record += f"{log_header} | {ex!r}\n"
+    _write_log(record + "\n")
+
+
+def _write_log(record: str):
+    global _log_buffered, _log_timer
+    with _log_lock:
+        _log_buffer.append(record)
+        _log_buffered += len(record)
+        if _log_buffered < logBufferSize:
+            if _log_timer is None:
+                _log_timer = threading.Timer(logFlushInterval, flush_log)
+                _log_timer.daemon = True
+                _log_timer.start()
+            return
+    flush_log()
+
+
+def _get_log_stream():
+    global _log_stream
+    if flags.log_file is None:
+        return sys.stdout
+    if _log_stream is None:
+        # appending, so that all the processes of a run can share the file
+        _log_stream = open(flags.log_file, "a", encoding="utf-8")
+    return _log_stream
+
+
+def flush_log():
+    """
+    Writes out the log records waiting in the buffer.
+    """
+    global _log_buffered, _log_timer
+    with _log_lock:
+        if _log_timer is not None:
+            _log_timer.cancel()
+            _log_timer = None
+        if not _log_buffer: return
+        text = "".join(_log_buffer)
+        _log_buffer.clear()
+        _log_buffered = 0
+        # a single write per flush, so that records from different processes do not get mixed up
+        stream = _get_log_stream()
+        stream.write(text)
+        stream.flush()
+
+
+def _close_log_stream():
+    global _log_stream
+    flush_log()
+    if _log_stream is not None:
+        _log_stream.close()
+    _log_stream = None
+
+
+def _after_fork():
+    global _log_lock, _log_timer, _pid
+    # the buffer was flushed before forking, and the timer thread does not exist in the child
+    _log_lock = threading.Lock()
+    _log_timer = None
+    _pid = getpid()
+
+
+def _after_process_fork(_):
+    # processes of multiprocessing do not run atexit handlers when they exit, but do run its finalizers
+    Finalize(None, flush_log, exitpriority=0)
+
+
+atexit.register(flush_log)
+register_at_fork(before=flush_log, after_in_child=_after_fork)
+register_after_fork(flags, _after_process_fork)
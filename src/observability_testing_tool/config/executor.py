@@ -1,74 +1,101 @@
+import heapq
+import itertools
 import math
 import random
 import re
 import sched
 import sys
 from multiprocessing import Process
-from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections.abc import Callable, Iterable
+from operator import itemgetter
 
 from datetime import datetime
 from os import environ
-from random import randrange
-from time import sleep, time
+from time import sleep, time, perf_counter, monotonic
 
-from observability_testing_tool.config.common import debug_log, info_log, error_log
-from observability_testing_tool.config.parser import parse_config, prepare_config, next_timedelta_from_interval, parse_timedelta_interval
+from observability_testing_tool.config.common import debug_log, info_log, error_log, get_rate_limit, set_rate_limit, get_batch_size, get_workers, get_live_engine, flags, should_vectorize, get_queue_size, should_skip_schema
+from observability_testing_tool.config.variables import compile_variables, run_expanders, entry_random, ConstantExpander
+from observability_testing_tool.config.templates import compile_templates, render_template, logging_template_fields, monitoring_template_fields
+from observability_testing_tool.config.pipeline import run_pipeline
+from observability_testing_tool.config import checkpoint, cache
+from observability_testing_tool.config.parser import parse_config, prepare_config, refresh_config, next_timedelta_from_interval, FrequencyTemplate
 
-from observability_testing_tool.obs.cloud_logging import setup_logging_client, submit_log_entry, submit_log_entry_json, submit_log_entry_proto, logger
-from observability_testing_tool.obs.cloud_monitoring import setup_monitoring_client, submit_gauge_metric, submit_metric_descriptor
+from observability_testing_tool.obs.cloud_logging import setup_logging_client, submit_log_entry, submit_log_entry_async, begin_log_batch, end_log_batch, flush_log_batch
+from observability_testing_tool.obs.sinks import close_sink, flush_sink
+from observability_testing_tool.obs import stats
+from observability_testing_tool.obs.rate_limit import process_rate_limits, set_process_rate_limits
+from observability_testing_tool.obs.cloud_monitoring import setup_monitoring_client, submit_gauge_metric, submit_gauge_metric_async, submit_metric_descriptor, begin_metric_buffer, end_metric_buffer, flush_metric_buffer
 
 
 _config = {}
+_pool = None
+_pool_futures = []
+# set in worker processes, to report their statistics to the main process
+_stats_queue = None
+# the request budget of each API in every process sending requests
+_rate_limits = None
+
+# Most entries whose timelines are merged at once when points are grouped into requests,
+# as many as the time series in a request, so that a large matrix does not take up memory all at once
+interleaveMaxEntries = 200
 
 
 def prepare(config_file: str):
     global _config
     try:
-        _config = parse_config(config_file)
-        if _config is None:
-            error_log("No config information was found. Is the file empty?")
-            exit(1)
-        prepare_config(_config)
+        cache_file_name = cache.cache_file_name(config_file) if cache.is_enabled() else None
+        cached_config = cache.load_config(cache_file_name) if cache_file_name is not None else None
+        if cached_config is not None:
+            _config = cached_config
+            refresh_config(_config)
+        else:
+            _config = parse_config(config_file)
+            if _config is None:
+                error_log("No config information was found. Is the file empty?")
+                exit(1)
+            prepare_config(_config, validate=not should_skip_schema())
+            if cache_file_name is not None:
+                cache.save_config(cache_file_name, _config)
     except ValueError as e:
         error_log(str(e))
         exit(1)
     except Exception as e:
         _config['__filename__'] = config_file
-        error_log("There was an error parsing the configuration file", _config, e)
+        error_log("There was an error parsing the configuration file", obj=_config, ex=e)
         exit(1)
 
     if _config.get("cloudConfig") is not None:
         environ["GOOGLE_CLOUD_PROJECT"] = _config["cloudConfig"]["project"]
         environ["GOOGLE_APPLICATION_CREDENTIALS"] = _config["cloudConfig"]["credentials"]
+        # command-line options and environment variables take precedence
+        for api in ["logging", "monitoring"]:
+            rate_limit = _config["cloudConfig"].get(f"{api}RateLimit")
+            if rate_limit is not None and get_rate_limit(api) is None:
+                set_rate_limit(api, rate_limit)
+    _share_rate_limits()
+
+    # this call needs to happen AFTER the environment variables have been set
+    _setup_clients(_config)
+
+    debug_log("Final configuration settings", obj=_config)
 
-    # these calls need to happen AFTER the environment variables have been set
-    setup_logging_client()
-    setup_monitoring_client()
-
-    debug_log("Final configuration settings", _config)
-
-
-def expand_list_variable(selector, value):
-    # TODO selector chooses item, range allows to limit values that selector acts on
-    # E.g. range: None, selector: any = random value from full list
-    # E.g. range: 5-9, selector: any = random value from sublist/slice
-    # E.g. range: None, selector: all = the full list
-    # E.g. range: 5-9, selector: all = the entire sublist/slice
-    # In this case range would have to be ALSO at the variable level, used for a list
-
-    if selector == "any":
-        return random.choice(value)
-    elif selector == "first":
-        return value[0]
-    elif selector == "last":
-        return value[-1]
-    elif selector == "all":
-        return value
-    else:
-        try:
-            return value[int(selector)]
-        except ValueError:
-            raise ValueError(f"Variable '{value}' uses an invalid list selector '{selector}'")
+
+def _setup_clients(config: dict):
+    # clients are only needed for the kinds of jobs that are actually there
+    if config["loggingJobs"]:
+        setup_logging_client()
+    if config["monitoringJobs"] or config["metricDescriptors"]:
+        setup_monitoring_client()
+
+
+def _share_rate_limits():
+    global _rate_limits
+    # The request budget of each API is shared by the processes sending requests at the same time:
+    # the live process, and the worker processes or, when there are none, the main process
+    processes = max(get_workers(), 1) + (1 if _config["hasLiveLoggingJobs"] or _config["hasLiveMonitoringJobs"] else 0)
+    _rate_limits = process_rate_limits(processes)
+    set_process_rate_limits(_rate_limits)
 
 
 _regex_var_name_index = re.compile(r'^(?P<name>.+?)(\[(?P<index>.+)])?$')
@@ -85,104 +112,24 @@ def _split_var_name_index(var_name):
 # need the data sources for testability
 def expand_variables(variables: list, data_sources: dict, submit_time: datetime = None) -> dict | None:
     if variables is None: return None
-    debug_log("Received request to expand variables", variables)
-    variables_expanded = {}
-    for idx, var_config in enumerate(variables, start=1):
-        if isinstance(var_config, str):
-            data_source_name = var_config
-            var_name = var_config
-            var_config = {} # so it does not fail when looking up the config further down, e.g. var_config.get("extractor")
-        elif isinstance(var_config, dict):
-            var_name = var_config["name"]
-            data_source_name = var_config.get("dataSource", var_name)
-        else:
-            raise ValueError(f"Variable {idx} is not configured correctly")
-        data_source = data_sources.get(data_source_name)
-        if data_source is None:
-            raise ValueError(f"Data source for '{var_name}' does not exist")
-
-        data_source_value = data_source.get("value")
-        match data_source["sourceType"]:
-            case "list":
-                var_list_selector = var_config.get("selector", "any")
-                variables_expanded[var_name] = expand_list_variable(var_list_selector, data_source_value)
-            case "random":
-                rand_range = data_source["range"]
-                if data_source_value == "int":
-                    variables_expanded[var_name] = randrange(
-                        rand_range.get("from", 0),
-                        rand_range.get("to", 2147483647),
-                        rand_range.get("step", 1)
-                    )
-                elif data_source_value == "float":
-                    variables_expanded[var_name] = random.uniform(
-                        rand_range.get("from", 0.0),
-                        rand_range.get("to", 2147483647.0),
-                    )
-            case "env" | "gce-metadata":
-                variables_expanded[var_name] = data_source["__value__"]
-            case "fixed":
-                # This type is mostly needed for testing and debugging
-                variables_expanded[var_name] = data_source_value
-            case "dynamic":
-                formula = data_source.get("formula", "linear")
-                # establish a reference start time per data source
-                now_dt = submit_time if submit_time else datetime.now()
-                t0 = data_source.get("__t0__")
-                if t0 is None:
-                    data_source["__t0__"] = now_dt
-                    t_seconds = 0.0
-                else:
-                    # t0 stored as datetime
-                    t_seconds = (now_dt - t0).total_seconds()
-                
-                if formula == "exponential":
-                    # value = base * exp(rate * t)
-                    base = float(data_source.get("base", 1.0))
-                    rate = float(data_source.get("factor", 1.0))
-                    variables_expanded[var_name] = base * math.exp(rate * t_seconds)
-                elif formula == "sinusoidal":
-                    # value = base + amplitude * sin(2 * pi * t / period + phase)
-                    base = float(data_source.get("base", 0.0))
-                    amplitude = float(data_source.get("amplitude", 1.0))
-                    period = float(data_source.get("period", 60.0))
-                    phase = float(data_source.get("phase", 0.0))
-                    # avoid division by zero
-                    period = period if period != 0 else 1.0
-                    variables_expanded[var_name] = base + amplitude * math.sin(2 * math.pi * t_seconds / period + phase)
-                elif formula == "backoff":
-                    # value = base * (factor ^ attempt)
-                    base = float(data_source.get("base", 1.0))
-                    factor = float(data_source.get("factor", 2.0))
-                    if "__counter__" not in data_source:
-                        data_source["__counter__"] = 0
-                    variables_expanded[var_name] = base * math.pow(factor, data_source["__counter__"])
-                    data_source["__counter__"] += 1
-                else: # linear or default
-                    slope = float(data_source.get("slope", 1.0))
-                    intercept = float(data_source.get("intercept", 0.0))
-                    variables_expanded[var_name] = slope * t_seconds + intercept
-
-        var_index = var_config.get("index")
-        if var_index is not None:
-            expanded_value = variables_expanded[var_name]
-            if not isinstance(expanded_value, dict) and not isinstance(expanded_value, list):
-                error_log(f"Could not get indexed value from '{expanded_value}' in variable '{var_name}' with index '{var_index}'", "Make sure the value is a JSON object or array")
-            else:
-                variables_expanded[var_name] = expanded_value[var_index]
-
-        var_extractor = var_config.get("extractor")
-        if var_extractor is not None:
-            expanded_value = variables_expanded[var_name]
-            if not isinstance(expanded_value, str):
-                expanded_value = str(expanded_value)
-            matches = re.search(var_extractor, expanded_value)
-            if matches is None or matches.group(1) is None:
-                error_log(f"Could not extract from '{expanded_value}' in variable '{var_name}' with regex '{var_extractor}'", "Did you include a group in the regex?")
-            else:
-                variables_expanded[var_name] = matches.group(1)
-
-    debug_log("Returning expanded variables", variables_expanded)
+    debug_log("Received request to expand variables", obj=variables)
+    variables_expanded = run_expanders(compile_variables(variables, data_sources), submit_time)
+    debug_log("Returning expanded variables", obj=variables_expanded)
+    return variables_expanded
+
+
+def expand_entry_variables(entry: dict, data_sources: dict, submit_time: datetime = None) -> dict | None:
+    """
+    Expands the variables of an entry with the expanders compiled by `prepare_config()`,
+    falling back to `expand_variables()` for entries that were not prepared.
+    """
+    expanders = entry.get("__expanders__")
+    if expanders is None:
+        return expand_variables(entry.get("variables"), data_sources, submit_time)
+    started = perf_counter()
+    variables_expanded = run_expanders(expanders, submit_time)
+    stats.observe("generate_seconds", entry["id"], perf_counter() - started)
+    debug_log("%s: Expanded variables", entry["id"], obj=variables_expanded)
     return variables_expanded
 
 
@@ -209,194 +156,393 @@ def format_dict_payload(vars_dict: dict, obj: dict):
     return new_payload
 
 
-def run_logging_jobs() -> Process:
-    global _config
-    # https://docs.python.org/3/library/multiprocessing.html
-    if _config["hasLiveLoggingJobs"]:
-        p = Process(target=_run_live_jobs, args=("loggingJobs", "logEntries", handle_logging_job, _config))
-        p.start()
-    else:
-        p = None
-    _run_batch_jobs("loggingJobs", "logEntries", handle_logging_job)
-    return p
+def run_logging_jobs():
+    _run_batch_jobs("loggingJobs", "logEntries", render_logging_job, submit_logging_job)
 
 
-def run_monitoring_jobs() -> Process:
-    global _config
-    # https://docs.python.org/3/library/multiprocessing.html
-    if _config["hasLiveMonitoringJobs"]:
-        p = Process(target=_run_live_jobs, args=("monitoringJobs", "metricEntries", handle_monitoring_job, _config))
-        p.start()
-    else:
-        p = None
-    _run_batch_jobs("monitoringJobs", "metricEntries", handle_monitoring_job)
-    return p
+def run_monitoring_jobs():
+    _run_batch_jobs("monitoringJobs", "metricEntries", render_monitoring_job, submit_monitoring_job, interleave=get_batch_size() > 0)
 
-# NOT IN USE - FUTURE IDEA
-def _run_jobs(config: dict):
+
+def run_live_jobs() -> Process | None:
+    """
+    Starts a single process that runs the live entries of both logging and monitoring jobs.
+    """
+    if not _config["hasLiveLoggingJobs"] and not _config["hasLiveMonitoringJobs"]:
+        return None
+    # only the live entries are handed over to the new process
+    live_config = {
+        "dataSources": _config["dataSources"],
+        "logEntries": list(_live_entries("loggingJobs", "logEntries")),
+        "metricEntries": list(_live_entries("monitoringJobs", "metricEntries"))
+    }
     # https://docs.python.org/3/library/multiprocessing.html
-    has_live_jobs = bool(config["hasLiveJobs"])
-    job_config = config["jobConfig"]
-    data_sources = job_config["dataSources"]
-    handler = job_config["handler"]
-    if has_live_jobs:
-        p = Process(target=_run_live_jobs, args=(job_config, data_sources, handler))
-        p.start()
+    if get_live_engine() == "asyncio":
+        from observability_testing_tool.config.live_async import run_live_jobs_async
+        p = Process(target=run_live_jobs_async, args=(live_config, stats.stats_queue(), _rate_limits))
     else:
-        p = None
-    _run_batch_jobs(job_config, data_sources, handler)
+        p = Process(target=_run_live_jobs, args=(live_config, stats.stats_queue(), _rate_limits))
+    p.start()
     return p
 
-# NOT IN USE - FUTURE IDEA
-def _run_live_jobs2(jobs_config: dict, data_sources: dict, handler: Callable):
-    setup_logging_client()
-    schedule = sched.scheduler(time, sleep)
-    jobs = jobs_config["jobs"]
-    job_entries = jobs_config["entries"]
-    for job in jobs:
-        if not job["live"]: continue
-        job_key = f"LiveJob [{job['id']}]"
-        job_config = dict(job)
-        for entry in job_entries:
-            entry = job_config | entry
-            start_time = entry["startTime"]
-            debug_log(f"{job_key}: Queuing into scheduler", job)
-            if start_time > datetime.now():
-                schedule.enter(0, 1, _handle_live_job, (schedule, entry, data_sources, handler))
-            else:
-                schedule.enterabs(start_time.timestamp(), 1, _handle_live_job, (schedule, entry, data_sources, handler))
-    # info_log(f"Initial Scheduler Queue for [{jobs_key}]", schedule.queue)
-    schedule.run(True)
-    exit(0)
 
-
-def _run_live_jobs(jobs_key: str, entries_key: str, handler: Callable, config: dict):
-    setup_logging_client()
-    setup_monitoring_client()
-    schedule = sched.scheduler(time, sleep)
-    for job in config[jobs_key]:
+def _live_entries(jobs_key: str, entry_key: str):
+    for job in _config[jobs_key]:
         if not job["live"]: continue
-        job_key = f"LiveJob [{job['id']}]"
-        job_config = dict(job)
-        del job_config[entries_key]
-        for entry in job[entries_key]:
-            entry = job_config | entry
-            start_time = entry["startTime"]
-            debug_log(f"{job_key}: Queuing into scheduler", job)
-            if start_time <= datetime.now():
-                schedule.enter(0, 1, _handle_live_job, (schedule, entry, config["dataSources"], handler))
-            else:
-                schedule.enterabs(start_time.timestamp(), 1, _handle_live_job, (schedule, entry, config["dataSources"], handler))
-    info_log(f"Initial Scheduler Queue for [{jobs_key}]", schedule.queue)
+        for entry_ref in _entry_refs(job, entry_key):
+            yield _job_entry(job, entry_key, *entry_ref)
+
+
+def _run_live_jobs(live_config: dict, stats_queue, rate_limits: dict = None):
+    if rate_limits is not None:
+        set_process_rate_limits(rate_limits)
+    stats.start_reporting(stats_queue)
+    # clients are only needed for the kinds of entries that are actually there
+    if live_config["logEntries"]:
+        setup_logging_client()
+    if live_config["metricEntries"]:
+        setup_monitoring_client()
+    data_sources = live_config["dataSources"]
+    schedule = sched.scheduler(time, sleep)
+    for entries_key, handler in [("logEntries", handle_logging_job), ("metricEntries", handle_monitoring_job)]:
+        for entry in live_config[entries_key]:
+            debug_log("%s: Queuing into scheduler", entry["id"], obj=entry)
+            # the schedule of an entry is a series of absolute times from its start, or from now if that is later
+            due = max(entry["startTime"].timestamp(), time())
+            schedule.enterabs(due, 1, _handle_live_job, (schedule, entry, data_sources, handler, due))
+    info_log("Initial Scheduler Queue", obj=schedule.queue)
     schedule.run(True)
+    close_sink()
+    stats.report(stats_queue)
     exit(0)
 
 
 def _evaluate_frequency(frequency, vars_dict):
-    if isinstance(frequency, str) and "{" in frequency:
-        # Interpolate and then parse
-        freq_str = format_str_payload(vars_dict, frequency)
-        return parse_timedelta_interval(freq_str)
+    # frequencies that depend on variables are compiled by configure_entry_timings()
+    if isinstance(frequency, FrequencyTemplate):
+        return frequency(vars_dict)
     return frequency
 
 
-def _handle_live_job(schedule: sched.scheduler, job: dict, data_sources: dict, handler: Callable):
+def _handle_live_job(schedule: sched.scheduler, job: dict, data_sources: dict, handler: Callable, due: float):
+    job_key = job["id"]
+    debug_log("%s: Running scheduled job", job_key, obj=job)
+    if due >= job["endTime"].timestamp():
+        info_log("%s: Job has completed (past end time)", job_key)
+        return
+    submit_time, vars_dict, next_due = _live_point(job, data_sources, due)
+    if submit_time is not None:
+        handler(submit_time, job, vars_dict)
+    info_log("%s: Next Execution in %.3fs", job_key, next_due - time())
+    # the next run is due at a fixed time, however long this one took
+    schedule.enterabs(next_due, 1, _handle_live_job, (schedule, job, data_sources, handler, next_due))
+
+
+def _live_point(job: dict, data_sources: dict, due: float) -> tuple:
+    """
+    Works out the point of a live entry due at `due` (a POSIX timestamp), according to the catch-up policy
+    when the entry has fallen behind its schedule, i.e. when the point after it is already due as well:
+
+    - `burst`: every point is submitted, one after the other, with its scheduled time
+    - `skip`: the points that are already due are dropped
+    - `coalesce`: a single point is submitted now in place of the points that are already due
+
+    :return tuple: The time and variables of the point to submit (None if dropped), and when the next point is due
+    """
     job_key = job["id"]
-    debug_log(f"{job_key}: Running scheduled job", job)
-    if datetime.now() >= job["endTime"]:
-        info_log(f"{job_key}: Job has completed (past end time)")
+    now = time()
+    stats.observe("scheduler_lag_seconds", job_key, max(0.0, now - due))
+    submit_time = datetime.fromtimestamp(due)
+    vars_dict = expand_entry_variables(job, data_sources, submit_time)
+    next_due = due + _next_interval(job, vars_dict)
+    catch_up = flags.catch_up
+    if next_due > now or catch_up == "burst":
+        return submit_time, vars_dict, next_due
+
+    missed = 1
+    while next_due <= now:
+        next_due += _next_interval(job, vars_dict)
+        missed += 1
+    if catch_up == "coalesce":
+        submit_time = datetime.fromtimestamp(now)
+        vars_dict = expand_entry_variables(job, data_sources, submit_time)
+        missed -= 1
+    else:
+        submit_time = vars_dict = None
+    stats.count("missed_total", job_key, missed)
+    info_log("%s: Running %.3fs behind schedule, %d points missed (%s)", job_key, now - due, missed, catch_up)
+    return submit_time, vars_dict, next_due
+
+
+def _next_interval(job: dict, vars_dict: dict) -> float:
+    return next_timedelta_from_interval(_evaluate_frequency(job["frequency"], vars_dict), job.get("__random__", random)).total_seconds()
+
+
+def _run_batch_jobs(jobs_key: str, entry_key: str, renderer: Callable, submitter: Callable, interleave: bool = False):
+    workers = get_workers()
+    if workers <= 1:
+        # entries are made as they are needed, so that a large matrix does not take up memory all at once
+        _run_batch_entries(_batch_entries(jobs_key, entry_key), renderer, submitter, interleave)
         return
-    now = datetime.now()
-    vars_dict = expand_variables(job.get("variables"), data_sources, now)
-    handler(now, job, vars_dict)
-    
-    current_freq = _evaluate_frequency(job["frequency"], vars_dict)
-    next_time = next_timedelta_from_interval(current_freq)
-    info_log(f"{job_key}: Next Execution in {next_time}")
-    schedule.enter(next_time.total_seconds(), 1, _handle_live_job, (schedule, job, data_sources, handler))
 
+    entry_refs = [
+        (job_idx, *entry_ref)
+        for job_idx, job in enumerate(_config[jobs_key]) if not job["live"]
+        for entry_ref in _entry_refs(job, entry_key)
+    ]
+    # Interleaved entries are split evenly across workers, so that each worker
+    # can still group points from different entries in the same request
+    tasks = workers if interleave else len(entry_refs)
+    pool = _get_pool()
+    for task in range(min(tasks, len(entry_refs))):
+        _pool_futures.append(pool.submit(_run_batch_task, jobs_key, entry_key, renderer, submitter, entry_refs[task::tasks], interleave))
+
+
+def _run_batch_task(jobs_key: str, entry_key: str, renderer: Callable, submitter: Callable, entry_refs: list, interleave: bool):
+    entries = (_job_entry(_config[jobs_key][job_idx], entry_key, entry_idx, cell) for job_idx, entry_idx, cell in entry_refs)
+    _run_batch_entries(entries, renderer, submitter, interleave)
+    # the statistics of the task are in before its result
+    stats.report(_stats_queue)
+
+
+def _run_batch_entries(entries: Iterable, renderer: Callable, submitter: Callable, interleave: bool = False):
+    progresses = []
+    if checkpoint.is_enabled():
+        entries = _with_progress(entries, progresses)
+        submitter = _checkpointed(submitter, progresses)
+    begin_log_batch()
+    begin_metric_buffer()
+    # API calls are throttled by the rate limiter of each API
+    run_pipeline(_batch_timeline(entries, interleave), renderer, submitter, get_queue_size())
+    end_log_batch()
+    end_metric_buffer()
+    checkpoint.save_progress(progresses, done=True)
+    # output files are complete once the batch is done, as workers do not get to clean up when they exit
+    close_sink()
+
+
+def _with_progress(entries: Iterable, progresses: list):
+    # the progress of an entry is only tracked once it starts, and entries that never started start over when resuming
+    for entry in entries:
+        entry["__progress__"] = checkpoint.entry_progress(entry, _config["dataSources"])
+        progresses.append(entry["__progress__"])
+        yield entry
+
+
+def _checkpointed(submitter: Callable, progresses: list) -> Callable:
+    """
+    Wraps a submitter to record the progress of each entry, saving it every `checkpointInterval` seconds.
+    """
+    next_checkpoint = monotonic() + checkpoint.checkpointInterval
+
+    def submit(submit_time: datetime, entry: dict, rendered):
+        nonlocal next_checkpoint
+        submitter(submit_time, entry, rendered)
+        entry["__progress__"].last = submit_time
+        if monotonic() >= next_checkpoint:
+            # points only count as done once they have been written
+            flush_log_batch()
+            flush_metric_buffer()
+            flush_sink()
+            checkpoint.save_progress(progresses)
+            next_checkpoint = monotonic() + checkpoint.checkpointInterval
+
+    return submit
+
+
+def _batch_timeline(entries: Iterable, interleave: bool):
+    if interleave:
+        # Merge the timelines of the entries, up to interleaveMaxEntries at a time, so that points
+        # with the same timestamp are submitted one after the other and can be grouped in the same request
+        entries = iter(entries)
+        while group := list(itertools.islice(entries, interleaveMaxEntries)):
+            yield from heapq.merge(*(_select_timeline(entry) for entry in group), key=itemgetter(0))
+    else:
+        for entry in entries:
+            yield from _select_timeline(entry)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=get_workers(), initializer=_init_worker, initargs=(_config, stats.stats_queue(), _rate_limits))
+    return _pool
+
+
+def _init_worker(config: dict, stats_queue, rate_limits: dict = None):
+    global _config, _stats_queue
+    _config = config
+    _stats_queue = stats_queue
+    if rate_limits is not None:
+        set_process_rate_limits(rate_limits)
+    # every worker has its own clients, and its own stream for random numbers not drawn by an entry
+    random.seed()
+    _setup_clients(config)
+    stats.start_reporting(stats_queue)
+
+
+def wait_batch_jobs():
+    """
+    Waits for the historical jobs submitted to the worker pool, if any, to complete.
+    """
+    global _pool
+    if _pool is None: return
+    try:
+        for future in as_completed(_pool_futures):
+            future.result()
+    finally:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+        _pool_futures.clear()
 
-def _run_batch_jobs(jobs_key: str, entry_key: str, handler: Callable):
+
+def _batch_entries(jobs_key: str, entry_key: str):
     for job in _config[jobs_key]:
         if job["live"]: continue
-        sleep(0.5)
-        job_config = dict(job)
-        del job_config[entry_key]
-        for entry in job[entry_key]:
-            entry = job_config | entry
-            submit_time = entry["startTime"]
-            end_time = entry["endTime"]
-            frequency = entry["frequency"]
-            info_log(f"{entry['id']}: Starting job from {submit_time} to {end_time} every {frequency}")
-            while submit_time < end_time:
-                sleep(0.05) # avoid exceeding burn rate of API
-                vars_dict = expand_variables(entry["variables"], _config["dataSources"], submit_time)
+        for entry_ref in _entry_refs(job, entry_key):
+            yield _job_entry(job, entry_key, *entry_ref)
+
+
+def _entry_refs(job: dict, entry_key: str):
+    # the entries of a job with a matrix are repeated for every combination of the values of its axes, or cell
+    axes = job.get("__matrix__")
+    cells = math.prod(len(values) for _, values in axes) if axes else 0
+    for entry_idx in range(len(job[entry_key])):
+        if not cells:
+            yield entry_idx, None
+        for cell in range(cells):
+            yield entry_idx, cell
+
+
+def _job_entry(job: dict, entry_key: str, entry_idx: int, cell: int = None) -> dict:
+    job_config = dict(job)
+    del job_config[entry_key]
+    entry = job_config | job[entry_key][entry_idx]
+    if cell is not None:
+        _expand_matrix_cell(entry, job["__matrix__"], cell)
+    return entry
+
+
+def _expand_matrix_cell(entry: dict, axes: list, cell: int):
+    """
+    Turns an entry of a job with a matrix into the entry of one cell of the matrix. It shares the compiled
+    templates, frequency and times of the entry, worked out when the configuration was prepared, and gets an id,
+    random number streams and variables of its own, with the values of the axes in the cell as variables.
+    """
+    axis_expanders = []
+    index = cell
+    # the last axis changes from one cell to the next
+    for name, values in reversed(axes):
+        index, value_idx = divmod(index, len(values))
+        axis_expanders.append(ConstantExpander(name, values[value_idx]))
+    axis_expanders.reverse()
+    entry["id"] = f"{entry['id']}[{cell}]"
+    entry["__random__"] = entry_random(entry["id"])
+    entry["__expanders__"] = compile_variables(entry["variables"], _config["dataSources"], entry["id"]) + axis_expanders
+
+
+def _select_timeline(entry: dict):
+    progress = entry.get("__progress__")
+    if progress is not None:
+        if progress.done:
+            return iter(())
+        last = progress.restore(entry)
+        if last is not None:
+            # the points up to the last one submitted are generated again, but not submitted again
+            return (point for point in _new_timeline(entry) if point[0] > last)
+    return _new_timeline(entry)
+
+
+def _new_timeline(entry: dict):
+    if should_vectorize():
+        # lazy import, as numpy is an optional dependency
+        from observability_testing_tool.config import vectorized
+        if not vectorized.is_available():
+            raise RuntimeError("Vectorized mode requires numpy: install it with 'pip install observability-testing-tool[vectorized]'")
+        if vectorized.can_vectorize(entry):
+            if (progress := entry.get("__progress__")) is not None:
+                # resuming goes back to the start of the vectorized timeline
+                progress.mark(entry["startTime"])
+            return vectorized.vectorized_timeline(entry)
+        debug_log("%s: Frequency or variables cannot be vectorized, generating timeline point by point", entry["id"])
+    return _entry_timeline(entry)
+
+
+def _entry_timeline(entry: dict):
+    submit_time = entry["startTime"]
+    end_time = entry["endTime"]
+    frequency = entry["frequency"]
+    rng = entry.get("__random__", random)
+    progress = entry.get("__progress__")
+    points = 0
+    info_log("%s: Starting job from %s to %s every %s", entry["id"], submit_time, end_time, frequency)
+    while submit_time < end_time:
+        if progress is not None and points % checkpoint.markInterval == 0:
+            progress.mark(submit_time)
+        points += 1
+        vars_dict = expand_entry_variables(entry, _config["dataSources"], submit_time)
+
+        yield submit_time, entry, vars_dict
+
+        current_freq = _evaluate_frequency(frequency, vars_dict)
+        submit_time += next_timedelta_from_interval(current_freq, rng)
+
 
-                handler(submit_time, entry, vars_dict)
+def handle_logging_job(submit_time: datetime, job: dict, vars_dict: dict):
+    submit_logging_job(submit_time, job, render_logging_job(submit_time, job, vars_dict))
 
-                current_freq = _evaluate_frequency(frequency, vars_dict)
-                submit_time += next_timedelta_from_interval(current_freq)
 
+def submit_logging_job(submit_time: datetime, job: dict, rendered: tuple):
+    payload_style, severity, payload, kw = rendered
+    submit_log_entry(severity, payload, payloadStyle=payload_style, job_id=job["id"], **kw)
 
-def handle_logging_job(submit_time: datetime, job: dict, vars_dict: dict):
+
+async def handle_logging_job_async(submit_time: datetime, job: dict, vars_dict: dict):
+    payload_style, severity, payload, kw = render_logging_job(submit_time, job, vars_dict)
+    await submit_log_entry_async(severity, payload, payloadStyle=payload_style, job_id=job["id"], **kw)
+
+
+_log_payload_types = {"json": "JSON", "text": "text", "proto": "ProtoBuf"}
+
+
+def render_logging_job(submit_time: datetime, job: dict, vars_dict: dict) -> tuple:
+    started = perf_counter()
     job_key = job["id"]
-    labels = job.get("labels")
-    resource_type = job.get("resourceType")
-    resource_labels = job.get("resourceLabels")
-    other = job.get("other")
-    severity = job.get("level")
-    log_name = job.get("logName")
-    if vars_dict is not None:
-        labels = format_dict_payload(vars_dict, labels)
-        resource_type = format_str_payload(vars_dict, resource_type)
-        resource_labels = format_dict_payload(vars_dict, resource_labels)
-        other = format_dict_payload(vars_dict, other)
-        severity = format_str_payload(vars_dict, severity)
-        log_name = format_str_payload(vars_dict, log_name)
+    templates = job.get("__templates__")
+    if templates is None:
+        templates = compile_templates(job, logging_template_fields)
 
+    log_name = render_template(templates.get("logName"), vars_dict)
+    severity = render_template(templates.get("level"), vars_dict)
     kw = {
         "log_name": log_name,
-        "resource_type": resource_type,
-        "resource_labels": resource_labels,
-        "labels": labels,
-        "other": other,
+        "resource_type": render_template(templates.get("resourceType"), vars_dict),
+        "resource_labels": render_template(templates.get("resourceLabels"), vars_dict),
+        "labels": render_template(templates.get("labels"), vars_dict),
+        "other": render_template(templates.get("other"), vars_dict),
         "when": submit_time
     }
 
-    if job.get("jsonPayload") is not None:
-        log_payload_type = "JSON"
-        if vars_dict is None:
-            payload = job["jsonPayload"]
-        else:
-            payload = format_dict_payload(vars_dict, job["jsonPayload"])
-        submit_log_entry_json(severity, payload, **kw)
-
-    elif job.get("textPayload") is not None:
-        log_payload_type = "text"
-        if vars_dict is None:
-            payload = job["textPayload"]
-        else:
-            payload = format_str_payload(vars_dict, job["textPayload"])
-        submit_log_entry(severity, payload, **kw)
-
-    elif job.get("protoPayload") is not None:
-        log_payload_type = "ProtoBuf"
-        if vars_dict is None:
-            payload = job["protoPayload"]
-        else:
-            payload = format_dict_payload(vars_dict, job["protoPayload"])
-        submit_log_entry_proto(severity, payload, **kw)
-
+    if "jsonPayload" in templates:
+        payload_style = "json"
+        payload = templates["jsonPayload"].render(vars_dict)
+    elif "textPayload" in templates:
+        payload_style = "text"
+        payload = templates["textPayload"].render(vars_dict)
+    elif "protoPayload" in templates:
+        payload_style = "proto"
+        payload = templates["protoPayload"].render(vars_dict)
     else:
         raise ValueError(f"{job_key}: No payload available for log")
 
-    info_log(f"{job_key}: Sending {severity} log to {log_name} with {log_payload_type} payload at {submit_time}", payload)
+    stats.observe("render_seconds", job_key, perf_counter() - started)
+    stats.count("entries_total", job_key)
+    info_log("%s: Sending %s log to %s with %s payload at %s", job_key, severity, log_name, _log_payload_types[payload_style], submit_time, obj=payload)
+    return payload_style, severity, payload, kw
 
 
 def create_metrics_descriptors():
     for metric_descriptor in _config["metricDescriptors"]:
-        sleep(0.01)
-
         project_id = metric_descriptor.get("projectId")
         metric_type = metric_descriptor.get("metricType")
         metric_kind = metric_descriptor.get("metricKind")
@@ -406,7 +552,7 @@ def create_metrics_descriptors():
         if vars_dict is not None:
             project_id = format_str_payload(vars_dict, project_id)
 
-        info_log(f"Metrics Descriptor: Creating {metric_name} ({metric_type}, {metric_kind}, {value_type}) in {project_id}")
+        info_log("Metrics Descriptor: Creating %s (%s, %s, %s) in %s", metric_name, metric_type, metric_kind, value_type, project_id)
         submit_metric_descriptor(
             metric_type, metric_kind, value_type,
             name=metric_name,
@@ -421,6 +567,21 @@ def create_metrics_descriptors():
 
 
 def handle_monitoring_job(submit_time: datetime, job: dict, vars_dict: dict):
+    submit_monitoring_job(submit_time, job, render_monitoring_job(submit_time, job, vars_dict))
+
+
+def submit_monitoring_job(submit_time: datetime, job: dict, rendered: tuple):
+    metric_value, metric_type, kw = rendered
+    submit_gauge_metric(metric_value, metric_type, submit_time, job_id=job["id"], **kw)
+
+
+async def handle_monitoring_job_async(submit_time: datetime, job: dict, vars_dict: dict):
+    metric_value, metric_type, kw = render_monitoring_job(submit_time, job, vars_dict)
+    await submit_gauge_metric_async(metric_value, metric_type, submit_time, job_id=job["id"], **kw)
+
+
+def render_monitoring_job(submit_time: datetime, job: dict, vars_dict: dict) -> tuple:
+    started = perf_counter()
     job_key = job["id"]
     metric_type = job["metricType"]
     if vars_dict is None:
@@ -430,17 +591,21 @@ def handle_monitoring_job(submit_time: datetime, job: dict, vars_dict: dict):
         resource_labels = job.get("resourceLabels")
         project_id = job.get("projectId")
     else:
-        metric_value = float(format_str_payload(vars_dict, job["metricValue"]))
-        metric_labels = format_dict_payload(vars_dict, job.get("metricLabels"))
-        resource_type = format_str_payload(vars_dict, job.get("resourceType"))
-        resource_labels = format_dict_payload(vars_dict, job.get("resourceLabels"))
-        project_id = format_str_payload(vars_dict, job.get("projectId"))
-
-    info_log(f"{job_key}: Sending {metric_type} in {project_id} = {metric_value} at {submit_time}")
-    submit_gauge_metric(
-        metric_value, metric_type, submit_time,
-        project_id=project_id,
-        metric_labels=metric_labels,
-        resource_type=resource_type,
-        resource_labels=resource_labels
-    )
+        templates = job.get("__templates__")
+        if templates is None:
+            templates = compile_templates(job, monitoring_template_fields)
+        metric_value = float(templates["metricValue"].render(vars_dict))
+        metric_labels = render_template(templates.get("metricLabels"), vars_dict)
+        resource_type = render_template(templates.get("resourceType"), vars_dict)
+        resource_labels = render_template(templates.get("resourceLabels"), vars_dict)
+        project_id = render_template(templates.get("projectId"), vars_dict)
+
+    stats.observe("render_seconds", job_key, perf_counter() - started)
+    stats.count("entries_total", job_key)
+    info_log("%s: Sending %s in %s = %s at %s", job_key, metric_type, project_id, metric_value, submit_time)
+    return metric_value, metric_type, {
+        "project_id": project_id,
+        "metric_labels": metric_labels,
+        "resource_type": resource_type,
+        "resource_labels": resource_labels
+    }
@@ -0,0 +1,70 @@
+import asyncio
+from collections.abc import Callable
+from time import time
+
+from observability_testing_tool.config.common import debug_log, info_log
+from observability_testing_tool.config.executor import _live_point, handle_logging_job_async, handle_monitoring_job_async
+
+from observability_testing_tool.obs.sinks import close_sink
+from observability_testing_tool.obs import stats
+from observability_testing_tool.obs.rate_limit import set_process_rate_limits
+from observability_testing_tool.obs.cloud_logging import setup_logging_client_async
+from observability_testing_tool.obs.cloud_monitoring import setup_monitoring_client_async
+
+
+# Upper limit to the submissions waiting for an API response at any one time
+maxInFlight = 1000
+
+
+def run_live_jobs_async(live_config: dict, stats_queue, rate_limits: dict = None):
+    """
+    Runs the live entries of both logging and monitoring jobs in an asyncio event loop.
+
+    Every entry runs as its own task, and each submission is a separate task too,
+    so a slow API call does not hold back the schedule of the same or other entries.
+    """
+    entries = [(entry, handle_logging_job_async) for entry in live_config["logEntries"]]
+    entries += [(entry, handle_monitoring_job_async) for entry in live_config["metricEntries"]]
+    info_log("Live Engine: Running %d entries with asyncio", len(entries))
+    if rate_limits is not None:
+        set_process_rate_limits(rate_limits)
+    stats.start_reporting(stats_queue)
+    asyncio.run(_run_live_entries(entries, live_config))
+    close_sink()
+    stats.report(stats_queue)
+    exit(0)
+
+
+async def _run_live_entries(entries: list, live_config: dict):
+    # the gRPC channels of the clients are bound to the event loop running when they are created
+    # clients are only needed for the kinds of entries that are actually there
+    if live_config["logEntries"]:
+        setup_logging_client_async()
+    if live_config["metricEntries"]:
+        setup_monitoring_client_async()
+    data_sources = live_config["dataSources"]
+    in_flight = asyncio.Semaphore(maxInFlight)
+    # if any task fails, the task group cancels all the others
+    async with asyncio.TaskGroup() as group:
+        for entry, handler in entries:
+            group.create_task(_run_live_entry(entry, data_sources, handler, group, in_flight))
+
+
+async def _run_live_entry(entry: dict, data_sources: dict, handler: Callable, group: asyncio.TaskGroup, in_flight: asyncio.Semaphore):
+    job_key = entry["id"]
+    # the schedule of an entry is a series of absolute times from its start, or from now if that is later
+    due = max(entry["startTime"].timestamp(), time())
+    end = entry["endTime"].timestamp()
+    while due < end:
+        delay = due - time()
+        # let other entries run between the points of an entry catching up in bursts
+        await asyncio.sleep(max(delay, 0))
+        debug_log("%s: Running scheduled job", job_key, obj=entry)
+        submit_time, vars_dict, next_due = _live_point(entry, data_sources, due)
+        if submit_time is not None:
+            await in_flight.acquire()
+            task = group.create_task(handler(submit_time, entry, vars_dict))
+            task.add_done_callback(lambda _: in_flight.release())
+        info_log("%s: Next Execution in %.3fs", job_key, next_due - time())
+        due = next_due
+    info_log("%s: Job has completed (past end time)", job_key)
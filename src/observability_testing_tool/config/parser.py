@@ -2,28 +2,33 @@ import json
 import os
 import random
 import re
+from functools import lru_cache
 from os import getenv
-
-import jsonschema
-import yaml
+from string import Formatter
 
 from datetime import timedelta
 from datetime import datetime
 
-import requests
-from observability_testing_tool.config.common import debug_log, info_log, is_dry_run, is_not_gce, should_skip_schema
+from observability_testing_tool.config.common import debug_log, info_log, flags, should_skip_schema
+from observability_testing_tool.config.variables import compile_variables, entry_random
+from observability_testing_tool.config.templates import compile_templates, logging_template_fields, monitoring_template_fields
 
 _regex_duration = re.compile(r'^ *(-?) *((?P<days>[.\d]+?)d)? *((?P<hours>[.\d]+?)h)? *((?P<minutes>[.\d]+?)m)? *((?P<seconds>[.\d]+?)s)? *((?P<milliseconds>\d+?)ms)? *$')
 
+# Keys of a configuration whose lists are joined together when it is split over several documents
+_list_keys = ["metricDescriptors", "loggingJobs", "monitoringJobs"]
+_job_keys = ["loggingJobs", "monitoringJobs"]
+_json_lines_extensions = (".jsonl", ".ndjson")
+
 _datasource_types = ["env", "list", "random", "gce-metadata", "fixed", "dynamic"]
 _datasource_random_values = ["int", "float"]
 
 
-def next_timedelta_from_interval(interval_or_range) -> timedelta:
+def next_timedelta_from_interval(interval_or_range, rng = random) -> timedelta:
     if isinstance(interval_or_range, timedelta):
         return interval_or_range
     elif isinstance(interval_or_range, dict):
-        rand_num_secs = random.uniform(interval_or_range["from"].total_seconds(), interval_or_range["to"].total_seconds())
+        rand_num_secs = rng.uniform(interval_or_range["from"].total_seconds(), interval_or_range["to"].total_seconds())
         next_frequency = timedelta(seconds=rand_num_secs)
         return next_frequency
     else:
@@ -85,6 +90,8 @@ def parse_timedelta_interval(duration_cfg: str) -> timedelta | dict:
         }
 
 
+# parsed once per distinct string, as the same few intervals come up again and again
+@lru_cache(maxsize=1024)
 def parse_timedelta_value(duration_val: str) -> timedelta:
     """
     Parses a time string (e.g. 2h13m) into a timedelta object.
@@ -104,12 +111,45 @@ def parse_timedelta_value(duration_val: str) -> timedelta:
         return timedelta(**time_params)
 
 
+_duration_units = {"d": "days", "h": "hours", "m": "minutes", "s": "seconds", "ms": "milliseconds"}
+
+
+class FrequencyTemplate:
+    """
+    A frequency that depends on variables (e.g. "{freq}s"), compiled once per entry.
+    Calling it with the variables of a point returns the interval to the next point.
+
+    A single variable followed by a unit is turned into a number of units straight away.
+    Other templates are formatted with the variables and parsed, through the cache of parsed durations.
+    """
+    __slots__ = ("template", "name", "unit")
+
+    def __init__(self, template: str):
+        self.template = template
+        self.name = self.unit = None
+        parts = list(Formatter().parse(template))
+        if len(parts) == 2 and parts[0][0] == "" and parts[0][2] == "" and parts[0][3] is None and parts[0][1].isidentifier() and parts[1][1] is None:
+            unit = _duration_units.get(parts[1][0].strip())
+            if unit is not None:
+                self.name = parts[0][1]
+                self.unit = timedelta(**{unit: 1})
+
+    def __call__(self, vars_dict: dict) -> timedelta | dict:
+        if self.unit is not None:
+            return self.unit * float(vars_dict[self.name])
+        return parse_timedelta_interval(self.template.format(**vars_dict))
+
+    def __repr__(self):
+        return self.template
+
+
 def parse_datetime(datetime_str: str) -> datetime:
     return datetime.fromisoformat(datetime_str)
 
 
 def configure_entry_timings(entry_config: dict, logging_job: dict):
-    current_timestamp = datetime.now() # create now so the default startTime is later than this point
+    # each entry draws its timings from a stream of random numbers of its own, and each of its variables too
+    entry_config["__random__"] = entry_random(entry_config.get("id", ""))
 
     entry_config["frequency"] = entry_config.get("frequency", logging_job.get("frequency"))
 
@@ -121,37 +161,61 @@ def configure_entry_timings(entry_config: dict, logging_job: dict):
     entry_config["startOffset"] = entry_config.get("startOffset", logging_job.get("startOffset"))
     entry_config["endOffset"] = entry_config.get("endOffset", logging_job.get("endOffset"))
 
-    if entry_config.get("startTime") is None and entry_config.get("endTime") is None:
+    if entry_config.get("startOffset") is not None:
+        entry_config["startOffset"] = parse_timedelta_interval(entry_config["startOffset"])
+
+    if entry_config.get("endOffset") is not None:
+        entry_config["endOffset"] = parse_timedelta_interval(entry_config["endOffset"])
+
+    # the times as configured, from which resolve_entry_times() works out the times of every run
+    entry_config["__times__"] = (entry_config["startTime"], entry_config["endTime"], entry_config["frequency"] == "once", logging_job["live"])
+
+    if entry_config["frequency"] == "once":
+        entry_config["frequency"] = "1d"
+
+    if isinstance(entry_config["frequency"], str) and "{" in entry_config["frequency"]:
+        entry_config["frequency"] = FrequencyTemplate(entry_config["frequency"])
+    else:
+        entry_config["frequency"] = parse_timedelta_interval(entry_config["frequency"])
+
+    resolve_entry_times(entry_config)
+
+
+def resolve_entry_times(entry_config: dict):
+    """
+    Works out the start and end times of an entry configured by `configure_entry_timings()`,
+    which are relative to the current time unless both are set, and drawn from the random stream of the entry
+    when the offsets are ranges.
+    """
+    current_timestamp = datetime.now() # create now so the default startTime is later than this point
+    rng = entry_config["__random__"]
+    start_time, end_time, once, live = entry_config["__times__"]
+
+    if start_time is None and end_time is None:
         entry_config["startTime"] = datetime.now()
         entry_config["endTime"] = entry_config["startTime"]
-    elif entry_config.get("startTime") is None:
-        entry_config["endTime"] = parse_datetime(entry_config["endTime"])
+    elif start_time is None:
+        entry_config["endTime"] = parse_datetime(end_time)
         entry_config["startTime"] = entry_config["endTime"]
-    elif entry_config.get("endTime") is None:
-        entry_config["startTime"] = parse_datetime(entry_config["startTime"])
+    elif end_time is None:
+        entry_config["startTime"] = parse_datetime(start_time)
         entry_config["endTime"] = entry_config["startTime"]
     else:
-        entry_config["startTime"] = parse_datetime(entry_config["startTime"])
-        entry_config["endTime"] = parse_datetime(entry_config["endTime"])
+        entry_config["startTime"] = parse_datetime(start_time)
+        entry_config["endTime"] = parse_datetime(end_time)
 
     if entry_config.get("startOffset") is not None:
         entry_config["originalStartTime"] = entry_config["startTime"]
-        entry_config["startOffset"] = parse_timedelta_interval(entry_config["startOffset"])
-        entry_config["startTime"] = entry_config["originalStartTime"] + next_timedelta_from_interval(entry_config["startOffset"])
+        entry_config["startTime"] = entry_config["originalStartTime"] + next_timedelta_from_interval(entry_config["startOffset"], rng)
 
     if entry_config.get("endOffset") is not None:
         entry_config["originalEndTime"] = entry_config["endTime"]
-        entry_config["endOffset"] = parse_timedelta_interval(entry_config["endOffset"])
-        entry_config["endTime"] = entry_config["originalEndTime"] + next_timedelta_from_interval(entry_config["endOffset"])
+        entry_config["endTime"] = entry_config["originalEndTime"] + next_timedelta_from_interval(entry_config["endOffset"], rng)
 
-    if entry_config["frequency"] == "once":
-        entry_config["frequency"] = "1d"
+    if once:
         entry_config["endTime"] = entry_config["startTime"] + timedelta(hours=1)
 
-    if not isinstance(entry_config["frequency"], str) or "{" not in entry_config["frequency"]:
-        entry_config["frequency"] = parse_timedelta_interval(entry_config["frequency"])
-
-    if logging_job["live"] and entry_config["startTime"] < current_timestamp:
+    if live and entry_config["startTime"] < current_timestamp:
         raise ValueError("Live job must start now or later")
 
     if entry_config["startTime"] >= entry_config["endTime"]:
@@ -167,35 +231,118 @@ def _get_variable_name(var_config: dict | str):
         raise ValueError("Variable config must be dict or str")
 
 
-def configure_variables(entry_config: dict, logging_vars: dict):
+def configure_variables(entry_config: dict, logging_vars: dict, data_sources: dict = None):
     # Take the variables in every entry configuration and merge them with the variables in the job configuration
     # Turn the dictionary of variables into a list of variables
     # Updating should make sure no duplicate variables remain in the final list
     entry_vars = {_get_variable_name(var): var for var in entry_config.get("variables", [])}
     entry_vars.update(logging_vars)
     entry_config["variables"] = [var for var in entry_vars.values()]
+    # Compile the variables once, so that emissions do not need to interpret their configuration again
+    if data_sources is not None:
+        entry_config["__expanders__"] = compile_variables(entry_config["variables"], data_sources, entry_config.get("id"))
 
 
-def parse_config(file: str) -> dict:
+@lru_cache(maxsize=1)
+def _schema_validators() -> tuple:
+    """
+    Compiles the validators of the configuration schema once: one for the configuration without its jobs,
+    and one for each kind of job, which are validated one at a time by `prepare_config()`.
+    """
     # join() prepends segments, but if a segment is absolute, all other segments left of it are dropped
     # realpath() resolves symbolic links and .. or . links
     tool_location = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__), '..'))
-    debug_log("Parser: Base directory for tooling", tool_location)
+    debug_log("Parser: Base directory for tooling", obj=tool_location)
+    with open(os.path.join(tool_location, 'config.schema.json')) as schema_file:
+        schema = json.load(schema_file)
+    # imported here, as loading it is a large part of the start-up time
+    import jsonschema
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    job_validators = {}
+    for key in _job_keys:
+        # resolving references is most of the time spent validating a job, so they are resolved once here
+        job_validators[key] = validator_class(_inline_refs(schema["properties"][key]["items"], schema["$defs"]))
+        schema["properties"][key] = {"type": "array"}
+    return validator_class(schema), job_validators
+
+
+def _inline_refs(node, defs: dict):
+    # replaces the references to the definitions of the schema, which do not refer to themselves, with their contents
+    if isinstance(node, list):
+        return [_inline_refs(item, defs) for item in node]
+    if not isinstance(node, dict):
+        return node
+    node = {key: _inline_refs(value, defs) for key, value in node.items()}
+    ref = node.pop("$ref", None)
+    if ref is None:
+        return node
+    target = _inline_refs(defs[ref.removeprefix("#/$defs/")], defs)
+    return {"allOf": [target], **node} if node else target
+
+
+def _load_documents(file):
+    if file.name.endswith(_json_lines_extensions):
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        # imported here, as loading it is a large part of the start-up time
+        import yaml
+        # the libyaml parser is much faster, when PyYAML has been built with it
+        yield from yaml.load_all(file, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def _merge_document(config: dict, document: dict):
+    for key, value in document.items():
+        if key in _list_keys and isinstance(config.get(key), list) and isinstance(value, list):
+            config[key].extend(value)
+        elif isinstance(config.get(key), dict) and isinstance(value, dict):
+            config[key].update(value)
+        else:
+            config[key] = value
+
+
+def parse_config(file: str) -> dict | None:
+    """
+    Reads a configuration file, which may be split over several YAML documents, or be a JSON Lines file
+    with a document per line. The documents are read one at a time and joined together: their lists of
+    jobs and metric descriptors are concatenated, and their data sources are merged.
+
+    The jobs are not validated here, but one at a time by `prepare_config()` with `validate` set.
+    """
     if should_skip_schema():
         info_log("WARNING! Skipping schema validation as requested...")
-    else:
-        with open(os.path.join(tool_location, 'config.schema.json')) as schema_file:
-            schema = json.load(schema_file)
     file = os.path.realpath(os.path.join(os.getcwd(), file))
-    debug_log("Parser: Resolved configuration file", file)
+    debug_log("Parser: Resolved configuration file", obj=file)
+    config = None
     with open(file, 'r') as file:
-        config = yaml.safe_load(file)
-    if not should_skip_schema():
-        jsonschema.validate(config, schema)
+        for index, document in enumerate(_load_documents(file), start=1):
+            if document is None: continue
+            if not isinstance(document, dict):
+                raise ValueError(f"Configuration document {index} is not a mapping")
+            if config is None:
+                config = document
+            else:
+                _merge_document(config, document)
+    if config is not None and not should_skip_schema():
+        _schema_validators()[0].validate(config)
     return config
 
 
-def prepare_config(config: dict):
+def _validate_job(jobs_key: str, job, job_index: int):
+    error = next(_schema_validators()[1][jobs_key].iter_errors(job), None)
+    if error is not None:
+        job_id = job.get("id", f"{job_index:03}") if isinstance(job, dict) else f"{job_index:03}"
+        raise ValueError(f"Invalid job {job_id} in {jobs_key} at {error.json_path}: {error.message}")
+
+
+def prepare_config(config: dict, validate: bool = False):
+    """
+    Prepares a configuration read by `parse_config()` for execution.
+
+    :param validate: Whether to validate each job against the schema before preparing it
+    """
     if config.get("dataSources") is None:
         config["dataSources"] = {}
     if config.get("loggingJobs") is None:
@@ -210,29 +357,56 @@ def prepare_config(config: dict):
 
     config["hasLiveLoggingJobs"] = False
     for job_id, job in enumerate(config["loggingJobs"], start=1):
+        if validate:
+            _validate_job("loggingJobs", job, job_id)
         temp_id = job.get("id", f"{job_id:03}")
         job["id"] = f"log#{temp_id}"
-        if configure_logging_job(job) and not config.get("hasLiveLoggingJobs"):
+        if configure_logging_job(job, config["dataSources"]) and not config.get("hasLiveLoggingJobs"):
             config["hasLiveLoggingJobs"] = True
 
     config["hasLiveMonitoringJobs"] = False
     for job_id, job in enumerate(config["monitoringJobs"], start=1):
+        if validate:
+            _validate_job("monitoringJobs", job, job_id)
         temp_id = job.get("id", f"{job_id:03}")
         job["id"] = f"mon#{temp_id}"
-        if configure_monitoring_job(job) and not config.get("hasLiveMonitoringJobs"):
+        if configure_monitoring_job(job, config["dataSources"]) and not config.get("hasLiveMonitoringJobs"):
             config["hasLiveMonitoringJobs"] = True
 
 
+def refresh_config(config: dict):
+    """
+    Brings a configuration prepared by `prepare_config()` in an earlier run up to date, e.g. when it is read from
+    the cache: the values of environment variables and GCE metadata are read again, and every entry gets new
+    times and a new random number stream, with its variables compiled against them.
+    """
+    data_sources = config["dataSources"]
+    for data_source in data_sources.values():
+        match data_source["sourceType"]:
+            case "env":
+                data_source["__value__"] = getenv(data_source["value"])
+            case "gce-metadata":
+                data_source["__value__"] = get_gce_metadata(data_source["value"])
+
+    for jobs_key, entries_key in (("loggingJobs", "logEntries"), ("monitoringJobs", "metricEntries")):
+        for job in config[jobs_key]:
+            for entry in job[entries_key]:
+                entry["__random__"] = entry_random(entry["id"])
+                resolve_entry_times(entry)
+                entry["__expanders__"] = compile_variables(entry["variables"], data_sources, entry["id"])
+
+
 def get_gce_metadata(metadata_key: str) -> str:
     # This will only work from inside a GCE instance
     # See https://cloud.google.com/compute/docs/metadata/predefined-metadata-keys
-    if is_not_gce() or is_dry_run(): return "NA"
+    if flags.not_gce or flags.dry_run: return "NA"
     metadata_server = "http://metadata.google.internal/computeMetadata/v1/"
     metadata_flavor = {"Metadata-Flavor" : "Google"}
+    import requests
     return requests.get(metadata_server + metadata_key, headers = metadata_flavor).text
 
 
-def configure_logging_job(logging_job: dict):
+def configure_logging_job(logging_job: dict, data_sources: dict = None):
     logging_job["live"] = isinstance(logging_job.get("live"), bool) and logging_job["live"] == True
 
     if logging_job.get("logEntries") is None:
@@ -246,12 +420,16 @@ def configure_logging_job(logging_job: dict):
         logging_job["variables"] = []
 
     logging_job_vars = {_get_variable_name(var): var for var in logging_job["variables"]}
+    # templates of the job are compiled once and shared by all entries that do not override them
+    logging_job_templates = compile_templates(logging_job, logging_template_fields)
+    configure_matrix(logging_job, data_sources)
 
     for logging_entry_id, logging_entry in enumerate(logging_job["logEntries"], start=1):
         temp_id = logging_entry.get("id", f"{logging_entry_id:03}")
         logging_entry["id"] = f"{logging_job["id"]}/{temp_id}"
         configure_entry_timings(logging_entry, logging_job)
-        configure_variables(logging_entry, logging_job_vars)
+        configure_variables(logging_entry, logging_job_vars, data_sources)
+        logging_entry["__templates__"] = compile_templates(logging_entry, logging_template_fields, logging_job_templates)
 
     del logging_job["variables"]
     del logging_job_vars
@@ -259,7 +437,7 @@ def configure_logging_job(logging_job: dict):
     return logging_job["live"]
 
 
-def configure_monitoring_job(monitoring_job: dict):
+def configure_monitoring_job(monitoring_job: dict, data_sources: dict = None):
     monitoring_job["live"] = isinstance(monitoring_job.get("live"), bool) and monitoring_job["live"] == True
 
     if monitoring_job.get("metricEntries") is None:
@@ -273,12 +451,16 @@ def configure_monitoring_job(monitoring_job: dict):
         monitoring_job["variables"] = []
 
     monitoring_job_vars = {_get_variable_name(var): var for var in monitoring_job["variables"]}
+    # templates of the job are compiled once and shared by all entries that do not override them
+    monitoring_job_templates = compile_templates(monitoring_job, monitoring_template_fields)
+    configure_matrix(monitoring_job, data_sources)
 
     for metric_entry_id, metric_entry in enumerate(monitoring_job["metricEntries"], start=1):
         temp_id = metric_entry.get("id", f"{metric_entry_id:03}")
         metric_entry["id"] = f"{monitoring_job["id"]}/{temp_id}"
         configure_entry_timings(metric_entry, monitoring_job)
-        configure_variables(metric_entry, monitoring_job_vars)
+        configure_variables(metric_entry, monitoring_job_vars, data_sources)
+        metric_entry["__templates__"] = compile_templates(metric_entry, monitoring_template_fields, monitoring_job_templates)
 
     del monitoring_job["variables"]
     del monitoring_job_vars
@@ -286,6 +468,36 @@ def configure_monitoring_job(monitoring_job: dict):
     return monitoring_job["live"]
 
 
+def configure_matrix(job: dict, data_sources: dict = None):
+    """
+    Compiles the axes of the matrix of a job, if it has one, into a list of names and values. Every entry
+    of the job is expanded for each combination of the values by the executor, one at a time, as it runs.
+    Integer ranges are kept as `range` objects, so that the size of the matrix does not take up any memory.
+    """
+    matrix = job.get("matrix")
+    if matrix is None: return
+    axes = []
+    for name, axis in matrix.items():
+        if isinstance(axis, list):
+            values = axis
+        elif isinstance(axis, dict) and axis.get("range") is not None:
+            int_range = parse_int_range(str(axis["range"]))
+            values = range(int_range["from"], int_range["to"], int_range.get("step", 1))
+        elif isinstance(axis, dict) and axis.get("dataSource") is not None:
+            data_source = (data_sources or {}).get(axis["dataSource"])
+            if data_source is None:
+                raise ValueError(f"Data source for matrix axis '{name}' does not exist")
+            if data_source["sourceType"] not in ["list", "fixed"]:
+                raise ValueError(f"Data source for matrix axis '{name}' must be a 'list' or 'fixed' data source")
+            values = data_source["value"] if isinstance(data_source["value"], list) else [data_source["value"]]
+        else:
+            raise ValueError(f"Matrix axis '{name}' must be a list of values, a range or a data source")
+        if len(values) == 0:
+            raise ValueError(f"Matrix axis '{name}' has no values")
+        axes.append((name, values))
+    job["__matrix__"] = axes
+
+
 def configure_data_source(data_source: dict):
     data_source_type = data_source.get("sourceType")
     if data_source_type is None or data_source_type not in _datasource_types:
@@ -0,0 +1,104 @@
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from queue import Queue, Full
+
+
+# Items are handed over between threads in chunks, as every queue operation takes a lock
+chunkSize = 256
+
+_done = object()
+
+
+class _StageError:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(queue: Queue, item, stop: threading.Event) -> bool:
+    # waits for room in the queue, giving up if the consumer has gone away
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=0.1)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def buffered(items: Iterable, maxsize: int) -> Iterator:
+    """
+    Iterates over `items` in a background thread, handing the values over through a bounded queue.
+
+    The thread runs ahead of the consumer by at most `maxsize` items (rounded up to whole chunks),
+    then blocks until the consumer catches up. Errors raised by `items` are raised again in the
+    consumer. With a `maxsize` of 0, `items` are iterated over in the calling thread.
+    """
+    if maxsize <= 0:
+        yield from items
+        return
+
+    chunk_size = min(chunkSize, maxsize)
+    queue = Queue(max(1, maxsize // chunk_size))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            chunk = []
+            for item in items:
+                chunk.append(item)
+                if len(chunk) >= chunk_size:
+                    if not _put(queue, chunk, stop): return
+                    chunk = []
+            if chunk and not _put(queue, chunk, stop): return
+            _put(queue, _done, stop)
+        except BaseException as e:
+            _put(queue, _StageError(e), stop)
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while (chunk := queue.get()) is not _done:
+            if isinstance(chunk, _StageError):
+                raise chunk.error
+            yield from chunk
+    finally:
+        stop.set()
+        thread.join()
+
+
+def render_stage(points: Iterable, renderer: Callable) -> Iterator:
+    """
+    Renders the `(submit_time, entry, vars_dict)` points of a timeline into `(submit_time, entry, rendered)` items.
+    """
+    for submit_time, entry, vars_dict in points:
+        yield submit_time, entry, renderer(submit_time, entry, vars_dict)
+
+
+def sink_stage(items: Iterable, submitter: Callable):
+    for submit_time, entry, rendered in items:
+        submitter(submit_time, entry, rendered)
+
+
+def run_pipeline(points: Iterable, renderer: Callable, submitter: Callable, queue_size: int):
+    """
+    Runs the stages of a batch job: the timeline (which expands the variables of each point),
+    the rendering of the payloads, and the sink submitting them to the APIs.
+
+    Each stage before the sink runs in its own thread, connected to the next one by a queue
+    of up to `queue_size` items, so that generation can run ahead of slow API calls
+    without holding the whole timeline in memory.
+    """
+    points = buffered(points, queue_size)
+    rendered = buffered(render_stage(points, renderer), queue_size)
+    try:
+        sink_stage(rendered, submitter)
+    finally:
+        # stops the threads of the stages if the sink gave up early, the rendering first as it consumes the points
+        rendered.close()
+        points.close()
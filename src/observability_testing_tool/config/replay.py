@@ -0,0 +1,170 @@
+import json
+import mmap
+import re
+from os import environ, fstat
+from time import monotonic, sleep, time_ns
+
+from google.cloud import monitoring_v3
+from google.protobuf.json_format import ParseDict
+from google.protobuf.timestamp_pb2 import Timestamp
+
+from observability_testing_tool.config.common import info_log, debug_log
+from observability_testing_tool.obs.sinks import close_sink, _import_pyarrow
+from observability_testing_tool.obs.cloud_logging import setup_logging_client, submit_log_entry_repr, begin_log_batch, end_log_batch, flush_log_batch
+from observability_testing_tool.obs.cloud_monitoring import setup_monitoring_client, submit_time_series, begin_metric_buffer, end_metric_buffer, flush_metric_buffer
+
+
+# Pending batches are sent before waiting this long or longer for the next record,
+# so that a paced replay does not hold entries back until a batch is full
+flushBeforeWait = 1.0
+
+_regex_logname_project = re.compile(r"^projects/[^/]+/")
+
+
+class ReplayClock:
+    """
+    Paces the records of a replay by their timestamps, `speed` times faster than they were
+    generated (as fast as possible if `speed` is None), and works out how much the timestamps
+    must be shifted so that the first record is at the start of the replay, if `rebase` is set.
+    """
+
+    def __init__(self, speed: float | None = None, rebase: bool = False):
+        self.speed = speed
+        self.rebase = rebase
+        self.first_ns = None
+        self.start = None
+        self.offset_ns = 0
+
+    def wait_time(self, record_ns: int) -> float:
+        """
+        Returns how long to wait, in seconds, before submitting a record with the given timestamp.
+        """
+        if self.first_ns is None:
+            self.first_ns = record_ns
+            self.start = monotonic()
+            if self.rebase:
+                self.offset_ns = time_ns() - record_ns
+        if self.speed is None:
+            return 0.0
+        return (record_ns - self.first_ns) / 1e9 / self.speed - (monotonic() - self.start)
+
+
+def read_records(file_name: str):
+    """
+    Reads the records of a file written with `--output`. NDJSON and Arrow IPC files are
+    memory-mapped, while Parquet files are read one row group at a time.
+    """
+    if file_name.endswith(".parquet"):
+        _import_pyarrow()
+        from pyarrow import parquet
+        for batch in parquet.ParquetFile(file_name).iter_batches(columns=["record"]):
+            for text in batch.column(0).to_pylist():
+                yield json.loads(text)
+    elif file_name.endswith(".arrow"):
+        pyarrow = _import_pyarrow()
+        with pyarrow.memory_map(file_name) as source:
+            reader = pyarrow.ipc.open_file(source)
+            for batch_idx in range(reader.num_record_batches):
+                for text in reader.get_batch(batch_idx).column("record").to_pylist():
+                    yield json.loads(text)
+    else:
+        with open(file_name, "rb") as file:
+            # empty files cannot be memory-mapped
+            if fstat(file.fileno()).st_size == 0: return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for line in iter(mapped.readline, b""):
+                    if line.strip():
+                        yield json.loads(line)
+
+
+def _timestamp_ns(timestamp: str) -> int:
+    ts = Timestamp()
+    ts.FromJsonString(timestamp)
+    return ts.ToNanoseconds()
+
+
+def _shift_timestamp(ts: Timestamp, offset_ns: int):
+    ts.FromNanoseconds(ts.ToNanoseconds() + offset_ns)
+
+
+def _log_entry(record: dict, offset_ns: int, project: str | None) -> dict:
+    if offset_ns and "timestamp" in record:
+        ts = Timestamp()
+        ts.FromJsonString(record["timestamp"])
+        _shift_timestamp(ts, offset_ns)
+        record["timestamp"] = ts.ToJsonString()
+    if project is not None and "logName" in record:
+        record["logName"] = _regex_logname_project.sub(f"projects/{project}/", record["logName"])
+    return record
+
+
+def _time_series(record: dict, offset_ns: int, project: str | None) -> tuple:
+    project_name = record.pop("name", None)
+    if project is not None or project_name is None:
+        project_name = f"projects/{project if project is not None else environ.get('GOOGLE_CLOUD_PROJECT')}"
+    series_pb = monitoring_v3.TimeSeries.pb(monitoring_v3.TimeSeries())
+    ParseDict(record, series_pb)
+    if offset_ns:
+        for point in series_pb.points:
+            _shift_timestamp(point.interval.end_time, offset_ns)
+            if point.interval.HasField("start_time"):
+                _shift_timestamp(point.interval.start_time, offset_ns)
+    return project_name, monitoring_v3.TimeSeries.wrap(series_pb)
+
+
+def _record_time(record: dict, is_metric: bool) -> str | None:
+    if is_metric:
+        points = record.get("points")
+        return points[0]["interval"].get("endTime") if points else None
+    return record.get("timestamp")
+
+
+def replay(files: list, speed: float | None = None, rebase: bool = False, project: str = None):
+    """
+    Submits the log entries and time series in files written with `--output`, in file order.
+
+    Records go through the same batch and buffer paths as historical jobs, without expanding
+    variables or rendering templates again.
+
+    :param files: The NDJSON, Parquet or Arrow IPC files to replay
+    :param speed: How many times faster than the original timeline to replay, or None for no pacing
+    :param rebase: Shift all timestamps so that the first record is at the start of the replay
+    :param project: Project to send all records to, instead of the ones in the records
+    """
+    if project is not None:
+        environ["GOOGLE_CLOUD_PROJECT"] = project
+    clock = ReplayClock(speed, rebase)
+    counts = {"logs": 0, "metrics": 0}
+    begin_log_batch()
+    begin_metric_buffer()
+    for file_name in files:
+        info_log("Replay: Reading %s", file_name)
+        for record in read_records(file_name):
+            is_metric = "points" in record
+            kind = "metrics" if is_metric else "logs"
+            if counts[kind] == 0:
+                # clients are only needed for the kinds of records that are actually there
+                if is_metric:
+                    setup_monitoring_client()
+                else:
+                    setup_logging_client()
+
+            record_time = _record_time(record, is_metric)
+            if record_time is not None:
+                wait = clock.wait_time(_timestamp_ns(record_time))
+                if wait > 0:
+                    if wait >= flushBeforeWait:
+                        flush_log_batch()
+                        flush_metric_buffer()
+                    sleep(wait)
+
+            if is_metric:
+                submit_time_series(*_time_series(record, clock.offset_ns, project))
+            else:
+                submit_log_entry_repr(_log_entry(record, clock.offset_ns, project))
+            counts[kind] += 1
+        debug_log("Replay: Done with %s", file_name)
+    end_log_batch()
+    end_metric_buffer()
+    close_sink()
+    info_log("Replay: Submitted %d log entries and %d time series", counts["logs"], counts["metrics"])
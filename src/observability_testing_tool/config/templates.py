@@ -0,0 +1,123 @@
+from string import Formatter
+
+_formatter = Formatter()
+
+# Fields of an entry that can contain {variable} placeholders
+logging_template_fields = ["labels", "resourceType", "resourceLabels", "other", "level", "logName", "jsonPayload", "textPayload", "protoPayload"]
+monitoring_template_fields = ["metricValue", "metricLabels", "resourceType", "resourceLabels", "projectId"]
+
+
+class StaticTemplate:
+    """
+    A value without placeholders, which is shared by every rendering.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def render(self, vars_dict: dict | None):
+        return self.value
+
+    def __repr__(self):
+        return f"StaticTemplate({self.value!r})"
+
+
+class StrTemplate:
+    """
+    A string with placeholders, rendered with `str.format()`.
+    """
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def render(self, vars_dict: dict | None):
+        if vars_dict is None: return self.text
+        return self.text.format_map(vars_dict)
+
+    def __repr__(self):
+        return f"StrTemplate({self.text!r})"
+
+
+class DictTemplate:
+    """
+    A dictionary where only the values with placeholders (the slots) are rendered.
+    The rest of the dictionary is shared by every rendering.
+    """
+    __slots__ = ("static", "slots", "source")
+
+    def __init__(self, static: dict, slots: list, source: dict):
+        self.static = static
+        self.slots = slots
+        self.source = source
+
+    def render(self, vars_dict: dict | None):
+        if vars_dict is None: return self.source
+        rendered = self.static.copy()
+        for key, template in self.slots:
+            rendered[key] = template.render(vars_dict)
+        return rendered
+
+    def __repr__(self):
+        return f"DictTemplate({self.source!r})"
+
+
+def _has_placeholders(text: str) -> bool:
+    return any(field_name is not None for _, field_name, _, _ in _formatter.parse(text))
+
+
+def _unescape(text: str) -> str:
+    # turns {{ and }} into { and }, as str.format() would
+    return "".join(literal for literal, _, _, _ in _formatter.parse(text))
+
+
+def compile_template(value) -> StaticTemplate | StrTemplate | DictTemplate:
+    """
+    Compiles a payload value into a template that renders only the parts with placeholders.
+
+    As with `format_dict_payload()`, strings are formatted, dictionaries are
+    rendered recursively, and any other value (including lists) is left as it is.
+
+    :param value: A string, a dictionary, or any other payload value
+    :return: An object with a `render(vars_dict)` method
+    """
+    if isinstance(value, str):
+        if _has_placeholders(value):
+            return StrTemplate(value)
+        return StaticTemplate(_unescape(value))
+    elif isinstance(value, dict):
+        static = {}
+        slots = []
+        for key, item in value.items():
+            template = compile_template(item)
+            if isinstance(template, StaticTemplate):
+                static[key] = template.value
+            else:
+                slots.append((key, template))
+        if not slots:
+            return StaticTemplate(static)
+        return DictTemplate(static, slots, value)
+    else:
+        return StaticTemplate(value)
+
+
+def compile_templates(config: dict, fields: list, inherited: dict = None) -> dict:
+    """
+    Compiles the given fields of a job or entry configuration into templates.
+
+    Templates in `inherited` (e.g. those of the job) are kept, unless the configuration overrides them.
+    """
+    templates = dict(inherited) if inherited is not None else {}
+    for field in fields:
+        if field not in config: continue
+        if config[field] is None:
+            templates.pop(field, None)
+        else:
+            templates[field] = compile_template(config[field])
+    return templates
+
+
+def render_template(template, vars_dict: dict | None):
+    if template is None: return None
+    return template.render(vars_dict)
@@ -0,0 +1,309 @@
+import hashlib
+import math
+import random
+import re
+from datetime import datetime
+
+from observability_testing_tool.config.common import flags, error_log
+
+
+def entry_seed(key: str) -> int | None:
+    """
+    Derives the seed of the random number stream of `key`, such as the id of an entry, from `--seed`.
+    Streams only depend on the seed and their key, so the same entry gets the same numbers
+    however the work of a run is split between processes.
+
+    :return int: The seed of the stream, or None if no seed is set
+    """
+    if flags.seed is None: return None
+    digest = hashlib.sha256(f"{flags.seed}/{key}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def entry_random(key: str) -> random.Random:
+    # without a seed, the stream is seeded from the operating system, so that no two processes share one
+    return random.Random(entry_seed(key))
+
+
+def expand_list_variable(selector, value, rng = random):
+    # TODO selector chooses item, range allows to limit values that selector acts on
+    # E.g. range: None, selector: any = random value from full list
+    # E.g. range: 5-9, selector: any = random value from sublist/slice
+    # E.g. range: None, selector: all = the full list
+    # E.g. range: 5-9, selector: all = the entire sublist/slice
+    # In this case range would have to be ALSO at the variable level, used for a list
+
+    if selector == "any":
+        return rng.choice(value)
+    elif selector == "first":
+        return value[0]
+    elif selector == "last":
+        return value[-1]
+    elif selector == "all":
+        return value
+    else:
+        try:
+            return value[int(selector)]
+        except ValueError:
+            raise ValueError(f"Variable '{value}' uses an invalid list selector '{selector}'")
+
+
+class ConstantExpander:
+    """Values that do not change between emissions: env, gce-metadata, fixed, and fixed list selectors."""
+    __slots__ = ("name", "value")
+
+    def __init__(self, name: str, value):
+        self.name = name
+        self.value = value
+
+    def __call__(self, submit_time: datetime | None):
+        return self.value
+
+
+class ListAnyExpander:
+    __slots__ = ("name", "values", "rng")
+
+    def __init__(self, name: str, values: list, rng = random):
+        self.name = name
+        self.values = values
+        self.rng = rng
+
+    def __call__(self, submit_time: datetime | None):
+        return self.rng.choice(self.values)
+
+
+class RandomIntExpander:
+    __slots__ = ("name", "start", "stop", "step", "rng")
+
+    def __init__(self, name: str, rand_range: dict, rng = random):
+        self.name = name
+        self.start = rand_range.get("from", 0)
+        self.stop = rand_range.get("to", 2147483647)
+        self.step = rand_range.get("step", 1)
+        self.rng = rng
+
+    def __call__(self, submit_time: datetime | None):
+        return self.rng.randrange(self.start, self.stop, self.step)
+
+
+class RandomFloatExpander:
+    __slots__ = ("name", "start", "end", "rng")
+
+    def __init__(self, name: str, rand_range: dict, rng = random):
+        self.name = name
+        self.start = rand_range.get("from", 0.0)
+        self.end = rand_range.get("to", 2147483647.0)
+        self.rng = rng
+
+    def __call__(self, submit_time: datetime | None):
+        return self.rng.uniform(self.start, self.end)
+
+
+class DynamicExpander:
+    """
+    Base class of the `dynamic` formulas. The reference start time (`__t0__`) is kept in the state of
+    the data source in the entry, so it is shared by the variables of the entry that use the data source,
+    but not by other entries, whichever process they run in. Variables compiled without an entry keep it
+    in the data source itself, so it carries on from one call of `expand_variables()` to the next.
+    """
+    __slots__ = ("name", "data_source", "state")
+
+    def __init__(self, name: str, data_source: dict, state: dict = None):
+        self.name = name
+        self.data_source = data_source
+        self.state = state if state is not None else {}
+
+    def elapsed(self, submit_time: datetime | None) -> float:
+        now_dt = submit_time if submit_time else datetime.now()
+        t0 = self.state.get("__t0__")
+        if t0 is None:
+            self.state["__t0__"] = now_dt
+            return 0.0
+        return (now_dt - t0).total_seconds()
+
+
+class LinearExpander(DynamicExpander):
+    __slots__ = ("slope", "intercept")
+
+    def __init__(self, name: str, data_source: dict, state: dict = None):
+        super().__init__(name, data_source, state)
+        self.slope = float(data_source.get("slope", 1.0))
+        self.intercept = float(data_source.get("intercept", 0.0))
+
+    def __call__(self, submit_time: datetime | None):
+        return self.slope * self.elapsed(submit_time) + self.intercept
+
+
+class ExponentialExpander(DynamicExpander):
+    __slots__ = ("base", "rate")
+
+    def __init__(self, name: str, data_source: dict, state: dict = None):
+        super().__init__(name, data_source, state)
+        self.base = float(data_source.get("base", 1.0))
+        self.rate = float(data_source.get("factor", 1.0))
+
+    def __call__(self, submit_time: datetime | None):
+        # value = base * exp(rate * t)
+        return self.base * math.exp(self.rate * self.elapsed(submit_time))
+
+
+class SinusoidalExpander(DynamicExpander):
+    __slots__ = ("base", "amplitude", "period", "phase")
+
+    def __init__(self, name: str, data_source: dict, state: dict = None):
+        super().__init__(name, data_source, state)
+        self.base = float(data_source.get("base", 0.0))
+        self.amplitude = float(data_source.get("amplitude", 1.0))
+        period = float(data_source.get("period", 60.0))
+        # avoid division by zero
+        self.period = period if period != 0 else 1.0
+        self.phase = float(data_source.get("phase", 0.0))
+
+    def __call__(self, submit_time: datetime | None):
+        # value = base + amplitude * sin(2 * pi * t / period + phase)
+        return self.base + self.amplitude * math.sin(2 * math.pi * self.elapsed(submit_time) / self.period + self.phase)
+
+
+class BackoffExpander(DynamicExpander):
+    __slots__ = ("base", "factor")
+
+    def __init__(self, name: str, data_source: dict, state: dict = None):
+        super().__init__(name, data_source, state)
+        self.base = float(data_source.get("base", 1.0))
+        self.factor = float(data_source.get("factor", 2.0))
+
+    def __call__(self, submit_time: datetime | None):
+        # value = base * (factor ^ attempt)
+        counter = self.state.get("__counter__", 0)
+        self.state["__counter__"] = counter + 1
+        return self.base * math.pow(self.factor, counter)
+
+
+class IndexedExpander:
+    """Picks an item from the JSON object or array returned by another expander."""
+    __slots__ = ("name", "expander", "index")
+
+    def __init__(self, expander, index):
+        self.name = expander.name
+        self.expander = expander
+        self.index = index
+
+    def __call__(self, submit_time: datetime | None):
+        return self.apply(self.expander(submit_time))
+
+    def apply(self, expanded_value):
+        if not isinstance(expanded_value, dict) and not isinstance(expanded_value, list):
+            error_log("Could not get indexed value from '%s' in variable '%s' with index '%s'", expanded_value, self.name, self.index, obj="Make sure the value is a JSON object or array")
+            return expanded_value
+        return expanded_value[self.index]
+
+
+class ExtractedExpander:
+    """Extracts the first group of a regular expression from the value returned by another expander."""
+    __slots__ = ("name", "expander", "extractor")
+
+    def __init__(self, expander, extractor: str):
+        self.name = expander.name
+        self.expander = expander
+        self.extractor = re.compile(extractor)
+
+    def __call__(self, submit_time: datetime | None):
+        return self.apply(self.expander(submit_time))
+
+    def apply(self, expanded_value):
+        if not isinstance(expanded_value, str):
+            expanded_value = str(expanded_value)
+        matches = self.extractor.search(expanded_value)
+        if matches is None or matches.group(1) is None:
+            error_log("Could not extract from '%s' in variable '%s' with regex '%s'", expanded_value, self.name, self.extractor.pattern, obj="Did you include a group in the regex?")
+            return expanded_value
+        return matches.group(1)
+
+
+_dynamic_expanders = {
+    "linear": LinearExpander,
+    "exponential": ExponentialExpander,
+    "sinusoidal": SinusoidalExpander,
+    "backoff": BackoffExpander
+}
+
+
+def compile_variable(idx: int, var_config: dict | str, data_sources: dict, key: str = None, states: dict = None):
+    if isinstance(var_config, str):
+        data_source_name = var_config
+        var_name = var_config
+        var_config = {} # so it does not fail when looking up the config further down, e.g. var_config.get("extractor")
+    elif isinstance(var_config, dict):
+        var_name = var_config["name"]
+        data_source_name = var_config.get("dataSource", var_name)
+    else:
+        raise ValueError(f"Variable {idx} is not configured correctly")
+    data_source = data_sources.get(data_source_name)
+    if data_source is None:
+        raise ValueError(f"Data source for '{var_name}' does not exist")
+
+    data_source_value = data_source.get("value")
+    # every variable drawing random numbers has a stream of its own, so that the values of a variable
+    # do not depend on how many numbers the other variables, or the frequency, draw
+    rng = entry_random(f"{key}/{var_name}") if key is not None and data_source["sourceType"] in ("list", "random") else random
+    match data_source["sourceType"]:
+        case "list":
+            var_list_selector = var_config.get("selector", "any")
+            if var_list_selector == "any":
+                expander = ListAnyExpander(var_name, data_source_value, rng)
+            else:
+                expander = ConstantExpander(var_name, expand_list_variable(var_list_selector, data_source_value, rng))
+        case "random":
+            if data_source_value == "int":
+                expander = RandomIntExpander(var_name, data_source["range"], rng)
+            elif data_source_value == "float":
+                expander = RandomFloatExpander(var_name, data_source["range"], rng)
+            else:
+                return None
+        case "env" | "gce-metadata":
+            expander = ConstantExpander(var_name, data_source["__value__"])
+        case "fixed":
+            # This type is mostly needed for testing and debugging
+            expander = ConstantExpander(var_name, data_source_value)
+        case "dynamic":
+            expander_class = _dynamic_expanders.get(data_source.get("formula", "linear"), LinearExpander)
+            state = states.setdefault(data_source_name, {}) if states is not None else data_source
+            expander = expander_class(var_name, data_source, state)
+        case _:
+            return None
+
+    var_index = var_config.get("index")
+    if var_index is not None:
+        expander = IndexedExpander(expander, var_index)
+
+    var_extractor = var_config.get("extractor")
+    if var_extractor is not None:
+        expander = ExtractedExpander(expander, var_extractor)
+
+    return expander
+
+
+def compile_variables(variables: list, data_sources: dict, key: str = None) -> list:
+    """
+    Compiles the variables of an entry into a list of expanders, so that each emission
+    only needs to call them, without looking up data sources or configuration again.
+
+    :param variables: The list of variables of the entry, as names or dictionaries
+    :param data_sources: The data sources of the configuration
+    :param key: The id of the entry, from which the random number stream of each variable is derived with
+        `entry_random()`, and which keeps the state of the dynamic data sources it uses. Without it, variables
+        draw from the random number stream of the process, and dynamic data sources keep their own state
+    :return list: A list of callables, each with a `name` attribute, returning the value of the variable
+    """
+    expanders = []
+    # the state of the dynamic data sources used by the entry
+    states = {} if key is not None else None
+    for idx, var_config in enumerate(variables, start=1):
+        expander = compile_variable(idx, var_config, data_sources, key, states)
+        if expander is not None:
+            expanders.append(expander)
+    return expanders
+
+
+def run_expanders(expanders: list, submit_time: datetime = None) -> dict:
+    return {expander.name: expander(submit_time) for expander in expanders}
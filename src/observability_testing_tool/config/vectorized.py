@@ -0,0 +1,240 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from observability_testing_tool.config.common import info_log
+from observability_testing_tool.config.variables import (
+    ConstantExpander, ListAnyExpander, RandomIntExpander, RandomFloatExpander,
+    LinearExpander, ExponentialExpander, SinusoidalExpander, BackoffExpander,
+    IndexedExpander, ExtractedExpander
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Number of points generated in one pass, which bounds the memory used by the arrays
+chunkSize = 10000
+
+_one_microsecond = timedelta(microseconds=1)
+_epoch = datetime(1970, 1, 1)
+_utc_epoch = _epoch.replace(tzinfo=timezone.utc)
+
+
+def is_available() -> bool:
+    return np is not None
+
+
+def _unwrap(expander):
+    while isinstance(expander, (IndexedExpander, ExtractedExpander)):
+        expander = expander.expander
+    return expander
+
+
+class RandomStream:
+    """
+    Draws the numbers of a random number stream of the entry (a `random.Random`) with NumPy, from a
+    Mersenne Twister with the same state, so that they are the same as when drawn point by point.
+    """
+
+    def __init__(self, rng):
+        version, internal_state, gauss_next = rng.getstate()
+        self.bit_generator = np.random.MT19937()
+        self.bit_generator.state = {
+            "bit_generator": "MT19937",
+            "state": {"key": np.array(internal_state[:-1], dtype=np.uint32), "pos": internal_state[-1]}
+        }
+        # outputs drawn but not used yet
+        self.pending = np.empty(0, dtype=np.uint64)
+
+    def _outputs(self, count: int):
+        # the next 32-bit outputs of the stream
+        outputs = np.concatenate((self.pending, self.bit_generator.random_raw(max(count - len(self.pending), 0))))
+        self.pending = outputs[count:]
+        return outputs[:count]
+
+    def random(self, count: int):
+        # as random.random(), from the top 53 bits of two outputs
+        outputs = self._outputs(2 * count)
+        return ((outputs[0::2] >> 5) * 67108864.0 + (outputs[1::2] >> 6)) / 9007199254740992.0
+
+    def uniform(self, a: float, b: float, count: int):
+        return a + (b - a) * self.random(count)
+
+    def randbelow(self, n: int, count: int):
+        # as random.Random._randbelow(): the top bits of an output, drawn again until they are below n
+        shift = 32 - n.bit_length()
+        values = []
+        needed = count
+        while needed > 0:
+            outputs = self._outputs(needed * (1 << n.bit_length()) // n + 16)
+            candidates = outputs >> shift
+            accepted = np.flatnonzero(candidates < n)[:needed]
+            if len(accepted) == needed:
+                # the outputs after the last value are used by the next draws
+                self.pending = np.concatenate((outputs[accepted[-1] + 1:], self.pending))
+            values.append(candidates[accepted])
+            needed -= len(accepted)
+        return np.concatenate(values).astype(np.int64)
+
+
+def can_vectorize(entry: dict) -> bool:
+    """
+    Tells if the timeline of an entry can be generated in one pass: its frequency must not
+    depend on variables, and its variables must have been compiled into expanders.
+    """
+    if np is None: return False
+    if not isinstance(entry["frequency"], (timedelta, dict)): return False
+    expanders = entry.get("__expanders__")
+    if expanders is None: return False
+    return all(type(_unwrap(expander)) in _column_generators and _random_values(_unwrap(expander)) < 1 << 32 for expander in expanders)
+
+
+def _random_values(expander) -> int:
+    # how many values a random variable draws from, which Python only draws from a single 32-bit output below 2^32
+    if isinstance(expander, RandomIntExpander):
+        return len(range(expander.start, expander.stop, expander.step))
+    if isinstance(expander, ListAnyExpander):
+        return len(expander.values)
+    return 0
+
+
+def _microseconds(seconds):
+    # as timedelta(seconds=...), which rounds the fraction of a second to the nearest microsecond
+    fraction, whole = np.modf(seconds)
+    return whole.astype(np.int64) * 1000000 + np.rint(fraction * 1e6).astype(np.int64)
+
+
+def _offsets(entry: dict, stream: RandomStream):
+    # Offsets of each point from the start time, in microseconds, one chunk at a time
+    total = (entry["endTime"] - entry["startTime"]) // _one_microsecond
+    frequency = entry["frequency"]
+    offset = 0
+    while offset < total:
+        if isinstance(frequency, timedelta):
+            step = frequency // _one_microsecond
+            if step <= 0:
+                raise ValueError(f"{entry['id']}: Frequency must be positive")
+            steps = np.full(chunkSize, step, dtype=np.int64)
+        else:
+            steps = _microseconds(stream.uniform(frequency["from"].total_seconds(), frequency["to"].total_seconds(), chunkSize))
+            if steps.max() <= 0:
+                raise ValueError(f"{entry['id']}: Frequency must be positive")
+        offsets = offset + np.concatenate(([0], np.cumsum(steps[:-1])))
+        offset = int(offsets[-1] + steps[-1])
+        offsets = offsets[offsets < total]
+        if len(offsets) == 0:
+            return
+        yield offsets
+
+
+def _epoch_microseconds(start_time: datetime) -> int:
+    # NumPy has no time zones: aware times are counted from the epoch in UTC, naive ones as they are
+    if start_time.tzinfo is None:
+        return (start_time - _epoch) // _one_microsecond
+    return (start_time - _utc_epoch) // _one_microsecond
+
+
+def _submit_times(start: int, offsets, tzinfo) -> list:
+    submit_times = (start + offsets).astype("datetime64[us]").tolist()
+    if tzinfo is None:
+        return submit_times
+    return [submit_time.replace(tzinfo=timezone.utc).astimezone(tzinfo) for submit_time in submit_times]
+
+
+def _elapsed(expander, entry: dict, offsets):
+    # Seconds since the reference start time of the data source, as in DynamicExpander.elapsed()
+    t0 = expander.state.get("__t0__")
+    if t0 is None:
+        t0 = expander.state["__t0__"] = entry["startTime"] + timedelta(microseconds=int(offsets[0]))
+    return (entry["startTime"] - t0).total_seconds() + offsets / 1e6
+
+
+def _constant_column(expander: ConstantExpander, entry, offsets, stream):
+    return [expander.value] * len(offsets)
+
+
+def _list_any_column(expander: ListAnyExpander, entry, offsets, stream):
+    values = expander.values
+    if not values:
+        raise IndexError("Cannot choose from an empty sequence")
+    return [values[idx] for idx in stream.randbelow(len(values), len(offsets)).tolist()]
+
+
+def _random_int_column(expander: RandomIntExpander, entry, offsets, stream):
+    count = len(range(expander.start, expander.stop, expander.step))
+    if count <= 0:
+        raise ValueError(f"Empty range for randrange({expander.start}, {expander.stop}, {expander.step})")
+    return (expander.start + expander.step * stream.randbelow(count, len(offsets))).tolist()
+
+
+def _random_float_column(expander: RandomFloatExpander, entry, offsets, stream):
+    return stream.uniform(expander.start, expander.end, len(offsets)).tolist()
+
+
+def _linear_column(expander: LinearExpander, entry, offsets, stream):
+    return (expander.slope * _elapsed(expander, entry, offsets) + expander.intercept).tolist()
+
+
+def _exponential_column(expander: ExponentialExpander, entry, offsets, stream):
+    return (expander.base * np.exp(expander.rate * _elapsed(expander, entry, offsets))).tolist()
+
+
+def _sinusoidal_column(expander: SinusoidalExpander, entry, offsets, stream):
+    t = _elapsed(expander, entry, offsets)
+    return (expander.base + expander.amplitude * np.sin(2 * np.pi * t / expander.period + expander.phase)).tolist()
+
+
+def _backoff_column(expander: BackoffExpander, entry, offsets, stream):
+    counter = expander.state.get("__counter__", 0)
+    expander.state["__counter__"] = counter + len(offsets)
+    attempts = np.arange(counter, counter + len(offsets), dtype=np.float64)
+    return (expander.base * np.power(expander.factor, attempts)).tolist()
+
+
+_column_generators = {
+    ConstantExpander: _constant_column,
+    ListAnyExpander: _list_any_column,
+    RandomIntExpander: _random_int_column,
+    RandomFloatExpander: _random_float_column,
+    LinearExpander: _linear_column,
+    ExponentialExpander: _exponential_column,
+    SinusoidalExpander: _sinusoidal_column,
+    BackoffExpander: _backoff_column
+}
+
+
+def _column(expander, entry: dict, offsets, stream) -> list:
+    inner = _unwrap(expander)
+    column = _column_generators[type(inner)](inner, entry, offsets, stream)
+    # index and extractor are applied to each value, from the innermost wrapper out
+    wrappers = []
+    while expander is not inner:
+        wrappers.append(expander)
+        expander = expander.expander
+    for wrapper in reversed(wrappers):
+        column = [wrapper.apply(value) for value in column]
+    return column
+
+
+def vectorized_timeline(entry: dict):
+    """
+    Generates the timeline of an entry with NumPy: timestamps, random draws and dynamic
+    formula values are computed as arrays, a chunk of points at a time.
+
+    Yields the same `(submit_time, entry, vars_dict)` tuples as the executor's entry timeline, with the same
+    random numbers, drawn from the streams of the entry and of its variables.
+    """
+    frequency_stream = RandomStream(entry.get("__random__", random))
+    expanders = entry["__expanders__"]
+    streams = [RandomStream(_unwrap(expander).rng) if hasattr(_unwrap(expander), "rng") else None for expander in expanders]
+    names = [expander.name for expander in expanders]
+    start = _epoch_microseconds(entry["startTime"])
+    tzinfo = entry["startTime"].tzinfo
+    info_log("%s: Starting vectorized job from %s to %s every %s", entry["id"], entry["startTime"], entry["endTime"], entry["frequency"])
+    for offsets in _offsets(entry, frequency_stream):
+        submit_times = _submit_times(start, offsets, tzinfo)
+        columns = [_column(expander, entry, offsets, stream) for expander, stream in zip(expanders, streams)]
+        for submit_time, *values in zip(submit_times, *columns):
+            yield submit_time, entry, dict(zip(names, values))
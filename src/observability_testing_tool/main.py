@@ -1,8 +1,9 @@
 import argparse
+import signal
 import sys
-from importlib.metadata import version, PackageNotFoundError
-from observability_testing_tool.config.common import info_log, set_log_level, error_log, set_dry_run, set_not_gce, set_skip_schema
-from observability_testing_tool.config.executor import prepare, run_logging_jobs, create_metrics_descriptors, run_monitoring_jobs
+from observability_testing_tool.config.common import info_log, set_log_level, set_log_file, error_log, set_dry_run, set_not_gce, set_skip_schema, set_batch_size, set_rate_limit, set_workers, set_queue_size, set_live_engine, set_catch_up, set_vectorize, set_output, set_output_format, set_output_rotate_size, set_endpoint, set_stats_port, get_stats_port, set_error_budget, set_checkpoint, get_checkpoint, set_resume, should_resume, set_seed, set_config_cache
+from observability_testing_tool.obs import stats
+from observability_testing_tool.config.executor import prepare, run_logging_jobs, create_metrics_descriptors, run_monitoring_jobs, run_live_jobs, wait_batch_jobs
 
 
 class VersionAction(argparse.Action):
@@ -10,6 +11,7 @@ class VersionAction(argparse.Action):
         super().__init__(option_strings, dest, nargs=0, **kwargs)
 
     def __call__(self, parser, namespace, values, option_string=None):
+        from importlib.metadata import version, PackageNotFoundError
         try:
             pkg_version = version("observability-testing-tool")
         except PackageNotFoundError:
@@ -18,22 +20,20 @@ class VersionAction(argparse.Action):
         parser.exit()
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="🛠️ Obs Test Tool - Bulk generate logs and metrics in Google Cloud."
-    )
-    parser.add_argument(
-        "config",
-        nargs="?",
-        default="config.obs.yaml",
-        help="Path to the configuration YAML file. If not provided, it looks for config.obs.yaml in the current directory."
-    )
+def _common_parser() -> argparse.ArgumentParser:
+    # options shared by the main command and the replay subcommand
+    parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument(
         "-v", "--verbose",
         action="count",
         default=0,
         help="Increase output verbosity (e.g., -v for info, -vv for debug)."
     )
+    parser.add_argument(
+        "--log-file",
+        metavar="FILE",
+        help="Append the tool's own log messages to FILE instead of printing them."
+    )
     parser.add_argument(
         "--version",
         action=VersionAction,
@@ -45,18 +45,62 @@ def main():
         help="Run without making any changes."
     )
     parser.add_argument(
-        "--no-gce",
-        action="store_true",
-        help="Run without requesting GCE metadata."
+        "--batch",
+        nargs="?",
+        type=int,
+        const=1000,
+        metavar="N",
+        help="Send historical log entries in batches of up to N entries (default 1000) per API call, and group metric points in requests of up to 200 time series."
     )
     parser.add_argument(
-        "--skip-schema-validation",
-        action="store_true",
-        help="Do not run schema validation against the configuration file. Do not use unless you know fully well why you're doing it."
+        "--logging-rate-limit",
+        type=float,
+        metavar="R",
+        help="Maximum number of Cloud Logging API requests per second (0 for no limit)."
     )
+    parser.add_argument(
+        "--monitoring-rate-limit",
+        type=float,
+        metavar="R",
+        help="Maximum number of Cloud Monitoring API requests per second (0 for no limit)."
+    )
+    parser.add_argument(
+        "--error-budget",
+        type=int,
+        metavar="N",
+        help="Number of entries or points of a job that can fail to be written before the run stops (default 0)."
+    )
+    parser.add_argument(
+        "--output",
+        metavar="DIR",
+        help="Write log entries and time series to files in DIR instead of sending them to Google Cloud."
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["ndjson", "parquet", "arrow"],
+        help="Format of the files written with --output: newline-delimited JSON (default), Parquet or Arrow IPC (requires pyarrow)."
+    )
+    parser.add_argument(
+        "--output-rotate-size",
+        type=float,
+        metavar="MB",
+        help="Start a new output file when the current one reaches MB megabytes (default 0, no rotation)."
+    )
+    parser.add_argument(
+        "--endpoint",
+        metavar="HOST:PORT",
+        help="Send API calls to a local gRPC endpoint without authentication, such as 'obs-tool emulator'."
+    )
+    parser.add_argument(
+        "--stats-port",
+        type=int,
+        metavar="PORT",
+        help="Serve throughput and latency statistics in Prometheus format on http://localhost:PORT/metrics while running."
+    )
+    return parser
 
-    args = parser.parse_args()
 
+def _apply_common_args(args: argparse.Namespace):
     # Set log level based on verbosity
     # 0: Errors only
     # 1: Info (-v)
@@ -65,11 +109,127 @@ def main():
     # If param not set, let the environment variable determine behaviour
     if verbosity > 0:
         set_log_level(verbosity)
+    if args.log_file is not None:
+        set_log_file(args.log_file)
 
     # If param not set, let the environment variable determine behaviour
     if args.dry_run:
         set_dry_run(True)
 
+    # If param not set, let the environment variable determine behaviour
+    if args.batch is not None:
+        set_batch_size(args.batch)
+
+    # If param not set, let the environment variable or the configuration file determine behaviour
+    if args.logging_rate_limit is not None:
+        set_rate_limit("logging", args.logging_rate_limit)
+    if args.monitoring_rate_limit is not None:
+        set_rate_limit("monitoring", args.monitoring_rate_limit)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.error_budget is not None:
+        set_error_budget(args.error_budget)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.output is not None:
+        set_output(args.output)
+    if args.output_format is not None:
+        set_output_format(args.output_format)
+    if args.output_rotate_size is not None:
+        set_output_rotate_size(args.output_rotate_size)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.endpoint is not None:
+        set_endpoint(args.endpoint)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.stats_port is not None:
+        set_stats_port(args.stats_port)
+    if get_stats_port() is not None:
+        stats.start_server(get_stats_port())
+
+
+def main():
+    if sys.argv[1:2] == ["replay"]:
+        replay_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["emulator"]:
+        emulator_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="🛠️ Obs Test Tool - Bulk generate logs and metrics in Google Cloud.",
+        epilog="Use 'obs-tool replay --help' to replay files written with --output, and 'obs-tool emulator --help' to run a local stand-in for the Google Cloud APIs.",
+        parents=[_common_parser()]
+    )
+    parser.add_argument(
+        "config",
+        nargs="?",
+        default="config.obs.yaml",
+        help="Path to the configuration YAML file. If not provided, it looks for config.obs.yaml in the current directory."
+    )
+    parser.add_argument(
+        "--no-gce",
+        action="store_true",
+        help="Run without requesting GCE metadata."
+    )
+    parser.add_argument(
+        "--skip-schema-validation",
+        action="store_true",
+        help="Do not run schema validation against the configuration file. Do not use unless you know fully well why you're doing it."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        metavar="N",
+        help="Run historical jobs across a pool of N worker processes."
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        metavar="N",
+        help="Let the generation and rendering of historical entries run up to N points ahead of the API calls (default 1000, 0 to run all stages in one thread)."
+    )
+    parser.add_argument(
+        "--live-engine",
+        choices=["sched", "asyncio"],
+        help="Engine running live jobs: a blocking scheduler (default) or an asyncio event loop with overlapping API calls."
+    )
+    parser.add_argument(
+        "--catch-up",
+        choices=["burst", "skip", "coalesce"],
+        help="What live jobs do with points that are already due when they fall behind schedule: submit them all (default), drop them, or submit a single point in their place."
+    )
+    parser.add_argument(
+        "--vectorize",
+        action="store_true",
+        help="Generate the timelines of historical entries with NumPy, when their frequency does not depend on variables (requires numpy)."
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        metavar="N",
+        help="Seed the random numbers of every entry, so that runs with the same seed generate the same values."
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="DIR",
+        help="Save the progress of historical entries to state files in DIR every few seconds."
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the historical entries from the state files in the --checkpoint directory, instead of starting over."
+    )
+    parser.add_argument(
+        "--config-cache",
+        metavar="DIR",
+        help="Keep the prepared configuration in DIR, and use it again in later runs with the same configuration file."
+    )
+
+    args = parser.parse_args()
+    _apply_common_args(args)
+
     # If param not set, let the environment variable determine behaviour
     if args.no_gce:
         set_not_gce(True)
@@ -78,23 +238,65 @@ def main():
     if args.skip_schema_validation:
         set_skip_schema(True)
 
+    # If param not set, let the environment variable determine behaviour
+    if args.workers is not None:
+        set_workers(args.workers)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.queue_size is not None:
+        set_queue_size(args.queue_size)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.live_engine is not None:
+        set_live_engine(args.live_engine)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.catch_up is not None:
+        set_catch_up(args.catch_up)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.vectorize:
+        set_vectorize(True)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.seed is not None:
+        set_seed(args.seed)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.checkpoint is not None:
+        set_checkpoint(args.checkpoint)
+    if args.resume:
+        set_resume(True)
+    if should_resume() and get_checkpoint() is None:
+        error_log("Error: --resume needs the --checkpoint directory of the run to resume")
+        sys.exit(1)
+
+    # If param not set, let the environment variable determine behaviour
+    if args.config_cache is not None:
+        set_config_cache(args.config_cache)
+
     try:
         info_log(">>> Obs Test Tool - Getting things going...")
         prepare(args.config)
         
-        info_log(">>> Obs Test Tool - Done with preparation. Now proceeding with logging tasks...")
-        p1 = run_logging_jobs()
-        
-        info_log(">>> Obs Test Tool - Done with logging tasks. Now proceeding with monitoring tasks...")
+        info_log(">>> Obs Test Tool - Done with preparation. Now starting live jobs...")
         create_metrics_descriptors()
-        p2 = run_monitoring_jobs()
-        
+        p = run_live_jobs()
+
+        info_log(">>> Obs Test Tool - Now proceeding with logging tasks...")
+        run_logging_jobs()
+
+        info_log(">>> Obs Test Tool - Done with logging tasks. Now proceeding with monitoring tasks...")
+        run_monitoring_jobs()
+
+        info_log(">>> Obs Test Tool - Waiting for historical jobs to complete...")
+        wait_batch_jobs()
+
         info_log(">>> Obs Test Tool - Done with monitoring tasks. Now waiting for live jobs to terminate...")
-        if p1 is not None:
-            p1.join()
-        if p2 is not None:
-            p2.join()
+        if p is not None:
+            p.join()
 
+        stats.print_summary()
         info_log(">>> Obs Test Tool - All done!")
 
     except KeyboardInterrupt:
@@ -105,12 +307,135 @@ def main():
         sys.exit(1)
 
 
+def _parse_speed(value: str) -> float | None:
+    if value == "max":
+        return None
+    try:
+        speed = float(value.removesuffix("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid speed '{value}', use a number (e.g. 1, 10x) or 'max'")
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive")
+    return speed
+
+
+def replay_main(argv: list):
+    parser = argparse.ArgumentParser(
+        prog="obs-tool replay",
+        description="🛠️ Obs Test Tool - Replay log entries and time series from files written with --output.",
+        parents=[_common_parser()]
+    )
+    parser.add_argument(
+        "files",
+        nargs="+",
+        metavar="FILE",
+        help="NDJSON, Parquet or Arrow IPC files to replay, in order."
+    )
+    parser.add_argument(
+        "--speed",
+        type=_parse_speed,
+        default=None,
+        metavar="X|max",
+        help="Replay X times faster than the timestamps of the records (e.g. 1, 10x), or as fast as the rate limits allow with 'max' (default)."
+    )
+    parser.add_argument(
+        "--rebase",
+        action="store_true",
+        help="Shift all timestamps so that the first record is at the time the replay starts."
+    )
+    parser.add_argument(
+        "--project",
+        metavar="ID",
+        help="Send all records to project ID, instead of the projects they were generated for."
+    )
+
+    args = parser.parse_args(argv)
+    _apply_common_args(args)
+    # the subcommands import the modules they need, so that they do not slow down the start of every run
+    from observability_testing_tool.config.replay import replay
+
+    try:
+        info_log(">>> Obs Test Tool - Replaying files...")
+        replay(args.files, speed=args.speed, rebase=args.rebase, project=args.project)
+        stats.print_summary()
+        info_log(">>> Obs Test Tool - All done!")
+
+    except KeyboardInterrupt:
+        info_log(">>> Obs Test Tool - Interrupted by user. Exiting...")
+        sys.exit(0)
+    except Exception as e:
+        error_log(">>> Obs Test Tool - An unexpected error occurred", ex=e)
+        sys.exit(1)
+
+
+
+def emulator_main(argv: list):
+    parser = argparse.ArgumentParser(
+        prog="obs-tool emulator",
+        description="🛠️ Obs Test Tool - Run a local stand-in for the Cloud Logging and Cloud Monitoring gRPC APIs, for use with --endpoint."
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="count",
+        default=1,
+        help="Increase output verbosity (-v for debug)."
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8085,
+        help="Port to listen on (default 8085)."
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        metavar="MS",
+        help="Milliseconds each call takes (default 0)."
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.0,
+        metavar="MS",
+        help="Random extra milliseconds, up to MS, added to each call (default 0)."
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        metavar="P",
+        help="Probability (0 to 1) that a call fails with RESOURCE_EXHAUSTED (default 0)."
+    )
+    parser.add_argument(
+        "--reject-rate",
+        type=float,
+        default=0.0,
+        metavar="P",
+        help="Probability (0 to 1) that each entry of a batch written with partial success is rejected (default 0)."
+    )
+
+    args = parser.parse_args(argv)
+    # the emulator reports what it receives at info level, unless asked for more
+    set_log_level(min(args.verbose, 2))
+
+    # stop with a summary on SIGTERM too, e.g. when running in the background
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    from observability_testing_tool.obs.emulator import EmulatorServer
+    server = EmulatorServer(args.port, args.latency / 1000, args.jitter / 1000, args.error_rate, reject_rate=args.reject_rate)
+    server.start()
+    try:
+        server.wait()
+    except KeyboardInterrupt:
+        server.stop(1)
+
+
 if __name__ == '__main__':
 
     # Check Python version before doing anything else
     if sys.version_info < (3, 12):
         error_log("Error: This tool requires Python 3.12 or higher.")
-        error_log(f"Current version: {sys.version.split()[0]}")
+        error_log("Current version: %s", sys.version.split()[0])
         sys.exit(1)
 
     main()
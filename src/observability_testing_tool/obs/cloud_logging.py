@@ -3,25 +3,53 @@ import json
 import re
 from os import getenv
 
-from observability_testing_tool.config.common import is_dry_run
-
-import google.cloud.logging
+from observability_testing_tool.config.common import flags, get_batch_size, get_endpoint, debug_log
+from observability_testing_tool.obs.rate_limit import limited_call, limited_call_async
+from observability_testing_tool.obs.sinks import get_sink
+from observability_testing_tool.obs import stats
 
 from logging import getLevelName
 
-from google.cloud.logging_v2 import Resource
+# The Google Cloud and gRPC libraries take a while to import, so they are imported where they
+# are first needed: the clients when they are set up, and the entry classes when an entry is built.
 
 
 _regex_logname_format = re.compile(r"^projects/.+/logs/.+$")
 
 loggingClient = None
+loggingAsyncClient = None
+loggingProject = None
 usePythonLogging = False
 logger = None
 
+# Limits for a single entries.write call in batch mode
+# See https://cloud.google.com/logging/quotas#api-limits
+batchMaxBytes = 10 * 1024 * 1024
+_batch_active = False
+_batch_entries = []
+# the job of each entry in the batch, for the error budget
+_batch_jobs = []
+_batch_bytes = 0
+
+_entry_classes = {}
+_resource_class = None
+
+
+def _import_entry_classes():
+    global _resource_class
+    from google.cloud.logging_v2 import Resource
+    from google.cloud.logging_v2.entries import TextEntry, StructEntry, ProtobufEntry
+    _entry_classes.update({"json": StructEntry, "text": TextEntry, "proto": ProtobufEntry})
+    _resource_class = Resource
+
+
 def setup_logging_client():
-    if is_dry_run(): return
-    global loggingClient, logger
-    loggingClient = google.cloud.logging.Client()
+    if get_sink() is not None: return
+    import google.cloud.logging
+    global loggingClient, loggingProject, logger
+    endpoint = get_endpoint()
+    loggingClient = _endpoint_logging_client(endpoint) if endpoint is not None else google.cloud.logging.Client()
+    loggingProject = loggingClient.project
     if usePythonLogging:
         loggingClient.setup_logging(log_level=logging.DEBUG)
         logger = logging.getLogger("obs_test_tool_logger")
@@ -30,6 +58,40 @@ def setup_logging_client():
         logger = loggingClient.logger("obs_test_tool_logger")
 
 
+def setup_logging_client_async():
+    if get_sink() is not None: return
+    import grpc
+    import google.auth
+    from google.cloud.logging_v2.services.logging_service_v2 import LoggingServiceV2AsyncClient
+    from google.cloud.logging_v2.services.logging_service_v2.transports import LoggingServiceV2GrpcAsyncIOTransport
+    global loggingAsyncClient, loggingProject
+    endpoint = get_endpoint()
+    if endpoint is not None:
+        transport = LoggingServiceV2GrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(endpoint))
+        loggingAsyncClient = LoggingServiceV2AsyncClient(transport=transport)
+        loggingProject = getenv("GOOGLE_CLOUD_PROJECT", "emulator")
+    else:
+        loggingAsyncClient = LoggingServiceV2AsyncClient()
+        # same lookup as google.cloud.logging.Client, GOOGLE_CLOUD_PROJECT first
+        _, loggingProject = google.auth.default()
+
+
+def _endpoint_logging_client(endpoint: str):
+    # A local endpoint, such as the emulator, takes plain gRPC without authentication.
+    # The client has no option for an insecure channel, so its Logging API adapter is
+    # built here around a transport with one, as google.cloud.logging_v2._gapic would do.
+    import grpc
+    import google.cloud.logging
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud.logging_v2._gapic import _LoggingAPI
+    from google.cloud.logging_v2.services.logging_service_v2 import LoggingServiceV2Client
+    from google.cloud.logging_v2.services.logging_service_v2.transports import LoggingServiceV2GrpcTransport
+    client = google.cloud.logging.Client(project=getenv("GOOGLE_CLOUD_PROJECT", "emulator"), credentials=AnonymousCredentials(), _use_grpc=True)
+    transport = LoggingServiceV2GrpcTransport(channel=grpc.insecure_channel(endpoint))
+    client._logging_api = _LoggingAPI(LoggingServiceV2Client(transport=transport), client)
+    return client
+
+
 class TimestampFilter(logging.Filter):
     """
     This is a logging filter which will check for a `timestamp` attribute on a
@@ -47,7 +109,7 @@ class TimestampFilter(logging.Filter):
         return True
 
 
-def submit_log_entry(level, message, when = None, labels = None, resource_type = None, resource_labels = None, log_name = None, other = None, payloadStyle = "text"):
+def submit_log_entry(level, message, when = None, labels = None, resource_type = None, resource_labels = None, log_name = None, other = None, payloadStyle = "text", job_id = None):
     global logger
 
     if other is None:
@@ -65,9 +127,11 @@ def submit_log_entry(level, message, when = None, labels = None, resource_type =
         if not isinstance(message, str):
             raise ValueError("Invalid message payload")
 
+        if _resource_class is None:
+            _import_entry_classes()
         extra = {
             "labels": labels if labels is not None else {},
-            "resource": Resource(
+            "resource": _resource_class(
                 resource_type if resource_type is not None else "global",
                 resource_labels if resource_labels is not None else {},
             ),
@@ -77,49 +141,186 @@ def submit_log_entry(level, message, when = None, labels = None, resource_type =
         if when is not None:
             extra["logger__timestamp"] = when.timestamp()
 
-        if not is_dry_run():
+        if get_sink() is None:
             logger.log(getLevelName(level), message, extra=extra)
 
     else:
 
-        if payloadStyle == "json" and not isinstance(message, dict):
-            raise ValueError("Invalid JSON payload")
-        if payloadStyle == "text" and not isinstance(message, str):
-            raise ValueError("Invalid text payload")
-        if payloadStyle == "proto" and not isinstance(message, dict) and message.get("@type") is None:
-            raise ValueError("Invalid ProtoBuf payload")
-
-        if log_name is None:
-            log_name = "python"
-        if not is_dry_run() and not _regex_logname_format.match(log_name):
-            log_name = f"projects/{logger.project}/logs/{log_name}"
-
-        metadata = {
-            "log_name": log_name,
-            "labels": labels,
-            "severity": level.upper(),
-            "timestamp": when,
-            "resource": Resource(
-                resource_type if resource_type is not None else "global",
-                resource_labels if resource_labels is not None else {}
-            ),
-            **other
-        }
-        if not is_dry_run():
-            match payloadStyle:
-                case "json":
-                    logger.log_struct(message, **metadata)
-                case "text":
-                    logger.log_text(message, **metadata)
-                case "proto":
-                    logger.log_proto(message, **metadata)
-                case _:
-                    raise ValueError(f"Invalid payload type {payloadStyle}")
+        _check_payload(message, payloadStyle)
+        if (sink := get_sink()) is not None and sink.discards:
+            # nothing is kept, so there is no need to build the entry
+            stats.observe("batch_size", "logging", 1)
+            return
+        metadata = _log_entry_metadata(level, message, when, labels, resource_type, resource_labels, log_name, other, payloadStyle)
+        if _batch_active:
+            _add_to_batch(_entry_repr(payloadStyle, message, metadata), job_id)
+        elif (sink := get_sink()) is not None:
+            stats.observe("batch_size", "logging", 1)
+            sink.write_log_entries([_entry_repr(payloadStyle, message, metadata)])
+        else:
+            stats.observe("batch_size", "logging", 1)
+            from google.api_core.exceptions import GoogleAPICallError
+            from observability_testing_tool.obs import retry
+            try:
+                match payloadStyle:
+                    case "json":
+                        limited_call("logging", logger.log_struct, message, **metadata)
+                    case "text":
+                        limited_call("logging", logger.log_text, message, **metadata)
+                    case "proto":
+                        limited_call("logging", logger.log_proto, message, **metadata)
+                    case _:
+                        raise ValueError(f"Invalid payload type {payloadStyle}")
+            except GoogleAPICallError as e:
+                retry.record_failures([job_id], e)
+
+
+def _check_payload(message, payload_style):
+    if payload_style == "json" and not isinstance(message, dict):
+        raise ValueError("Invalid JSON payload")
+    if payload_style == "text" and not isinstance(message, str):
+        raise ValueError("Invalid text payload")
+    if payload_style == "proto" and not isinstance(message, dict) and message.get("@type") is None:
+        raise ValueError("Invalid ProtoBuf payload")
+
+
+def _log_entry_metadata(level, message, when, labels, resource_type, resource_labels, log_name, other, payload_style) -> dict:
+    if _resource_class is None:
+        _import_entry_classes()
+    if log_name is None:
+        log_name = "python"
+    if loggingProject is not None and not _regex_logname_format.match(log_name):
+        log_name = f"projects/{loggingProject}/logs/{log_name}"
+
+    return {
+        "log_name": log_name,
+        "labels": labels,
+        "severity": level.upper(),
+        "timestamp": when,
+        "resource": _resource_class(
+            resource_type if resource_type is not None else "global",
+            resource_labels if resource_labels is not None else {}
+        ),
+        **other
+    }
+
+
+def submit_log_entry_json(level, payload, when = None, labels = None, resource_type = None, resource_labels = None, log_name = None, other = None, job_id = None):
+    submit_log_entry(level, payload, when, labels, resource_type, resource_labels, log_name, other, payloadStyle="json", job_id=job_id)
+
+
+def submit_log_entry_proto(level, payload, when = None, labels = None, resource_type = None, resource_labels = None, log_name = None, other = None, job_id = None):
+    submit_log_entry(level, payload, when, labels, resource_type, resource_labels, log_name, other, payloadStyle="proto", job_id=job_id)
+
+
+async def submit_log_entry_async(level, message, when = None, labels = None, resource_type = None, resource_labels = None, log_name = None, other = None, payloadStyle = "text", job_id = None):
+    """
+    Submits a log entry with the asynchronous Logging client, set up with `setup_logging_client_async()`.
+    """
+    _check_payload(message, payloadStyle)
+    metadata = _log_entry_metadata(level, message, when, labels, resource_type, resource_labels, log_name, other if other is not None else {}, payloadStyle)
+    entry = _entry_repr(payloadStyle, message, metadata)
+    stats.observe("batch_size", "logging", 1)
+    if (sink := get_sink()) is not None:
+        sink.write_log_entries([entry])
+        return
+    from google.api_core.exceptions import GoogleAPICallError
+    from google.cloud.logging_v2.types import WriteLogEntriesRequest
+    from observability_testing_tool.obs import retry
+    entry = _entry_to_pb(entry)
+    try:
+        # partial_success is not one of the flattened arguments of the call, so it takes a full request
+        await limited_call_async("logging", loggingAsyncClient.write_log_entries, request=WriteLogEntriesRequest(entries=[entry], partial_success=True))
+    except GoogleAPICallError as e:
+        retry.record_failures([job_id], e)
+
+
+def _entry_repr(payload_style: str, message, metadata: dict) -> dict:
+    entry_class = _entry_classes.get(payload_style)
+    if entry_class is None:
+        raise ValueError(f"Invalid payload type {payload_style}")
+    return entry_class(payload=message, **metadata).to_api_repr()
+
+
+def _entry_to_pb(entry: dict):
+    # The JSON representation of the entry maps directly onto the LogEntry protobuf
+    from google.cloud.logging_v2.types import LogEntry
+    from google.protobuf.json_format import ParseDict
+    entry_pb = LogEntry.pb(LogEntry())
+    ParseDict(entry, entry_pb)
+    return LogEntry(entry_pb)
+
+
+def begin_log_batch() -> bool:
+    """
+    Switches log submission to batch mode, if a batch size has been configured.
+
+    In batch mode, entries are collected and sent with a single `entries.write` call
+    whenever the batch reaches the configured number of entries or `batchMaxBytes`.
+    Batch mode is not available when using native Python logging.
+
+    :return bool: True if batch mode is active
+    """
+    global _batch_active
+    _batch_active = get_batch_size() > 0 and not usePythonLogging
+    return _batch_active
+
 
+def end_log_batch():
+    """
+    Sends any entries still waiting in the current batch and switches batch mode off.
+    """
+    global _batch_active
+    flush_log_batch()
+    _batch_active = False
+
+
+def submit_log_entry_repr(entry: dict):
+    """
+    Submits a log entry that is already in its JSON representation, e.g. read back from an output file.
+    Short log names are qualified with the project of the Logging client.
+    """
+    log_name = entry.get("logName")
+    if log_name is not None and loggingProject is not None and not _regex_logname_format.match(log_name):
+        entry["logName"] = f"projects/{loggingProject}/logs/{log_name}"
+    if _batch_active:
+        _add_to_batch(entry)
+    else:
+        _write_log_entries([entry])
 
-def submit_log_entry_json(level, payload, when = None, labels = None, resource_type = None, resource_labels = None, log_name = None, other = None):
-    submit_log_entry(level, payload, when, labels, resource_type, resource_labels, log_name, other, payloadStyle="json")
+
+def _add_to_batch(entry: dict, job_id: str = None):
+    global _batch_bytes
+    # the JSON size is a close enough approximation of the size of the request
+    entry_bytes = len(json.dumps(entry, default=str).encode())
+    if _batch_entries and _batch_bytes + entry_bytes > batchMaxBytes:
+        flush_log_batch()
+    _batch_entries.append(entry)
+    _batch_jobs.append(job_id)
+    _batch_bytes += entry_bytes
+    if len(_batch_entries) >= flags.batch_size:
+        flush_log_batch()
+
+
+def flush_log_batch():
+    global _batch_entries, _batch_jobs, _batch_bytes
+    if not _batch_entries: return
+    entries, job_ids = _batch_entries, _batch_jobs
+    _batch_entries = []
+    _batch_jobs = []
+    _batch_bytes = 0
+    debug_log("Logging: Writing batch of %d entries", len(entries))
+    _write_log_entries(entries, job_ids)
+
+
+def _write_log_entries(entries: list, job_ids: list = None):
+    stats.observe("batch_size", "logging", len(entries))
+    if (sink := get_sink()) is not None:
+        sink.write_log_entries(entries)
+    else:
+        from observability_testing_tool.obs import retry
+        retry.write_log_entries(_write_entries_call, entries, job_ids if job_ids is not None else [None] * len(entries))
 
 
-def submit_log_entry_proto(level, payload, when = None, labels = None, resource_type = None, resource_labels = None, log_name = None, other = None):
-    submit_log_entry(level, payload, when, labels, resource_type, resource_labels, log_name, other, payloadStyle="proto")
+def _write_entries_call(entries: list):
+    limited_call("logging", loggingClient.logging_api.write_entries, entries, partial_success=True)
@@ -1,34 +1,80 @@
-import google
-from google.cloud import monitoring_v3
-from google.api import metric_pb2
-from google.api import label_pb2
-
 import datetime
 
 from os import getenv
-from observability_testing_tool.config.common import is_dry_run
+from observability_testing_tool.config.common import flags, get_batch_size, get_endpoint, debug_log
+from observability_testing_tool.obs.rate_limit import limited_call, limited_call_async
+from observability_testing_tool.obs.sinks import get_sink
+from observability_testing_tool.obs import stats
+
+# The Google Cloud and gRPC libraries take a while to import, so they are imported where they
+# are first needed: the clients, and the types of time series, when the clients are set up.
 
 
 monitoringClient = None
+monitoringAsyncClient = None
+_monitoring_v3 = None
+
+# Limit for a single timeSeries.create call
+# See https://cloud.google.com/monitoring/quotas#custom_metrics_quotas
+bufferMaxSeries = 200
+_buffer_active = False
+_buffered_series = {}
+
+
+def _import_monitoring_v3():
+    global _monitoring_v3
+    from google.cloud import monitoring_v3
+    _monitoring_v3 = monitoring_v3
+
+
+def _uses_sink() -> bool:
+    # the types of time series are imported along with the client, or for a sink that keeps the time series
+    sink = get_sink()
+    if sink is None or not sink.discards:
+        _import_monitoring_v3()
+    return sink is not None
 
 
 def setup_monitoring_client():
-    if is_dry_run(): return
+    if _uses_sink(): return
+    import grpc
+    from google.cloud.monitoring_v3.services.metric_service.transports import MetricServiceGrpcTransport
     global monitoringClient
-    monitoringClient = monitoring_v3.MetricServiceClient()
+    endpoint = get_endpoint()
+    if endpoint is not None:
+        # a local endpoint, such as the emulator, takes plain gRPC without authentication
+        monitoringClient = _monitoring_v3.MetricServiceClient(transport=MetricServiceGrpcTransport(channel=grpc.insecure_channel(endpoint)))
+    else:
+        monitoringClient = _monitoring_v3.MetricServiceClient()
+
+
+def setup_monitoring_client_async():
+    if _uses_sink(): return
+    import grpc
+    from google.cloud.monitoring_v3.services.metric_service.transports import MetricServiceGrpcAsyncIOTransport
+    global monitoringAsyncClient
+    endpoint = get_endpoint()
+    if endpoint is not None:
+        monitoringAsyncClient = _monitoring_v3.MetricServiceAsyncClient(transport=MetricServiceGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(endpoint)))
+    else:
+        monitoringAsyncClient = _monitoring_v3.MetricServiceAsyncClient()
 
 
 def prepare_time_interval_gauge(start_time = None):
+    if _monitoring_v3 is None:
+        _import_monitoring_v3()
     if start_time is None:
         start_time = datetime.datetime.today()
     seconds = int(start_time.timestamp())  # Integer part of time() is the number of seconds
     nanos = int((start_time.timestamp() - seconds) * 10 ** 9)
-    return monitoring_v3.TimeInterval(
+    return _monitoring_v3.TimeInterval(
         {"end_time": {"seconds": seconds, "nanos": nanos}}
     )
 
 
 def prepare_time_interval(start_time = None, delta = None):
+    if _monitoring_v3 is None:
+        _import_monitoring_v3()
     if start_time is None:
         start_time = datetime.datetime.today()
     seconds = int(start_time.timestamp())  # Integer part of time() is the number of seconds
@@ -37,15 +83,19 @@ def prepare_time_interval(start_time = None, delta = None):
         delta = 1 # Deafult interval of one second
     delta_seconds = int(delta)
     delta_nanos = int((delta - delta_seconds) * 10 ** 9)
-    return monitoring_v3.TimeInterval({
+    return _monitoring_v3.TimeInterval({
         "start_time": {"seconds": seconds, "nanos": nanos},
         "end_time": {"seconds": seconds + delta_seconds, "nanos": nanos + delta_nanos},
     })
 
 
-def submit_gauge_metric(value, metric_type, when = None, project_id = None, metric_labels = None, resource_type = None, resource_labels = None):
+def submit_gauge_metric(value, metric_type, when = None, project_id = None, metric_labels = None, resource_type = None, resource_labels = None, job_id = None):
+    if (sink := get_sink()) is not None and sink.discards:
+        # nothing is kept, so there is no need to build the time series
+        stats.observe("batch_size", "monitoring", 1)
+        return
     interval = prepare_time_interval_gauge(when)
-    submit_metric(value, metric_type, interval, project_id, metric_labels, resource_type, resource_labels)
+    submit_metric(value, metric_type, interval, project_id, metric_labels, resource_type, resource_labels, job_id=job_id)
 
 
 def submit_delta_metric(value, metric_type, when = None, project_id = None, metric_labels = None, resource_type = None, resource_labels = None):
@@ -54,12 +104,54 @@ def submit_delta_metric(value, metric_type, when = None, project_id = None, metr
     pass
 
 
-def submit_metric(value: float, metric_type, interval, project_id = None, metric_labels = None, resource_type = None, resource_labels = None):
+def submit_metric(value: float, metric_type, interval, project_id = None, metric_labels = None, resource_type = None, resource_labels = None, job_id = None):
+    if (sink := get_sink()) is not None and sink.discards:
+        stats.observe("batch_size", "monitoring", 1)
+        return
+    project_name, series = _build_time_series(value, metric_type, interval, project_id, metric_labels, resource_type, resource_labels)
+
+    if _buffer_active:
+        _add_to_buffer(project_name, series, (metric_type, metric_labels, resource_type, resource_labels), job_id)
+    else:
+        _write_time_series(project_name, [series], [job_id])
+
+
+def submit_time_series(project_name: str, series, job_id = None):
+    """
+    Submits a time series that has already been built, e.g. read back from an output file.
+    """
+    if _buffer_active:
+        _add_to_buffer(project_name, series, (series.metric.type, dict(series.metric.labels), series.resource.type, dict(series.resource.labels)), job_id)
+    else:
+        _write_time_series(project_name, [series], [job_id])
+
+
+async def submit_gauge_metric_async(value, metric_type, when = None, project_id = None, metric_labels = None, resource_type = None, resource_labels = None, job_id = None):
+    """
+    Submits a gauge metric point with the asynchronous Monitoring client, set up with `setup_monitoring_client_async()`.
+    """
+    interval = prepare_time_interval_gauge(when)
+    project_name, series = _build_time_series(value, metric_type, interval, project_id, metric_labels, resource_type, resource_labels)
+    stats.observe("batch_size", "monitoring", 1)
+    if (sink := get_sink()) is not None:
+        sink.write_time_series(project_name, [series])
+    else:
+        from google.api_core.exceptions import GoogleAPICallError
+        from observability_testing_tool.obs import retry
+        try:
+            await limited_call_async("monitoring", monitoringAsyncClient.create_time_series, request={"name": project_name, "time_series": [series]})
+        except GoogleAPICallError as e:
+            retry.record_failures([job_id], e, kind="points")
+
+
+def _build_time_series(value: float, metric_type, interval, project_id = None, metric_labels = None, resource_type = None, resource_labels = None):
+    if _monitoring_v3 is None:
+        _import_monitoring_v3()
     # Create a data point for the timestamp interval
-    point = monitoring_v3.Point({"interval": interval, "value": {"double_value": value}})
+    point = _monitoring_v3.Point({"interval": interval, "value": {"double_value": value}})
 
     # Prepare a time series and all its attributes
-    series = monitoring_v3.TimeSeries()
+    series = _monitoring_v3.TimeSeries()
     series.metric.type = f"custom.googleapis.com/{metric_type}"
     series.metric.labels.update(metric_labels if metric_labels is not None else {})
     series.resource.type = resource_type if resource_type is not None else "global"
@@ -68,14 +160,84 @@ def submit_metric(value: float, metric_type, interval, project_id = None, metric
     # Add the data point to the series
     series.points = [point]
 
-    # Submit the time series data
     project_name = f"projects/{project_id if project_id is not None else getenv('GOOGLE_CLOUD_PROJECT')}"
+    return project_name, series
+
+
+def begin_metric_buffer() -> bool:
+    """
+    Switches metric submission to buffered mode, if a batch size has been configured.
+
+    In buffered mode, points are grouped per project into requests of up to `bufferMaxSeries`
+    time series. As a single request cannot contain two points for the same time series, the
+    pending request is sent as soon as a second point for one of its time series comes in.
+
+    :return bool: True if buffered mode is active
+    """
+    global _buffer_active
+    _buffer_active = get_batch_size() > 0
+    return _buffer_active
+
+
+def end_metric_buffer():
+    """
+    Sends any time series still waiting in the buffer and switches buffered mode off.
+    """
+    global _buffer_active
+    flush_metric_buffer()
+    _buffer_active = False
+
+
+def _series_key(metric_type, metric_labels, resource_type, resource_labels) -> tuple:
+    return (
+        metric_type,
+        tuple(sorted(metric_labels.items())) if metric_labels else (),
+        resource_type,
+        tuple(sorted(resource_labels.items())) if resource_labels else ()
+    )
+
+
+def _add_to_buffer(project_name: str, series, series_attributes: tuple, job_id: str = None):
+    key = _series_key(*series_attributes)
+    pending = _buffered_series.get(project_name)
+    if pending is not None and key in pending[0]:
+        _flush_project(project_name)
+        pending = None
+    if pending is None:
+        pending = _buffered_series[project_name] = (set(), [], [])
+    pending[0].add(key)
+    pending[1].append(series)
+    pending[2].append(job_id)
+    if len(pending[1]) >= min(flags.batch_size, bufferMaxSeries):
+        _flush_project(project_name)
+
+
+def _flush_project(project_name: str):
+    _, time_series, job_ids = _buffered_series.pop(project_name)
+    debug_log("Monitoring: Writing %d time series to %s", len(time_series), project_name)
+    _write_time_series(project_name, time_series, job_ids)
+
+
+def _write_time_series(project_name: str, time_series: list, job_ids: list = None):
+    stats.observe("batch_size", "monitoring", len(time_series))
+    if (sink := get_sink()) is not None:
+        sink.write_time_series(project_name, time_series)
+    else:
+        from observability_testing_tool.obs import retry
+        write = lambda series: limited_call("monitoring", monitoringClient.create_time_series, request={"name": project_name, "time_series": series})
+        retry.write_time_series(write, time_series, job_ids if job_ids is not None else [None] * len(time_series))
+
 
-    if not is_dry_run():
-        monitoringClient.create_time_series(request={"name": project_name, "time_series": [series]})
+def flush_metric_buffer():
+    for project_name in list(_buffered_series):
+        _flush_project(project_name)
 
 
 def submit_metric_descriptor(metric_type, kind, value_type, name = None, project_id = None, unit = None, description = None, display_name = None, launch_stage = None, labels = None, monitored_resource_types = None):
+    if (sink := get_sink()) is not None and sink.discards:
+        return
+    import google.api_core.exceptions
+    from google.api import metric_pb2, label_pb2
     project_id = project_id if project_id is not None else getenv('GOOGLE_CLOUD_PROJECT')
 
     descriptor = metric_pb2.MetricDescriptor()
@@ -83,11 +245,11 @@ def submit_metric_descriptor(metric_type, kind, value_type, name = None, project
     descriptor.type = f"custom.googleapis.com/{metric_type}"
 
     try:
-        if is_dry_run():
+        if get_sink() is not None:
             raise google.api_core.exceptions.NotFound("Dry Running")
         else:
             descriptor_path = monitoringClient.metric_descriptor_path(project_id, descriptor.type)
-            monitoringClient.get_metric_descriptor(name=descriptor_path)
+            limited_call("monitoring", monitoringClient.get_metric_descriptor, name=descriptor_path)
     except google.api_core.exceptions.NotFound:
         descriptor.metric_kind = kind
         descriptor.value_type = value_type
@@ -111,7 +273,8 @@ def submit_metric_descriptor(metric_type, kind, value_type, name = None, project
 
         project_name = f"projects/{project_id}"
 
-        if not is_dry_run():
-            monitoringClient.create_metric_descriptor(
+        if get_sink() is None:
+            limited_call(
+                "monitoring", monitoringClient.create_metric_descriptor,
                 name=project_name, metric_descriptor=descriptor
             )
@@ -0,0 +1,146 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep, monotonic
+
+import grpc
+from grpc_status import rpc_status
+from google.cloud.logging_v2.types import WriteLogEntriesRequest, WriteLogEntriesResponse, WriteLogEntriesPartialErrors
+from google.cloud.monitoring_v3.types import CreateTimeSeriesRequest, GetMetricDescriptorRequest, CreateMetricDescriptorRequest
+from google.api.metric_pb2 import MetricDescriptor
+from google.protobuf.any_pb2 import Any
+from google.protobuf.empty_pb2 import Empty
+from google.rpc import status_pb2
+
+from observability_testing_tool.config.common import info_log, debug_log
+
+
+_logging_service = "google.logging.v2.LoggingServiceV2"
+_metric_service = "google.monitoring.v3.MetricService"
+
+
+class EmulatorServer:
+    """
+    A local stand-in for the Cloud Logging and Cloud Monitoring gRPC APIs, implementing the
+    calls used by the tool: `WriteLogEntries`, `CreateTimeSeries`, `GetMetricDescriptor` and
+    `CreateMetricDescriptor`. Requests are fully deserialized, counted and discarded.
+
+    Each call waits `latency` seconds (plus up to `jitter` seconds), then fails with
+    `RESOURCE_EXHAUSTED` with probability `error_rate`, as the real APIs do when over quota.
+    `WriteLogEntries` calls made with `partial_success` also reject each entry with probability
+    `reject_rate`, reporting them as `UNAVAILABLE` in a `WriteLogEntriesPartialErrors`.
+    """
+
+    def __init__(self, port: int = 8085, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, max_workers: int = 32, reject_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reject_rate = reject_rate
+        self.descriptors = {}
+        self.stats = {"requests": 0, "errors": 0, "rejected": 0, "logEntries": 0, "timeSeries": 0}
+        self.lock = threading.Lock()
+        self.started = None
+
+        self.server = grpc.server(ThreadPoolExecutor(max_workers=max_workers))
+        self.server.add_generic_rpc_handlers((
+            grpc.method_handlers_generic_handler(_logging_service, {
+                "WriteLogEntries": grpc.unary_unary_rpc_method_handler(
+                    self.write_log_entries,
+                    request_deserializer=WriteLogEntriesRequest.deserialize,
+                    response_serializer=WriteLogEntriesResponse.serialize
+                )
+            }),
+            grpc.method_handlers_generic_handler(_metric_service, {
+                "CreateTimeSeries": grpc.unary_unary_rpc_method_handler(
+                    self.create_time_series,
+                    request_deserializer=CreateTimeSeriesRequest.deserialize,
+                    response_serializer=Empty.SerializeToString
+                ),
+                "GetMetricDescriptor": grpc.unary_unary_rpc_method_handler(
+                    self.get_metric_descriptor,
+                    request_deserializer=GetMetricDescriptorRequest.deserialize,
+                    response_serializer=MetricDescriptor.SerializeToString
+                ),
+                "CreateMetricDescriptor": grpc.unary_unary_rpc_method_handler(
+                    self.create_metric_descriptor,
+                    request_deserializer=CreateMetricDescriptorRequest.deserialize,
+                    response_serializer=MetricDescriptor.SerializeToString
+                )
+            })
+        ))
+        self.port = self.server.add_insecure_port(f"[::]:{port}")
+
+    def start(self):
+        self.server.start()
+        self.started = monotonic()
+        info_log("Emulator: Listening on port %d, latency %ss (+%ss), error rate %s, reject rate %s", self.port, self.latency, self.jitter, self.error_rate, self.reject_rate)
+
+    def stop(self, grace: float = None):
+        self.server.stop(grace).wait()
+        info_log("Emulator: %s", self.summary())
+
+    def wait(self):
+        self.server.wait_for_termination()
+
+    def summary(self) -> str:
+        with self.lock:
+            stats = dict(self.stats)
+        elapsed = monotonic() - self.started if self.started is not None else 0
+        rate = f", {stats['requests'] / elapsed:.1f} requests/s" if elapsed > 0 else ""
+        return f"{stats['requests']} requests ({stats['errors']} failed){rate}, {stats['logEntries']} log entries ({stats['rejected']} rejected), {stats['timeSeries']} time series"
+
+    def _handle(self, context: grpc.ServicerContext, **counts):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter > 0 else 0)
+        if delay > 0:
+            sleep(delay)
+        failed = self.error_rate > 0 and random.random() < self.error_rate
+        with self.lock:
+            self.stats["requests"] += 1
+            if failed:
+                self.stats["errors"] += 1
+            else:
+                for key, count in counts.items():
+                    self.stats[key] += count
+        if failed:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Quota exceeded (emulated)")
+
+    def write_log_entries(self, request: WriteLogEntriesRequest, context: grpc.ServicerContext):
+        rejected = []
+        if request.partial_success and self.reject_rate > 0:
+            rejected = [index for index in range(len(request.entries)) if random.random() < self.reject_rate]
+        self._handle(context, logEntries=len(request.entries) - len(rejected), rejected=len(rejected))
+        debug_log("Emulator: Received %d log entries, rejected %d", len(request.entries), len(rejected))
+        if rejected:
+            context.abort_with_status(rpc_status.to_status(_partial_errors(rejected)))
+        return WriteLogEntriesResponse()
+
+    def create_time_series(self, request: CreateTimeSeriesRequest, context: grpc.ServicerContext):
+        self._handle(context, timeSeries=len(request.time_series))
+        debug_log("Emulator: Received %d time series for %s", len(request.time_series), request.name)
+        return Empty()
+
+    def get_metric_descriptor(self, request: GetMetricDescriptorRequest, context: grpc.ServicerContext):
+        self._handle(context)
+        descriptor = self.descriptors.get(request.name)
+        if descriptor is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Could not find descriptor for metric '{request.name}'")
+        return descriptor
+
+    def create_metric_descriptor(self, request: CreateMetricDescriptorRequest, context: grpc.ServicerContext):
+        self._handle(context)
+        descriptor = MetricDescriptor()
+        descriptor.CopyFrom(request.metric_descriptor)
+        descriptor.name = f"{request.name}/metricDescriptors/{descriptor.type}"
+        self.descriptors[descriptor.name] = descriptor
+        return descriptor
+
+
+def _partial_errors(rejected: list) -> status_pb2.Status:
+    # the status of a WriteLogEntries call with partial_success where some entries were not written
+    errors = WriteLogEntriesPartialErrors.pb()()
+    for index in rejected:
+        errors.log_entry_errors[index].code = grpc.StatusCode.UNAVAILABLE.value[0]
+        errors.log_entry_errors[index].message = "Entry rejected (emulated)"
+    detail = Any()
+    detail.Pack(errors)
+    return status_pb2.Status(code=grpc.StatusCode.INVALID_ARGUMENT.value[0], message="Some entries were not written (emulated)", details=[detail])
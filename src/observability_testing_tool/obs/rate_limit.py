@@ -0,0 +1,177 @@
+import threading
+from time import monotonic, perf_counter, sleep
+
+from observability_testing_tool.config.common import info_log, get_rate_limit, set_rate_limit
+from observability_testing_tool.obs import stats
+
+# The retry policy imports the Google Cloud API libraries, so it is imported when the first call is made
+
+
+# Default budgets (requests per second) follow the default write quotas of each API
+# See https://cloud.google.com/logging/quotas and https://cloud.google.com/monitoring/quotas
+defaultRateLimits = {
+    "logging": 120000 / 60,
+    "monitoring": 6000 / 60
+}
+
+_buckets = {}
+
+
+class TokenBucket:
+    """
+    A token bucket allowing `rate` calls per second on average, with bursts of up to `burst` calls.
+
+    When the API reports that the quota has been exceeded, `slow_down()` halves the rate. The rate
+    then recovers gradually towards the configured value for as long as no further errors are reported.
+    """
+
+    min_rate = 0.1
+    recovery_interval = 5.0
+    recovery_step = 0.1
+
+    def __init__(self, rate: float, burst: float = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.burst
+        self.last_refill = monotonic()
+        self.last_slow_down = None
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        if self.last_slow_down is not None and self.rate < self.max_rate and now - self.last_slow_down >= self.recovery_interval:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery_step)
+            self.last_slow_down = now if self.rate < self.max_rate else None
+
+    def _reserve(self, tokens: float) -> float:
+        with self.lock:
+            self._refill(monotonic())
+            self.tokens -= tokens
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def acquire(self, tokens: float = 1.0):
+        wait = self._reserve(tokens)
+        if wait > 0:
+            sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0):
+        import asyncio
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def slow_down(self):
+        with self.lock:
+            self._refill(monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+            self.last_slow_down = monotonic()
+
+
+def get_bucket(api: str) -> TokenBucket | None:
+    if api not in _buckets:
+        rate = get_rate_limit(api)
+        if rate is None:
+            rate = defaultRateLimits[api]
+        _buckets[api] = TokenBucket(rate) if rate > 0 else None
+    return _buckets[api]
+
+
+def reset_buckets():
+    _buckets.clear()
+
+
+def process_rate_limits(processes: int) -> dict:
+    """
+    Returns the request budget of each API for one of `processes` processes sending requests at the same time,
+    so that together they stay within the budget set for the run.
+    """
+    rates = {}
+    for api, default_rate in defaultRateLimits.items():
+        rate = get_rate_limit(api)
+        rates[api] = (rate if rate is not None else default_rate) / processes
+    return rates
+
+
+def set_process_rate_limits(rates: dict):
+    for api, rate in rates.items():
+        set_rate_limit(api, rate)
+    # a process started with fork() inherits the buckets of its parent
+    reset_buckets()
+
+
+def _retry_delay(api: str, bucket: TokenBucket | None, error: Exception, attempt: int, max_attempts: int) -> float | None:
+    # how long to wait before trying a failed call again, or None to give up
+    from google.api_core.exceptions import ResourceExhausted
+    from observability_testing_tool.obs import retry
+    stats.count("request_errors_total", api)
+    if attempt >= max_attempts or retry.is_partial_failure(error):
+        return None
+    if isinstance(error, ResourceExhausted) and bucket is not None:
+        bucket.slow_down()
+        info_log("Rate Limit: Quota exhausted for %s, slowing down to %.2f requests/s", api, bucket.rate)
+    delay = retry.backoff_delay(attempt)
+    info_log("Retry: %s call failed with %r, trying again in %.2fs", api, error, delay)
+    stats.count("retries_total", api)
+    return delay
+
+
+def limited_call(api: str, fn, *args, max_attempts: int = None, **kwargs):
+    """
+    Calls `fn` within the request budget of `api`. When the call fails with a transient error,
+    it is made again after an exponential backoff with jitter, up to `max_attempts` times in all.
+    When the API reports that the quota has been exhausted, the request budget slows down too.
+    """
+    from observability_testing_tool.obs import retry
+    max_attempts = max_attempts if max_attempts is not None else retry.maxAttempts
+    bucket = get_bucket(api)
+    attempt = 1
+    while True:
+        if bucket is not None:
+            bucket.acquire()
+        started = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except retry.retryableErrors as e:
+            delay = _retry_delay(api, bucket, e, attempt, max_attempts)
+            if delay is None:
+                raise
+        except Exception:
+            stats.count("request_errors_total", api)
+            raise
+        finally:
+            stats.count("requests_total", api)
+            stats.observe("request_seconds", api, perf_counter() - started)
+        sleep(delay)
+        attempt += 1
+
+
+async def limited_call_async(api: str, coro_fn, *args, max_attempts: int = None, **kwargs):
+    """
+    Awaits `coro_fn` within the request budget of `api`, like `limited_call()`.
+    """
+    import asyncio
+    from observability_testing_tool.obs import retry
+    max_attempts = max_attempts if max_attempts is not None else retry.maxAttempts
+    bucket = get_bucket(api)
+    attempt = 1
+    while True:
+        if bucket is not None:
+            await bucket.acquire_async()
+        started = perf_counter()
+        try:
+            return await coro_fn(*args, **kwargs)
+        except retry.retryableErrors as e:
+            delay = _retry_delay(api, bucket, e, attempt, max_attempts)
+            if delay is None:
+                raise
+        except Exception:
+            stats.count("request_errors_total", api)
+            raise
+        finally:
+            stats.count("requests_total", api)
+            stats.observe("request_seconds", api, perf_counter() - started)
+        await asyncio.sleep(delay)
+        attempt += 1
@@ -0,0 +1,146 @@
+import random
+import threading
+from collections import Counter
+from collections.abc import Callable
+from time import sleep
+
+import grpc
+from google.api_core.exceptions import GoogleAPICallError, ResourceExhausted, ServiceUnavailable, DeadlineExceeded, InternalServerError, Aborted, TooManyRequests
+from google.cloud.logging_v2.types import WriteLogEntriesPartialErrors
+from google.cloud.monitoring_v3.types import CreateTimeSeriesSummary
+
+from observability_testing_tool.config.common import flags, info_log, error_log
+from observability_testing_tool.obs import stats
+
+
+# Errors that are expected to go away when the same call is made again a little later
+retryableErrors = (ResourceExhausted, TooManyRequests, ServiceUnavailable, DeadlineExceeded, InternalServerError, Aborted)
+retryableCodes = {
+    grpc.StatusCode.RESOURCE_EXHAUSTED.value[0],
+    grpc.StatusCode.UNAVAILABLE.value[0],
+    grpc.StatusCode.DEADLINE_EXCEEDED.value[0],
+    grpc.StatusCode.INTERNAL.value[0],
+    grpc.StatusCode.ABORTED.value[0]
+}
+
+# Exponential backoff between attempts, in seconds, before jitter
+baseDelay = 0.25
+maxDelay = 30.0
+maxAttempts = 5
+
+_partial_log_errors = WriteLogEntriesPartialErrors.pb()
+_time_series_summary = CreateTimeSeriesSummary.pb()
+
+_failures = Counter()
+_failures_lock = threading.Lock()
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Returns how long to wait after the given (1-based) failed attempt: a random time between
+    zero and an exponentially growing limit ("full jitter"), so that processes and threads
+    that failed at the same time do not all try again at the same time.
+    """
+    return random.uniform(0, min(maxDelay, baseDelay * 2 ** (attempt - 1)))
+
+
+def partial_log_errors(error: Exception) -> dict | None:
+    """
+    Returns the status codes of the entries rejected by a `WriteLogEntries` call made with
+    `partial_success`, by their index in the request, or None if the whole call failed.
+    """
+    for detail in getattr(error, "details", None) or []:
+        if hasattr(detail, "Is") and detail.Is(_partial_log_errors.DESCRIPTOR):
+            partial = _partial_log_errors()
+            detail.Unpack(partial)
+            return {index: status.code for index, status in partial.log_entry_errors.items()}
+    return None
+
+
+def time_series_summary(error: Exception):
+    """
+    Returns the summary of the points written and rejected by a `CreateTimeSeries` call, if the error has one.
+    """
+    for detail in getattr(error, "details", None) or []:
+        if hasattr(detail, "Is") and detail.Is(_time_series_summary.DESCRIPTOR):
+            summary = _time_series_summary()
+            detail.Unpack(summary)
+            return summary
+    return None
+
+
+def is_partial_failure(error: Exception) -> bool:
+    # some of the request was written, so sending all of it again would duplicate those parts
+    return partial_log_errors(error) is not None or time_series_summary(error) is not None
+
+
+def record_failures(job_ids: list, error: Exception, kind: str = "entries"):
+    """
+    Counts the entries of each job that could not be written, giving up on the run by raising
+    `error` again when a job has lost more than its error budget (`--error-budget`).
+    """
+    lost = Counter(job_ids)
+    with _failures_lock:
+        _failures.update(lost)
+        totals = {job_id: _failures[job_id] for job_id in lost}
+    for job_id, count in lost.items():
+        stats.count("dropped_total", job_id or "-", count)
+        error_log("%s: Dropped %d %s after %r", job_id or "Unknown job", count, kind, error)
+    over_budget = [job_id for job_id, total in totals.items() if total > flags.error_budget]
+    if over_budget:
+        error_log("%s: More than %d %s lost, which is over the error budget", ", ".join(job_id or "Unknown job" for job_id in over_budget), flags.error_budget, kind)
+        raise error
+
+
+def reset_failures():
+    with _failures_lock:
+        _failures.clear()
+
+
+def write_log_entries(write: Callable, entries: list, job_ids: list):
+    """
+    Writes log entries with `write(entries)`, which takes care of rate limits and of retrying the
+    call when it fails as a whole. When only some entries are rejected, just those are sent again,
+    with backoff, if the reason they were rejected is transient. The others count against the
+    error budget of their job.
+    """
+    attempt = 1
+    while entries:
+        try:
+            write(entries)
+            return
+        except GoogleAPICallError as e:
+            rejected = partial_log_errors(e)
+            if rejected is None:
+                record_failures(job_ids, e)
+                return
+            retry = sorted(index for index, code in rejected.items() if code in retryableCodes)
+            failed = [job_ids[index] for index in rejected if index not in retry]
+            if attempt >= maxAttempts:
+                failed += [job_ids[index] for index in retry]
+                retry = []
+            if failed:
+                record_failures(failed, e)
+            entries = [entries[index] for index in retry]
+            job_ids = [job_ids[index] for index in retry]
+            if entries:
+                delay = backoff_delay(attempt)
+                info_log("Retry: %d of the log entries were rejected for now, sending them again in %.2fs", len(entries), delay)
+                stats.count("retries_total", "logging")
+                sleep(delay)
+                attempt += 1
+
+
+def write_time_series(write: Callable, time_series: list, job_ids: list):
+    """
+    Writes time series with `write(time_series)`, which takes care of rate limits and of retrying
+    the call when it fails as a whole. The API does not say which time series it rejected, so
+    all the ones in a failed call count against the error budget of their job.
+    """
+    try:
+        write(time_series)
+    except GoogleAPICallError as e:
+        summary = time_series_summary(e)
+        if summary is not None:
+            info_log("Retry: %d of %d points were written", summary.success_point_count, summary.total_point_count)
+        record_failures(job_ids, e, kind="points")
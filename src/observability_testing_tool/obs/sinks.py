@@ -0,0 +1,251 @@
+import json
+from os import getpid, makedirs, path
+
+from observability_testing_tool.config.common import flags, debug_log, info_log
+
+
+# Python buffers file writes up to this size before handing them over to the OS
+writeBufferBytes = 1024 * 1024
+# Rows collected before writing a record batch in the columnar formats
+columnarBatchRows = 10000
+
+_file_extensions = {
+    "ndjson": "ndjson",
+    "parquet": "parquet",
+    "arrow": "arrow"
+}
+
+_sink = None
+# Sequence number of the next file of each kind, so that rotated and later files never overwrite earlier ones
+_file_sequence = {}
+
+
+class Sink:
+    """
+    Destination of the rendered log entries and time series, in place of the Google Cloud APIs.
+
+    Log entries are the JSON representation of a `LogEntry`, as sent by `entries.write`.
+    Time series are `TimeSeries` objects, sent by `timeSeries.create` to `project_name`.
+    A sink that `discards` what it is given does not need the entries and time series to be built at all.
+    """
+
+    discards = False
+
+    def write_log_entries(self, entries: list):
+        pass
+
+    def write_time_series(self, project_name: str, time_series: list):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullSink(Sink):
+    """
+    Discards everything, which is what happens in dry-run mode.
+    """
+
+    discards = True
+
+
+class FileSink(Sink):
+    """
+    Writes log entries and time series to files in `directory`, one record per entry or time series.
+
+    Each process writes its own files, named `logs-<pid>-<seq>.<ext>` and `metrics-<pid>-<seq>.<ext>`.
+    A new file is started when the current one reaches `rotate_size` bytes (0 for no rotation).
+    """
+
+    def __init__(self, directory: str, output_format: str = "ndjson", rotate_size: int = 0):
+        if output_format not in _file_extensions:
+            raise ValueError(f"Invalid output format {output_format}")
+        if output_format != "ndjson":
+            # fail early if the optional dependency is missing
+            _import_pyarrow()
+        makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.output_format = output_format
+        self.rotate_size = rotate_size
+        self.writers = {}
+
+    def _writer(self, kind: str):
+        writer = self.writers.get(kind)
+        if writer is not None and self.rotate_size > 0 and writer.size >= self.rotate_size:
+            writer.close()
+            writer = None
+        if writer is None:
+            sequence = _file_sequence.get(kind, 0)
+            _file_sequence[kind] = sequence + 1
+            file_name = path.join(self.directory, f"{kind}-{getpid()}-{sequence:04d}.{_file_extensions[self.output_format]}")
+            debug_log("Output: Writing %s to %s", kind, file_name)
+            if self.output_format == "ndjson":
+                writer = _NdjsonWriter(file_name)
+            else:
+                writer = _ColumnarWriter(file_name, self.output_format, _columns[kind])
+            self.writers[kind] = writer
+        return writer
+
+    def write_log_entries(self, entries: list):
+        self._writer("logs").write(entries)
+
+    def write_time_series(self, project_name: str, time_series: list):
+        self._writer("metrics").write([_series_record(project_name, series) for series in time_series])
+
+    def flush(self):
+        for writer in self.writers.values():
+            writer.flush()
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+
+
+class _NdjsonWriter:
+    __slots__ = ("file", "size")
+
+    def __init__(self, file_name: str):
+        self.file = open(file_name, "w", encoding="utf-8", buffering=writeBufferBytes)
+        self.size = 0
+
+    def write(self, records: list):
+        text = "".join(json.dumps(record, default=str) + "\n" for record in records)
+        self.file.write(text)
+        self.size += len(text)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class _ColumnarWriter:
+    """
+    Writes records to a Parquet or Arrow IPC file. A few fields are columns of their own,
+    for filtering and sorting, while the whole record is kept as JSON in the `record` column.
+    """
+    __slots__ = ("pa", "file_name", "output_format", "columns", "schema", "writer", "rows", "size")
+
+    def __init__(self, file_name: str, output_format: str, columns: list):
+        self.pa = _import_pyarrow()
+        self.file_name = file_name
+        self.output_format = output_format
+        self.columns = columns
+        self.schema = self.pa.schema([(column, self.pa.string()) for column, _ in columns] + [("record", self.pa.string())])
+        self.writer = None
+        self.rows = []
+        # uncompressed size of the records, which is an upper bound of the size of the file
+        self.size = 0
+
+    def write(self, records: list):
+        for record in records:
+            text = json.dumps(record, default=str)
+            self.rows.append([getter(record) for _, getter in self.columns] + [text])
+            self.size += len(text)
+        if len(self.rows) >= columnarBatchRows:
+            self._write_rows()
+
+    def _write_rows(self):
+        if not self.rows: return
+        pa = self.pa
+        if self.writer is None:
+            if self.output_format == "parquet":
+                import pyarrow.parquet
+                self.writer = pyarrow.parquet.ParquetWriter(self.file_name, self.schema)
+            else:
+                self.writer = pa.ipc.new_file(self.file_name, self.schema)
+        columns = list(zip(*self.rows))
+        self.writer.write_batch(pa.record_batch([pa.array(column, pa.string()) for column in columns], schema=self.schema))
+        self.rows = []
+
+    def flush(self):
+        # the file is only complete once closed, but the rows so far are handed over to the writer
+        self._write_rows()
+
+    def close(self):
+        self._write_rows()
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("Parquet and Arrow output require pyarrow: install it with 'pip install observability-testing-tool[output]'")
+
+
+def _series_record(project_name: str, series) -> dict:
+    # camelCase JSON, as in the REST API, which maps back onto the protobuf with ParseDict
+    from google.protobuf.json_format import MessageToDict
+    return {"name": project_name, **MessageToDict(type(series).pb(series))}
+
+
+def _nested_get(*keys):
+    def getter(record: dict):
+        value = record
+        for key in keys:
+            if not isinstance(value, dict): return None
+            value = value.get(key)
+        return value if value is None or isinstance(value, str) else str(value)
+    return getter
+
+
+_columns = {
+    "logs": [
+        ("timestamp", _nested_get("timestamp")),
+        ("logName", _nested_get("logName")),
+        ("severity", _nested_get("severity")),
+        ("resourceType", _nested_get("resource", "type"))
+    ],
+    "metrics": [
+        ("name", _nested_get("name")),
+        ("metricType", _nested_get("metric", "type")),
+        ("resourceType", _nested_get("resource", "type"))
+    ]
+}
+
+
+_null_sink = NullSink()
+
+
+def get_sink() -> Sink | None:
+    """
+    Returns the sink that takes the place of the Google Cloud APIs in this process:
+    a `FileSink` if an output directory is configured, a `NullSink` in dry-run mode,
+    or None if entries are to be sent to Google Cloud.
+    """
+    global _sink
+    if _sink is None:
+        # checked for every entry, so the flags are read directly
+        if flags.output is not None:
+            _sink = FileSink(flags.output, flags.output_format, flags.output_rotate_size)
+        elif flags.dry_run:
+            return _null_sink
+    return _sink
+
+
+def flush_sink():
+    """
+    Writes out what the files of the current sink, if any, are holding in memory.
+    """
+    if _sink is not None:
+        _sink.flush()
+
+
+def close_sink():
+    """
+    Closes the files of the current sink, if any. Later writes start new files.
+    """
+    global _sink
+    if _sink is None: return
+    _sink.close()
+    info_log("Output: Closed files in %s", _sink.directory)
+    _sink = None
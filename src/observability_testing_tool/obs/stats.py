@@ -0,0 +1,263 @@
+import threading
+from bisect import bisect_left
+from multiprocessing import Queue
+from os import getpid
+from time import sleep
+
+from observability_testing_tool.config.common import info_log, error_log
+
+
+# Upper bounds of the histogram buckets, in seconds or in entries per request
+timeBuckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+sizeBuckets = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Child processes report their statistics to the main process this often, in seconds
+reportInterval = 1.0
+
+# name: (kind, label, buckets, help)
+metrics = {
+    "entries_total": ("counter", "job_id", None, "Log entries and metric points rendered"),
+    "generate_seconds": ("histogram", "job_id", timeBuckets, "Time spent expanding the variables of a point"),
+    "render_seconds": ("histogram", "job_id", timeBuckets, "Time spent rendering the payload of a point"),
+    "scheduler_lag_seconds": ("histogram", "job_id", timeBuckets, "Delay of live points behind their scheduled time"),
+    "dropped_total": ("counter", "job_id", None, "Log entries and metric points lost to writes that failed for good"),
+    "missed_total": ("counter", "job_id", None, "Live points dropped or coalesced because the entry fell behind its schedule"),
+    "requests_total": ("counter", "api", None, "API calls"),
+    "request_errors_total": ("counter", "api", None, "API calls that failed"),
+    "retries_total": ("counter", "api", None, "API calls tried again after a transient error"),
+    "request_seconds": ("histogram", "api", timeBuckets, "Duration of API calls"),
+    "batch_size": ("histogram", "api", sizeBuckets, "Log entries or time series per API call or output file write")
+}
+
+# Counters hold a number, histograms a list of the count of each bucket followed by the sum and the total count.
+# Values are keyed by (name, label value), and only contain plain types so that they can be sent between processes.
+_values = {}
+_lock = threading.Lock()
+
+# the statistics last reported by each child process, by process id
+_reports = {}
+_queue = None
+_collector = None
+_server = None
+
+
+def count(name: str, label: str, value: float = 1):
+    key = (name, label)
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+
+
+def observe(name: str, label: str, value: float):
+    buckets = metrics[name][2]
+    key = (name, label)
+    with _lock:
+        histogram = _values.get(key)
+        if histogram is None:
+            histogram = _values[key] = [0] * (len(buckets) + 3)
+        histogram[bisect_left(buckets, value)] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {key: list(value) if isinstance(value, list) else value for key, value in _values.items()}
+
+
+def reset():
+    with _lock:
+        _values.clear()
+    _reports.clear()
+
+
+def merge(*snapshots: dict) -> dict:
+    merged = {}
+    for values in snapshots:
+        for key, value in values.items():
+            current = merged.get(key)
+            if current is None:
+                merged[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                merged[key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged[key] = current + value
+    return merged
+
+
+def stats_queue() -> Queue:
+    """
+    Returns the queue through which child processes report their statistics, and starts
+    collecting them into the statistics of this process the first time it is called.
+    """
+    global _queue, _collector
+    if _queue is None:
+        _queue = Queue()
+        _collector = threading.Thread(target=_collect, args=(_queue,), daemon=True)
+        _collector.start()
+    return _queue
+
+
+def _collect(queue: Queue):
+    while (report := queue.get()) is not None:
+        pid, values = report
+        _reports[pid] = values
+
+
+def finish_collecting():
+    """
+    Waits for the statistics already reported by child processes to be collected.
+    Child processes must have exited, or they may report again after this call.
+    """
+    global _queue, _collector
+    if _queue is None: return
+    # the queue is first in, first out, so everything reported before this is collected first
+    _queue.put(None)
+    _collector.join()
+    _queue = None
+    _collector = None
+
+
+def start_reporting(queue: Queue):
+    """
+    Reports the statistics of this (child) process to the main process every `reportInterval` seconds.
+    """
+    def run():
+        while True:
+            sleep(reportInterval)
+            report(queue)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def report(queue: Queue):
+    queue.put((getpid(), snapshot()))
+
+
+def collected() -> dict:
+    """
+    Returns the statistics of this process merged with the ones last reported by child processes.
+    """
+    return merge(snapshot(), *list(_reports.values()))
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_prometheus(values: dict) -> str:
+    """
+    Formats statistics in the Prometheus text exposition format.
+    See https://prometheus.io/docs/instrumenting/exposition_formats/
+    """
+    lines = []
+    for name, (kind, label, buckets, help_text) in metrics.items():
+        metric = f"obstool_{name}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for (key_name, label_value), value in sorted(values.items()):
+            if key_name != name: continue
+            labels = f'{label}="{_label_value(label_value)}"'
+            if kind == "counter":
+                lines.append(f"{metric}{{{labels}}} {value}")
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ("+Inf",), value):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum{{{labels}}} {value[-2]}")
+            lines.append(f"{metric}_count{{{labels}}} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def start_server(port: int) -> int:
+    """
+    Serves the statistics on http://localhost:PORT/metrics, for Prometheus to scrape, and returns the port.
+    """
+    # http.server is only imported when the statistics are served, as it takes a while to import
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = format_prometheus(collected()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    global _server
+    _server = ThreadingHTTPServer(("", port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    info_log("Stats: Serving statistics on http://localhost:%d/metrics", _server.server_port)
+    return _server.server_port
+
+
+def stop_server():
+    global _server
+    if _server is None: return
+    _server.shutdown()
+    _server.server_close()
+    _server = None
+
+
+def quantile(histogram: list, buckets: tuple, q: float) -> float:
+    """
+    Estimates a quantile of a histogram as the upper bound of the bucket it falls in.
+    """
+    rank = q * histogram[-1]
+    cumulative = 0
+    for bound, bucket_count in zip(buckets, histogram):
+        cumulative += bucket_count
+        if cumulative >= rank:
+            return bound
+    return float("inf")
+
+
+def _time_summary(values: dict, name: str, label: str) -> str:
+    histogram = values.get((name, label))
+    if histogram is None or histogram[-1] == 0:
+        return "-"
+    return f"{histogram[-2] / histogram[-1] * 1000:.3f}ms (p99 <{quantile(histogram, timeBuckets, 0.99) * 1000:g}ms)"
+
+
+def summary(values: dict) -> list:
+    lines = []
+    jobs = sorted({label for (name, label) in values if metrics[name][1] == "job_id"})
+    for job_id in jobs:
+        lines.append(
+            f"{job_id}: {values.get(('entries_total', job_id), 0):g} entries, "
+            f"generate {_time_summary(values, 'generate_seconds', job_id)}, "
+            f"render {_time_summary(values, 'render_seconds', job_id)}"
+            + (f", lag {_time_summary(values, 'scheduler_lag_seconds', job_id)}" if ("scheduler_lag_seconds", job_id) in values else "")
+            + (f", {values[('missed_total', job_id)]:g} missed" if ("missed_total", job_id) in values else "")
+            + (f", {values[('dropped_total', job_id)]:g} dropped" if ("dropped_total", job_id) in values else "")
+        )
+    apis = sorted({label for (name, label) in values if metrics[name][1] == "api"})
+    for api in apis:
+        batches = values.get(("batch_size", api), [0, 0])
+        lines.append(
+            f"{api}: {batches[-1]:g} writes"
+            + (f" of {batches[-2] / batches[-1]:.1f} on average" if batches[-1] > 0 else "")
+            + f", {values.get(('requests_total', api), 0):g} API requests "
+            f"({values.get(('request_errors_total', api), 0):g} failed, {values.get(('retries_total', api), 0):g} retried), "
+            f"latency {_time_summary(values, 'request_seconds', api)}"
+        )
+    return lines
+
+
+def print_summary():
+    """
+    Prints a summary of the statistics of this process and all child processes.
+    """
+    finish_collecting()
+    lines = summary(collected())
+    if not lines: return
+    # shown at every log level, like errors, as it is the outcome of the run
+    error_log("Stats: Summary of the run\n%s", "\n".join(lines), level="I")
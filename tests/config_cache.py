@@ -0,0 +1,108 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from os import environ, path
+
+from observability_testing_tool.config import cache, executor
+from observability_testing_tool.config.common import set_config_cache, set_seed, flags
+from observability_testing_tool.config.parser import parse_config, prepare_config, refresh_config
+
+
+_config = """
+dataSources:
+  home:
+    sourceType: env
+    value: OBSTOOL_TEST_CACHE
+  num:
+    sourceType: random
+    value: int
+    range: "1~1000"
+loggingJobs:
+  - frequency: "1m"
+    startOffset: "-1h"
+    textPayload: "{home} {num}"
+    variables: [home, num]
+"""
+
+
+def _values(config: dict) -> list:
+    executor._config = config
+    entry = next(executor._batch_entries("loggingJobs", "logEntries"))
+    return [vars_dict for _, _, vars_dict in executor._entry_timeline(entry)]
+
+
+class ConfigCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        set_config_cache(path.join(self.directory.name, "cache"))
+        self.config_file = path.join(self.directory.name, "config.yaml")
+        with open(self.config_file, "w") as file:
+            file.write(_config)
+        environ["OBSTOOL_TEST_CACHE"] = "first"
+
+
+    def tearDown(self):
+        set_config_cache("")
+        environ.pop("OBSTOOL_TEST_CACHE", None)
+        environ.pop("OBSTOOL_SEED", None)
+        flags.seed = None
+        self.directory.cleanup()
+
+
+    def _prepare(self) -> dict:
+        # as a run of the tool would
+        file_name = cache.cache_file_name(self.config_file)
+        config = cache.load_config(file_name)
+        if config is not None:
+            refresh_config(config)
+            return config
+        config = parse_config(self.config_file)
+        prepare_config(config, validate=True)
+        cache.save_config(file_name, config)
+        return config
+
+
+    def test_file_name(self):
+        file_name = cache.cache_file_name(self.config_file)
+        self.assertEqual(file_name, cache.cache_file_name(self.config_file))
+        with open(self.config_file, "a") as file:
+            file.write("\n# changed\n")
+        self.assertNotEqual(file_name, cache.cache_file_name(self.config_file))
+
+
+    def test_cached(self):
+        first = self._prepare()
+        self.assertTrue(path.exists(cache.cache_file_name(self.config_file)))
+        # the settings of every run are kept out of the cache, but not out of the configuration
+        self.assertIn("__random__", first["loggingJobs"][0]["logEntries"][0])
+        self.assertIsNone(cache.load_config(cache.cache_file_name(self.config_file))["loggingJobs"][0]["logEntries"][0].get("__random__"))
+        second = self._prepare()
+        self.assertEqual(first["loggingJobs"][0]["frequency"], second["loggingJobs"][0]["frequency"])
+
+
+    def test_relative_times(self):
+        self._prepare()
+        started = datetime.now()
+        entry = self._prepare()["loggingJobs"][0]["logEntries"][0]
+        # start offsets are resolved against the time of the run, not of the cached one
+        self.assertGreaterEqual(entry["startTime"], started - timedelta(hours=1))
+        self.assertEqual(entry["originalStartTime"] - timedelta(hours=1), entry["startTime"])
+
+
+    def test_environment(self):
+        self._prepare()
+        environ["OBSTOOL_TEST_CACHE"] = "second"
+        values = _values(self._prepare())
+        self.assertEqual({"second"}, {vars_dict["home"] for vars_dict in values})
+
+
+    def test_seeded(self):
+        set_seed(3)
+        expected = _values(self._prepare())
+        # a run from the cache generates the same values as the run that prepared the configuration
+        self.assertEqual(expected, _values(self._prepare()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import random
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from observability_testing_tool.config import checkpoint, executor
+from observability_testing_tool.config.common import set_checkpoint, set_resume, set_queue_size
+from observability_testing_tool.config.variables import compile_variables
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def _data_sources() -> dict:
+    return {
+        "num": {"sourceType": "random", "value": "int", "range": {"from": 0, "to": 1000}},
+        "back": {"sourceType": "dynamic", "formula": "backoff", "base": 1.0, "factor": 1.5}
+    }
+
+
+def _run(stop_after: int = None) -> list:
+    # runs an entry of 100 points in a fresh configuration, as a new process would
+    data_sources = _data_sources()
+    executor._config = {"dataSources": data_sources}
+    start_time = datetime(2025, 1, 1, 12, 0, 0)
+    entry = {
+        "id": "log#001/001",
+        "startTime": start_time,
+        "endTime": start_time + timedelta(seconds=1000),
+        "frequency": timedelta(seconds=10),
+        "__expanders__": compile_variables(["num", "back"], data_sources)
+    }
+    submitted = []
+
+    def submitter(submit_time, entry, vars_dict):
+        if stop_after is not None and len(submitted) == stop_after:
+            raise _Interrupted()
+        submitted.append((submit_time, vars_dict))
+
+    try:
+        executor._run_batch_entries([entry], lambda submit_time, entry, vars_dict: vars_dict, submitter)
+    except _Interrupted:
+        pass
+    return submitted
+
+
+class CheckpointTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.mark_interval = checkpoint.markInterval
+        self.checkpoint_interval = checkpoint.checkpointInterval
+        checkpoint.markInterval = 10
+        checkpoint.checkpointInterval = 0
+        set_queue_size(0)
+
+
+    def tearDown(self):
+        checkpoint.markInterval = self.mark_interval
+        checkpoint.checkpointInterval = self.checkpoint_interval
+        set_checkpoint("")
+        set_resume(False)
+        set_queue_size(1000)
+        self.directory.cleanup()
+
+
+    def test_resume(self):
+        random.seed(1)
+        expected = _run()
+        self.assertEqual(100, len(expected))
+
+        set_checkpoint(self.directory.name)
+        random.seed(1)
+        first = _run(stop_after=35)
+        set_resume(True)
+        # the random numbers of the resumed run come from the checkpoint
+        random.seed(2)
+        second = _run()
+        # no point is lost or submitted twice, and the values are the same as without the interruption
+        self.assertEqual(35, len(first))
+        self.assertEqual(expected, first + second)
+
+
+    def test_done(self):
+        set_checkpoint(self.directory.name)
+        self.assertEqual(100, len(_run()))
+        set_resume(True)
+        self.assertEqual([], _run())
+
+
+if __name__ == '__main__':
+    unittest.main()
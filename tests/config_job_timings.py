@@ -1,7 +1,8 @@
+import pickle
 import unittest
 from datetime import timedelta, datetime
 
-from observability_testing_tool.config.parser import configure_entry_timings
+from observability_testing_tool.config.parser import configure_entry_timings, FrequencyTemplate
 
 
 class JobTimingsTests(unittest.TestCase):
@@ -142,5 +143,29 @@ class JobTimingsTests(unittest.TestCase):
         self.assertGreater(config["startTime"] + config["frequency"], config["endTime"])
 
 
+    def test_variable_frequency(self):
+        config = {
+            "live": False,
+            "frequency": "{freq}ms",
+            "startTime": "2024-10-09 15:00",
+            "endOffset": "5m"
+        }
+        configure_entry_timings(config, {"live": False})
+        frequency = config["frequency"]
+        self.assertIsInstance(frequency, FrequencyTemplate)
+        self.assertEqual(timedelta(milliseconds=250), frequency({"freq": 250}))
+        self.assertEqual(timedelta(milliseconds=1.5), frequency({"freq": "1.5"}))
+        # compiled frequencies go to worker and live processes with their entry
+        self.assertEqual(timedelta(milliseconds=3), pickle.loads(pickle.dumps(frequency))({"freq": 3}))
+
+
+    def test_variable_frequency_template(self):
+        frequency = FrequencyTemplate("{low}s~{high}m")
+        self.assertEqual({"from": timedelta(seconds=30), "to": timedelta(minutes=2)}, frequency({"low": 30, "high": 2}))
+        self.assertEqual(timedelta(hours=1, minutes=30), FrequencyTemplate("1h{extra}")({"extra": "30m"}))
+        with self.assertRaises(ValueError):
+            FrequencyTemplate("{freq}s")({"freq": "soon"})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from time import monotonic
+
+from observability_testing_tool.config import live_async
+from observability_testing_tool.config.common import set_catch_up
+
+
+def _entry(entry_id: str, frequency: float, duration: float) -> dict:
+    start_time = datetime.now()
+    return {
+        "id": entry_id,
+        "frequency": timedelta(seconds=frequency),
+        "startTime": start_time,
+        "endTime": start_time + timedelta(seconds=duration)
+    }
+
+
+class _Handler:
+    """A fake submission, taking `latency` seconds, that records the points and the submissions in flight."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.points = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, submit_time: datetime, entry: dict, vars_dict: dict):
+        self.points.append((entry["id"], submit_time))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+
+def _run(entries: list):
+    # no client is set up, as the entries are handed to the fake submissions directly
+    asyncio.run(live_async._run_live_entries(entries, {"dataSources": {}, "logEntries": [], "metricEntries": []}))
+
+
+class LiveAsyncTests(unittest.TestCase):
+
+    def setUp(self):
+        self.max_in_flight = live_async.maxInFlight
+        set_catch_up("burst")
+
+
+    def tearDown(self):
+        live_async.maxInFlight = self.max_in_flight
+
+
+    def test_concurrent_entries(self):
+        handler = _Handler(latency=0.15)
+        started = monotonic()
+        _run([(_entry("a", 0.1, 0.5), handler), (_entry("b", 0.1, 0.5), handler)])
+        # the submissions of both entries overlap, rather than running one after the other
+        self.assertLess(monotonic() - started, 1.0)
+        self.assertGreaterEqual(handler.max_in_flight, 3)
+        self.assertEqual({"a", "b"}, {entry_id for entry_id, _ in handler.points[:2]})
+
+
+    def test_max_in_flight(self):
+        live_async.maxInFlight = 3
+        handler = _Handler(latency=0.2)
+        _run([(_entry("a", 0.01, 0.3), handler), (_entry("b", 0.01, 0.3), handler)])
+        # new points wait for a submission to complete once the limit is reached
+        self.assertEqual(3, handler.max_in_flight)
+        self.assertGreater(len(handler.points), 3)
+
+
+    def test_end_time(self):
+        handler = _Handler(latency=0)
+        entry = _entry("a", 0.1, 0.35)
+        _run([(entry, handler), (_entry("b", 0.1, 0.15), handler)])
+        points = [submit_time for entry_id, submit_time in handler.points if entry_id == "a"]
+        self.assertEqual(4, len(points))
+        self.assertTrue(all(submit_time < entry["endTime"] for submit_time in points))
+        # the shorter entry stops on its own, while the other one goes on
+        self.assertEqual(2, len([entry_id for entry_id, _ in handler.points if entry_id == "b"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
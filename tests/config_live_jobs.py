@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from os import getpid, listdir, path
+from unittest.mock import patch
+
+from observability_testing_tool.config import executor
+from observability_testing_tool.config.common import set_live_engine
+
+
+def _job(job_id: str, entry_key: str) -> dict:
+    start_time = datetime.now()
+    return {
+        "id": job_id,
+        "live": True,
+        entry_key: [{
+            "id": f"{job_id}/001",
+            "frequency": timedelta(seconds=0.1),
+            "startTime": start_time,
+            "endTime": start_time + timedelta(seconds=0.35)
+        }]
+    }
+
+
+class LiveJobsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        set_live_engine("sched")
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def _recorder(self, kind: str):
+        # runs in the live process, recording the process it runs in
+        def record(*args):
+            with open(path.join(self.directory.name, f"{kind}-{getpid()}-{len(listdir(self.directory.name))}"), "w"):
+                pass
+        return record
+
+
+    def _run(self, logging_jobs: list, monitoring_jobs: list) -> list:
+        executor._config = {
+            "dataSources": {},
+            "loggingJobs": logging_jobs,
+            "monitoringJobs": monitoring_jobs,
+            "hasLiveLoggingJobs": bool(logging_jobs),
+            "hasLiveMonitoringJobs": bool(monitoring_jobs)
+        }
+        with patch.object(executor, "setup_logging_client", self._recorder("logging_client")), \
+                patch.object(executor, "setup_monitoring_client", self._recorder("monitoring_client")), \
+                patch.object(executor, "handle_logging_job", self._recorder("log")), \
+                patch.object(executor, "handle_monitoring_job", self._recorder("metric")):
+            process = executor.run_live_jobs()
+            process.join()
+        self.assertEqual(0, process.exitcode)
+        return [file_name.split("-")[:2] for file_name in listdir(self.directory.name)]
+
+
+    def test_single_process(self):
+        records = self._run([_job("log#001", "logEntries")], [_job("mon#001", "metricEntries")])
+        # the logging and monitoring entries are run by the same scheduler, in a process of its own
+        pids = {pid for _, pid in records}
+        self.assertEqual(1, len(pids))
+        self.assertNotIn(str(getpid()), pids)
+        kinds = [kind for kind, _ in records]
+        self.assertEqual(4, kinds.count("log"))
+        self.assertEqual(4, kinds.count("metric"))
+        self.assertEqual(1, kinds.count("logging_client"))
+        self.assertEqual(1, kinds.count("monitoring_client"))
+
+
+    def test_clients_needed(self):
+        records = self._run([_job("log#001", "logEntries")], [])
+        # only the client for the kinds of entries there are is set up
+        kinds = [kind for kind, _ in records]
+        self.assertEqual(1, kinds.count("logging_client"))
+        self.assertNotIn("monitoring_client", kinds)
+        self.assertEqual(4, kinds.count("log"))
+
+
+    def test_no_live_entries(self):
+        executor._config = {"loggingJobs": [], "monitoringJobs": [], "hasLiveLoggingJobs": False, "hasLiveMonitoringJobs": False}
+        self.assertIsNone(executor.run_live_jobs())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from datetime import datetime, timedelta
+from time import time
+
+from observability_testing_tool.config.common import set_catch_up
+from observability_testing_tool.config.executor import _live_point
+from observability_testing_tool.obs import stats
+
+
+class LiveScheduleTests(unittest.TestCase):
+
+    def setUp(self):
+        stats.reset()
+        self.entry = {"id": "log#001/001", "frequency": timedelta(seconds=1)}
+
+
+    def tearDown(self):
+        set_catch_up("burst")
+        stats.reset()
+
+
+    def test_on_time(self):
+        set_catch_up("skip")
+        due = time()
+        submit_time, vars_dict, next_due = _live_point(self.entry, {}, due)
+        # points are timestamped with their scheduled time, and the next one is one interval later
+        self.assertEqual(datetime.fromtimestamp(due), submit_time)
+        self.assertEqual(due + 1, next_due)
+        self.assertNotIn(("missed_total", "log#001/001"), stats.snapshot())
+
+
+    def test_burst(self):
+        set_catch_up("burst")
+        due = time() - 2.5
+        submit_time, _, next_due = _live_point(self.entry, {}, due)
+        self.assertEqual(datetime.fromtimestamp(due), submit_time)
+        self.assertEqual(due + 1, next_due)
+
+
+    def test_skip(self):
+        set_catch_up("skip")
+        due = time() - 2.5
+        submit_time, _, next_due = _live_point(self.entry, {}, due)
+        self.assertIsNone(submit_time)
+        self.assertEqual(due + 3, next_due)
+        self.assertEqual(3, stats.snapshot()[("missed_total", "log#001/001")])
+
+
+    def test_coalesce(self):
+        set_catch_up("coalesce")
+        due = time() - 2.5
+        submit_time, _, next_due = _live_point(self.entry, {}, due)
+        self.assertLess(abs(datetime.now() - submit_time), timedelta(seconds=1))
+        self.assertEqual(due + 3, next_due)
+        self.assertEqual(2, stats.snapshot()[("missed_total", "log#001/001")])
+
+
+if __name__ == '__main__':
+    unittest.main()
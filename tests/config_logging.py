@@ -0,0 +1,79 @@
+import tempfile
+import unittest
+from os import environ, path
+
+from observability_testing_tool.config import common
+from observability_testing_tool.config.common import flags, set_log_level, set_log_file, set_dry_run, info_log, debug_log, error_log, flush_log
+
+
+class _Counted:
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "counted"
+
+
+class LoggingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_name = path.join(self.directory.name, "tool.log")
+        set_log_file(self.file_name)
+
+
+    def tearDown(self):
+        set_log_file("")
+        set_log_level(0)
+        self.directory.cleanup()
+
+
+    def _lines(self) -> list:
+        flush_log()
+        with open(self.file_name) as file:
+            return [line.rstrip("\n") for line in file if line.strip()]
+
+
+    def test_lazy_arguments(self):
+        set_log_level(1)
+        counted = _Counted()
+        debug_log("Debug %s", counted)
+        self.assertEqual(0, counted.formatted)
+        info_log("Info %s", counted)
+        self.assertEqual(1, counted.formatted)
+        self.assertTrue(self._lines()[0].endswith(" I %07d Info counted" % common._pid))
+
+
+    def test_obj_and_exception(self):
+        set_log_level(1)
+        info_log("Payload of %s", "log#001/001", obj={"a": 1}, ex=ValueError("bad"))
+        lines = self._lines()
+        self.assertTrue(lines[0].endswith("Payload of log#001/001"))
+        self.assertTrue(lines[1].endswith(" | {'a': 1}"))
+        self.assertTrue(lines[2].endswith(" | ValueError('bad')"))
+
+
+    def test_buffered(self):
+        set_log_level(1)
+        info_log("Buffered")
+        self.assertFalse(path.exists(self.file_name) and path.getsize(self.file_name) > 0)
+        # errors are written out straight away, with what was already buffered
+        error_log("Error with a literal %")
+        with open(self.file_name) as file:
+            text = file.read()
+        self.assertIn("Buffered", text)
+        self.assertIn("Error with a literal %", text)
+
+
+    def test_flags(self):
+        set_dry_run(True)
+        self.assertTrue(flags.dry_run)
+        self.assertEqual("True", environ["OBSTOOL_DRY_RUN"])
+        set_dry_run(False)
+        self.assertFalse(flags.dry_run)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+
+from observability_testing_tool.config import executor
+from observability_testing_tool.config.common import set_seed, flags
+from observability_testing_tool.config.parser import prepare_config
+
+
+def _config(matrix: dict) -> dict:
+    return {
+        "dataSources": {
+            "num": {"sourceType": "random", "value": "int", "range": "1~1000"},
+            "zones": {"sourceType": "list", "value": ["eu-a", "eu-b"]},
+            "num2": {"sourceType": "random", "value": "float", "range": "1~10"}
+        },
+        "loggingJobs": [{
+            "id": "fleet",
+            "frequency": "10m",
+            "startTime": "2025-01-01 10:00",
+            "endTime": "2025-01-01 11:00",
+            "startOffset": "0s~60s",
+            "textPayload": "{host} {num}",
+            "variables": ["num"],
+            "matrix": matrix,
+            "logEntries": [{"id": "a"}, {"id": "b"}]
+        }]
+    }
+
+
+def _entries(config: dict) -> list:
+    prepare_config(config, validate=True)
+    executor._config = config
+    return list(executor._batch_entries("loggingJobs", "logEntries"))
+
+
+def _values(entry: dict) -> list:
+    return [vars_dict for _, _, vars_dict in executor._entry_timeline(entry)]
+
+
+class MatrixTests(unittest.TestCase):
+
+    def tearDown(self):
+        flags.seed = None
+
+
+    def test_axes(self):
+        entries = _entries(_config({"host": {"range": "0~3"}, "zone": {"dataSource": "zones"}, "code": [200, 500]}))
+        # every entry of the job is repeated for every cell
+        self.assertEqual(2 * 3 * 2 * 2, len(entries))
+        self.assertEqual(len(entries), len({entry["id"] for entry in entries}))
+        self.assertEqual("log#fleet/a[0]", entries[0]["id"])
+        cells = [(vars_dict["host"], vars_dict["zone"], vars_dict["code"]) for vars_dict in (_values(entry)[0] for entry in entries[:12])]
+        self.assertEqual((0, "eu-a", 200), cells[0])
+        self.assertEqual((0, "eu-a", 500), cells[1])
+        self.assertEqual((2, "eu-b", 500), cells[11])
+        self.assertEqual(12, len(set(cells)))
+
+
+    def test_shared(self):
+        entries = _entries(_config({"host": ["h1", "h2"]}))
+        # the cells share the compiled templates of their entry, but not its random numbers
+        self.assertIs(entries[0]["__templates__"], entries[1]["__templates__"])
+        self.assertIsNot(entries[0]["__random__"], entries[1]["__random__"])
+        self.assertEqual({"h1"}, {vars_dict["host"] for vars_dict in _values(entries[0])})
+
+
+    def test_seeded(self):
+        set_seed(11)
+        first = [_values(entry) for entry in _entries(_config({"host": {"range": "0~4"}}))]
+        second = [_values(entry) for entry in _entries(_config({"host": {"range": "0~4"}}))]
+        self.assertEqual(first, second)
+        # each cell has random number streams of its own
+        self.assertNotEqual(first[0][0]["num"], first[1][0]["num"])
+
+
+    def test_times(self):
+        config = _config({"host": ["h1", "h2"]})
+        entries = _entries(config)
+        template = config["loggingJobs"][0]["logEntries"][0]
+        # the cells start and end at the times of their entry, worked out when the configuration was prepared
+        self.assertEqual({template["startTime"]}, {entry["startTime"] for entry in entries[:2]})
+        self.assertEqual({template["endTime"]}, {entry["endTime"] for entry in entries[:2]})
+
+
+    def test_interleave_bounded(self):
+        config = _config({"host": {"range": "0~10"}})
+        prepare_config(config, validate=True)
+        executor._config = config
+        expanded = []
+
+        def entries():
+            for entry in executor._batch_entries("loggingJobs", "logEntries"):
+                expanded.append(entry["id"])
+                yield entry
+
+        max_entries = executor.interleaveMaxEntries
+        executor.interleaveMaxEntries = 4
+        try:
+            timeline = executor._batch_timeline(entries(), interleave=True)
+            points = [next(timeline)]
+            # only the cells whose timelines are merged so far have been expanded
+            self.assertEqual(4, len(expanded))
+            points += list(timeline)
+        finally:
+            executor.interleaveMaxEntries = max_entries
+        self.assertEqual(20, len(expanded))
+        self.assertEqual(len(list(executor._batch_timeline(executor._batch_entries("loggingJobs", "logEntries"), interleave=False))), len(points))
+
+
+    def test_invalid_axes(self):
+        with self.assertRaisesRegex(ValueError, "matrix axis 'host' does not exist"):
+            _entries(_config({"host": {"dataSource": "hosts"}}))
+        with self.assertRaisesRegex(ValueError, "'list' or 'fixed'"):
+            _entries(_config({"host": {"dataSource": "num2"}}))
+        with self.assertRaisesRegex(ValueError, "has no values"):
+            _entries(_config({"host": {"range": "5~5"}}))
+        with self.assertRaisesRegex(ValueError, r"\$\.matrix"):
+            _entries(_config({"host": {"range": "1.5~3"}}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import tempfile
+import unittest
+from os import path
+
+from observability_testing_tool.config.parser import parse_config, prepare_config
+
+
+_data_sources = """
+dataSources:
+  hosts:
+    sourceType: list
+    value: ["a", "b"]
+"""
+
+_logging_jobs = """
+loggingJobs:
+  - id: first
+    frequency: "1m"
+    startOffset: "-1h"
+    textPayload: "{host}"
+    variables: [{name: host, dataSource: hosts}]
+"""
+
+_more_logging_jobs = """
+loggingJobs:
+  - id: second
+    frequency: "1m"
+    startOffset: "-1h"
+    textPayload: "{host}"
+    variables: [{name: host, dataSource: hosts}]
+"""
+
+
+class ConfigFileTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def _write(self, file_name: str, text: str) -> str:
+        file_name = path.join(self.directory.name, file_name)
+        with open(file_name, "w") as file:
+            file.write(text)
+        return file_name
+
+
+    def test_single_document(self):
+        config = parse_config(self._write("config.yaml", _data_sources + _logging_jobs))
+        self.assertEqual(["hosts"], list(config["dataSources"]))
+        self.assertEqual(["first"], [job["id"] for job in config["loggingJobs"]])
+
+
+    def test_documents(self):
+        config = parse_config(self._write("config.yaml", "\n---\n".join([_data_sources, _logging_jobs, _more_logging_jobs])))
+        # the jobs of all the documents are joined together
+        self.assertEqual(["first", "second"], [job["id"] for job in config["loggingJobs"]])
+        prepare_config(config, validate=True)
+        self.assertEqual(["log#first", "log#second"], [job["id"] for job in config["loggingJobs"]])
+
+
+    def test_json_lines(self):
+        lines = [
+            {"dataSources": {"hosts": {"sourceType": "list", "value": ["a", "b"]}}},
+            {"loggingJobs": [{"id": "first", "frequency": "1m", "startOffset": "-1h", "textPayload": "{host}", "variables": ["host"]}]},
+            {"dataSources": {"num": {"sourceType": "random", "value": "int", "range": "1~10"}}},
+            {"monitoringJobs": [{"id": "m", "frequency": "1m", "startOffset": "-1h", "metricType": "t", "metricValue": "{num}", "variables": ["num"]}]}
+        ]
+        config = parse_config(self._write("config.jsonl", "\n".join(json.dumps(line) for line in lines) + "\n"))
+        self.assertEqual(["hosts", "num"], list(config["dataSources"]))
+        self.assertEqual(1, len(config["loggingJobs"]))
+        self.assertEqual(1, len(config["monitoringJobs"]))
+
+
+    def test_empty(self):
+        self.assertIsNone(parse_config(self._write("config.yaml", "")))
+
+
+    def test_invalid_job(self):
+        config = parse_config(self._write("config.yaml", _data_sources + _logging_jobs.replace('"1m"', '"soon"')))
+        # jobs are only validated when they are prepared
+        with self.assertRaisesRegex(ValueError, r"Invalid job first in loggingJobs at \$\.frequency"):
+            prepare_config(config, validate=True)
+
+
+    def test_invalid_document(self):
+        with self.assertRaisesRegex(ValueError, "document 2"):
+            parse_config(self._write("config.yaml", _data_sources + "\n---\n- a list\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
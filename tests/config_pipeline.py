@@ -0,0 +1,85 @@
+import threading
+import unittest
+
+from observability_testing_tool.config.pipeline import buffered, run_pipeline
+
+
+class PipelineTests(unittest.TestCase):
+
+    def test_order(self):
+        self.assertEqual(list(range(1000)), list(buffered(range(1000), 10)))
+        self.assertEqual(list(range(1000)), list(buffered(range(1000), 0)))
+
+
+    def test_backpressure(self):
+        produced = []
+        def items():
+            for i in range(10000):
+                produced.append(i)
+                yield i
+
+        consumer = buffered(items(), 100)
+        next(consumer)
+        # give the producer a chance to run ahead as far as it can
+        for _ in range(20):
+            threading.Event().wait(0.01)
+        # one chunk in the queue, one being put, and one being filled
+        self.assertLessEqual(len(produced), 3 * 100 + 1)
+        consumer.close()
+
+
+    def test_error(self):
+        def items():
+            yield 1
+            raise ValueError("bad point")
+
+        with self.assertRaises(ValueError):
+            list(buffered(items(), 10))
+
+
+    def test_close_stops_producer(self):
+        closed = threading.Event()
+        def items():
+            try:
+                i = 0
+                while True:
+                    yield i
+                    i += 1
+            finally:
+                closed.set()
+
+        consumer = buffered(items(), 10)
+        self.assertEqual(0, next(consumer))
+        consumer.close()
+        self.assertTrue(closed.is_set())
+
+
+    def test_run_pipeline(self):
+        points = [(t, {"id": "e"}, {"v": t}) for t in range(500)]
+        submitted = []
+        run_pipeline(
+            iter(points),
+            lambda submit_time, entry, vars_dict: vars_dict["v"] * 2,
+            lambda submit_time, entry, rendered: submitted.append((submit_time, rendered)),
+            queue_size=50
+        )
+        self.assertEqual([(t, t * 2) for t in range(500)], submitted)
+
+
+    def test_run_pipeline_submitter_error(self):
+        def submitter(submit_time, entry, rendered):
+            if submit_time == 100:
+                raise ValueError("API error")
+
+        threads = set(threading.enumerate())
+        points = ((i, None, {}) for i in range(10000))
+        try:
+            run_pipeline(points, lambda submit_time, entry, vars_dict: submit_time, submitter, 50)
+            self.fail("the error of the submitter was not raised")
+        except ValueError:
+            # the producers blocked on their full queues are stopped, even while the traceback still holds the stages
+            self.assertEqual(threads, set(threading.enumerate()))
+            self.assertIsNone(next(points, None))
+
+if __name__ == '__main__':
+    unittest.main()
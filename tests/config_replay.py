@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from os import listdir, path
+
+from observability_testing_tool.config.common import set_batch_size, set_output
+from observability_testing_tool.config.replay import ReplayClock, read_records, replay
+from observability_testing_tool.obs import cloud_logging, cloud_monitoring
+from observability_testing_tool.obs.sinks import close_sink
+
+
+class ReplayTests(unittest.TestCase):
+
+    when = datetime(2025, 1, 1, 12, 0, 0)
+
+    def setUp(self):
+        self.source = tempfile.TemporaryDirectory()
+        self.target = tempfile.TemporaryDirectory()
+        set_batch_size(0)
+        set_output(self.source.name)
+        for i in range(5):
+            cloud_logging.submit_log_entry("INFO", f"entry {i}", when=self.when + timedelta(minutes=i), log_name="test-log")
+        cloud_monitoring.submit_gauge_metric(1.5, "test/metric", self.when, project_id="my-project")
+        close_sink()
+        set_output(self.target.name)
+
+
+    def tearDown(self):
+        close_sink()
+        set_output("")
+        self.source.cleanup()
+        self.target.cleanup()
+
+
+    def _files(self, directory: str, prefix: str = "") -> list:
+        return sorted(path.join(directory, name) for name in listdir(directory) if name.startswith(prefix))
+
+
+    def _records(self, prefix: str) -> list:
+        return [record for file_name in self._files(self.target.name, prefix) for record in read_records(file_name)]
+
+
+    def test_round_trip(self):
+        set_batch_size(2)
+        replay(self._files(self.source.name))
+        source_records = [record for file_name in self._files(self.source.name) for record in read_records(file_name)]
+        self.assertEqual(source_records, self._records("logs-") + self._records("metrics-"))
+
+
+    def test_rebase(self):
+        start = datetime.now().astimezone()
+        replay(self._files(self.source.name, "logs-"), rebase=True)
+        timestamps = [datetime.fromisoformat(record["timestamp"]) for record in self._records("logs-")]
+        self.assertLess(abs(timestamps[0] - start), timedelta(seconds=5))
+        self.assertEqual(timedelta(minutes=4), timestamps[-1] - timestamps[0])
+
+
+    def test_project(self):
+        replay(self._files(self.source.name, "metrics-"), project="other-project")
+        self.assertEqual("projects/other-project", self._records("metrics-")[0]["name"])
+
+
+class ReplayClockTests(unittest.TestCase):
+
+    def test_max_speed(self):
+        clock = ReplayClock(None)
+        self.assertEqual(0.0, clock.wait_time(0))
+        self.assertEqual(0.0, clock.wait_time(3600 * 10 ** 9))
+
+
+    def test_speed(self):
+        clock = ReplayClock(10.0)
+        clock.wait_time(0)
+        self.assertAlmostEqual(6.0, clock.wait_time(60 * 10 ** 9), places=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from os import environ, listdir, path
+
+import yaml
+
+from observability_testing_tool.config import executor, vectorized
+from observability_testing_tool.config.common import set_seed, flags
+from observability_testing_tool.config.parser import prepare_config
+
+
+def _config() -> dict:
+    return {
+        "dataSources": {
+            "num": {"sourceType": "random", "value": "int", "range": "1~1000"},
+            "hosts": {"sourceType": "list", "value": ["a", "b", "c", "d"]},
+            "load": {"sourceType": "random", "value": "float", "range": "0.5~2.5"},
+            "back": {"sourceType": "dynamic", "formula": "backoff", "base": 1.0, "factor": 2.0}
+        },
+        "loggingJobs": [{
+            "frequency": "10s~20s",
+            "startTime": "2025-01-01 10:00",
+            "endTime": "2025-01-01 11:00",
+            "startOffset": "0s~60s",
+            "level": "INFO",
+            "textPayload": "{host} {num} {load} {back}",
+            "variables": ["num", {"name": "host", "dataSource": "hosts"}, "load", "back"],
+            "logEntries": [{}, {}]
+        }]
+    }
+
+
+def _timelines(order: list = None, timeline=executor._entry_timeline) -> dict:
+    config = _config()
+    prepare_config(config)
+    executor._config = config
+    entries = list(executor._batch_entries("loggingJobs", "logEntries"))
+    timelines = {}
+    for idx in order or range(len(entries)):
+        timelines[entries[idx]["id"]] = [(submit_time, vars_dict) for submit_time, _, vars_dict in timeline(entries[idx])]
+    return timelines
+
+
+def _run_tool(config_file: str, workers: int) -> list:
+    # the records written by a run of the tool, in no particular order
+    with tempfile.TemporaryDirectory() as output:
+        subprocess.run([sys.executable, "-m", "observability_testing_tool.main", config_file, "--seed", "7", "--workers", str(workers), "--output", output], capture_output=True, check=True)
+        records = []
+        for file_name in listdir(output):
+            with open(path.join(output, file_name)) as file:
+                records += [json.loads(line) for line in file]
+    return sorted(records, key=lambda record: json.dumps(record, sort_keys=True))
+
+
+class SeedTests(unittest.TestCase):
+
+    def tearDown(self):
+        environ.pop("OBSTOOL_SEED", None)
+        flags.seed = None
+
+
+    def test_reproducible(self):
+        set_seed(42)
+        first = _timelines()
+        # entries generated in another order, as in another worker, get the same values
+        second = _timelines([1, 0])
+        self.assertEqual(first, second)
+        self.assertGreater(len(first["log#001/001"]), 100)
+        # each entry has a stream of its own
+        self.assertNotEqual(first["log#001/001"], first["log#001/002"])
+
+
+    @unittest.skipIf(not vectorized.is_available(), "numpy is not installed")
+    def test_vectorized(self):
+        set_seed(42)
+        chunk_size = vectorized.chunkSize
+        # chunks of a few points, so that draws carry over from one chunk to the next
+        vectorized.chunkSize = 7
+        try:
+            self.assertEqual(_timelines(), _timelines(timeline=vectorized.vectorized_timeline))
+        finally:
+            vectorized.chunkSize = chunk_size
+
+
+    def test_workers(self):
+        config = _config()
+        # both entries share a dynamic data source, but each has a state of its own in whichever worker it runs
+        config["loggingJobs"][0]["logEntries"] += [{}, {}]
+        with tempfile.TemporaryDirectory() as directory:
+            config_file = path.join(directory, "config.yaml")
+            with open(config_file, "w") as file:
+                yaml.safe_dump(config, file)
+            self.assertEqual(_run_tool(config_file, 1), _run_tool(config_file, 2))
+
+
+    def test_seeds(self):
+        set_seed(1)
+        first = _timelines()
+        set_seed(2)
+        self.assertNotEqual(first, _timelines())
+
+
+    def test_unseeded(self):
+        flags.seed = None
+        self.assertNotEqual(_timelines(), _timelines())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from observability_testing_tool.config.executor import format_dict_payload, format_str_payload
+from observability_testing_tool.config.templates import compile_template, compile_templates, StaticTemplate, DictTemplate
+
+
+class TemplateTests(unittest.TestCase):
+
+    vars_dict = {"host": "vm-1", "value": 42, "zone": {"name": "europe-west3-a"}}
+
+    def test_static_string(self):
+        template = compile_template("No placeholders {{here}}")
+        self.assertIsInstance(template, StaticTemplate)
+        self.assertEqual(format_str_payload(self.vars_dict, "No placeholders {{here}}"), template.render(self.vars_dict))
+
+
+    def test_string(self):
+        text = "Host {host} has value {value} in {zone[name]}"
+        self.assertEqual(format_str_payload(self.vars_dict, text), compile_template(text).render(self.vars_dict))
+
+
+    def test_dict(self):
+        payload = {
+            "message": "Value is {value}",
+            "count": 3,
+            "tags": ["{host}", "static"],
+            "static": {"a": "b", "c": {"d": 1}},
+            "nested": {"host": "{host}", "fixed": "yes"}
+        }
+        template = compile_template(payload)
+        self.assertIsInstance(template, DictTemplate)
+        self.assertEqual(format_dict_payload(self.vars_dict, payload), template.render(self.vars_dict))
+
+
+    def test_static_subtrees_shared(self):
+        template = compile_template({"message": "{host}", "static": {"a": "b"}})
+        first = template.render(self.vars_dict)
+        second = template.render({"host": "vm-2"})
+        self.assertEqual("vm-1", first["message"])
+        self.assertEqual("vm-2", second["message"])
+        self.assertIs(first["static"], second["static"])
+
+
+    def test_no_variables(self):
+        payload = {"message": "{host}"}
+        self.assertEqual(payload, compile_template(payload).render(None))
+
+
+    def test_inherited_templates(self):
+        job_templates = compile_templates({"textPayload": "{host}", "level": "INFO"}, ["textPayload", "level", "jsonPayload"])
+        entry_templates = compile_templates({"jsonPayload": {"a": "{host}"}, "textPayload": None}, ["textPayload", "level", "jsonPayload"], job_templates)
+        self.assertNotIn("textPayload", entry_templates)
+        self.assertIs(job_templates["level"], entry_templates["level"])
+        self.assertEqual({"a": "vm-1"}, entry_templates["jsonPayload"].render(self.vars_dict))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest
 
+from datetime import datetime, timedelta
+
 from observability_testing_tool.config.executor import expand_variables, format_str_payload
+from observability_testing_tool.config.variables import compile_variables, run_expanders, ConstantExpander, ExtractedExpander, RandomIntExpander
 
 
 class VariableExpandTests(unittest.TestCase):
@@ -108,5 +111,76 @@ class VariableExpandTests(unittest.TestCase):
         self.assertEqual("Value a3", result)
 
 
+class CompiledVariableTests(unittest.TestCase):
+
+    def test_constant_expanders(self):
+        data_sources = {
+            "fixedValue": {"sourceType": "fixed", "value": "abc"},
+            "hosts": {"sourceType": "list", "value": ["h1", "h2", "h3"]}
+        }
+        variables = ["fixedValue", {"name": "lastHost", "dataSource": "hosts", "selector": "last"}]
+        expanders = compile_variables(variables, data_sources)
+        self.assertTrue(all(isinstance(expander, ConstantExpander) for expander in expanders))
+        self.assertEqual({"fixedValue": "abc", "lastHost": "h3"}, run_expanders(expanders))
+
+
+    def test_random_int(self):
+        data_sources = {"num": {"sourceType": "random", "value": "int", "range": {"from": 10, "to": 20, "step": 5}}}
+        expanders = compile_variables(["num"], data_sources)
+        self.assertIsInstance(expanders[0], RandomIntExpander)
+        for _ in range(20):
+            self.assertIn(run_expanders(expanders)["num"], [10, 15])
+
+
+    def test_extractor(self):
+        data_sources = {"vmZone": {"sourceType": "fixed", "value": "projects/228638176398/zones/europe-west3-a"}}
+        expanders = compile_variables([{"name": "vmZone", "extractor": r"\/zones\/([a-z0-9\-]+)$"}], data_sources)
+        self.assertIsInstance(expanders[0], ExtractedExpander)
+        self.assertEqual("europe-west3-a", run_expanders(expanders)["vmZone"])
+
+
+    def test_dynamic_linear(self):
+        data_sources = {"lin": {"sourceType": "dynamic", "formula": "linear", "slope": 2.0, "intercept": 1.0}}
+        expanders = compile_variables(["lin"], data_sources)
+        start = datetime(2024, 10, 9, 15, 0)
+        self.assertEqual(1.0, run_expanders(expanders, start)["lin"])
+        self.assertEqual(21.0, run_expanders(expanders, start + timedelta(seconds=10))["lin"])
+
+
+    def test_dynamic_backoff_state_per_entry(self):
+        data_sources = {"backoff": {"sourceType": "dynamic", "formula": "backoff", "base": 1.0, "factor": 2.0}}
+        first = compile_variables(["backoff", {"name": "again", "dataSource": "backoff"}], data_sources, "log#001/001")
+        second = compile_variables(["backoff"], data_sources, "log#001/002")
+        # the variables of an entry share the state of the data source, other entries have a state of their own
+        self.assertEqual({"backoff": 1.0, "again": 2.0}, run_expanders(first))
+        self.assertEqual(1.0, run_expanders(second)["backoff"])
+        self.assertEqual({"backoff": 4.0, "again": 8.0}, run_expanders(first))
+
+
+    def test_dynamic_expand_variables(self):
+        data_sources = {
+            "backoff": {"sourceType": "dynamic", "formula": "backoff", "base": 1.0, "factor": 2.0},
+            "linear": {"sourceType": "dynamic", "formula": "linear", "slope": 2.0, "intercept": 5.0}
+        }
+        start_time = datetime(2025, 1, 1, 10, 0)
+        values = [expand_variables(["backoff", "linear"], data_sources, start_time + timedelta(seconds=10 * i)) for i in range(3)]
+        # the state of the data sources carries on from one call to the next
+        self.assertEqual([1.0, 2.0, 4.0], [vars_dict["backoff"] for vars_dict in values])
+        self.assertEqual([5.0, 25.0, 45.0], [vars_dict["linear"] for vars_dict in values])
+
+
+    def test_missing_data_source(self):
+        with self.assertRaises(ValueError):
+            compile_variables(["missing"], {})
+
+
+    def test_same_as_expand_variables(self):
+        data_sources = {
+            "fixedValue": {"sourceType": "fixed", "value": {"v1": "a1", "v2": "a2"}},
+        }
+        variables = [{"name": "v", "dataSource": "fixedValue", "index": "v2"}]
+        self.assertEqual(expand_variables(variables, data_sources), run_expanders(compile_variables(variables, data_sources)))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,105 @@
+import heapq
+import random
+import unittest
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+
+from observability_testing_tool.config import executor
+from observability_testing_tool.config.variables import compile_variables
+from observability_testing_tool.config.vectorized import is_available, can_vectorize, vectorized_timeline, RandomStream
+
+
+def _entry(data_sources: dict, variables: list, frequency, points: int = 25, tzinfo=None) -> dict:
+    start_time = datetime(2025, 1, 1, 12, 0, 0, tzinfo=tzinfo)
+    return {
+        "id": "test-entry",
+        "startTime": start_time,
+        "endTime": start_time + timedelta(seconds=10 * points),
+        "frequency": frequency,
+        "__expanders__": compile_variables(variables, data_sources)
+    }
+
+
+@unittest.skipIf(not is_available(), "numpy is not installed")
+class VectorizedTimelineTests(unittest.TestCase):
+
+    def test_fixed_frequency_matches_scalar(self):
+        data_sources = {"fixedValue": {"sourceType": "fixed", "value": "abc"}}
+        entry = _entry(data_sources, ["fixedValue"], timedelta(seconds=10))
+        executor._config = {"dataSources": data_sources}
+        expected = [(submit_time, vars_dict) for submit_time, _, vars_dict in executor._entry_timeline(entry)]
+        actual = [(submit_time, vars_dict) for submit_time, _, vars_dict in vectorized_timeline(entry)]
+        self.assertEqual(25, len(actual))
+        self.assertEqual(expected, actual)
+
+
+    def test_aware_start_time(self):
+        data_sources = {"fixedValue": {"sourceType": "fixed", "value": "abc"}}
+        entry = _entry(data_sources, ["fixedValue"], timedelta(seconds=10), tzinfo=timezone(timedelta(hours=2)))
+        executor._config = {"dataSources": data_sources}
+        expected = [(submit_time, vars_dict) for submit_time, _, vars_dict in executor._new_timeline(entry)]
+        actual = [(submit_time, vars_dict) for submit_time, _, vars_dict in vectorized_timeline(entry)]
+        self.assertEqual(expected, actual)
+        self.assertEqual(datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone(timedelta(hours=2))), actual[0][0])
+        self.assertEqual(entry["startTime"].tzinfo, actual[0][0].tzinfo)
+        # vectorized timelines can be merged with the timelines generated point by point
+        merged = list(heapq.merge(vectorized_timeline(entry), executor._new_timeline(entry), key=itemgetter(0)))
+        self.assertEqual(2 * len(expected), len(merged))
+
+
+    def test_random_frequency(self):
+        entry = _entry({}, [], {"from": timedelta(seconds=5), "to": timedelta(seconds=15)}, points=200)
+        submit_times = [submit_time for submit_time, _, _ in vectorized_timeline(entry)]
+        self.assertEqual(entry["startTime"], submit_times[0])
+        self.assertLess(submit_times[-1], entry["endTime"])
+        for previous, current in zip(submit_times, submit_times[1:]):
+            self.assertGreaterEqual(current - previous, timedelta(seconds=5))
+            self.assertLessEqual(current - previous, timedelta(seconds=15))
+
+
+    def test_random_int(self):
+        data_sources = {"num": {"sourceType": "random", "value": "int", "range": {"from": 10, "to": 20, "step": 5}}}
+        entry = _entry(data_sources, ["num"], timedelta(seconds=10), points=100)
+        values = {vars_dict["num"] for _, _, vars_dict in vectorized_timeline(entry)}
+        self.assertEqual({10, 15}, values)
+
+
+    def test_dynamic_formulas(self):
+        data_sources = {
+            "lin": {"sourceType": "dynamic", "formula": "linear", "slope": 2.0, "intercept": 1.0},
+            "back": {"sourceType": "dynamic", "formula": "backoff", "base": 1.0, "factor": 2.0}
+        }
+        entry = _entry(data_sources, ["lin", "back"], timedelta(seconds=10), points=5)
+        values = [vars_dict for _, _, vars_dict in vectorized_timeline(entry)]
+        self.assertEqual([1.0, 21.0, 41.0, 61.0, 81.0], [vars_dict["lin"] for vars_dict in values])
+        self.assertEqual([1.0, 2.0, 4.0, 8.0, 16.0], [vars_dict["back"] for vars_dict in values])
+        self.assertEqual(5, entry["__expanders__"][1].state["__counter__"])
+
+
+    def test_extractor(self):
+        data_sources = {"vmZone": {"sourceType": "fixed", "value": "projects/228638176398/zones/europe-west3-a"}}
+        entry = _entry(data_sources, [{"name": "vmZone", "extractor": r"\/zones\/([a-z0-9\-]+)$"}], timedelta(seconds=10), points=3)
+        self.assertEqual(["europe-west3-a"] * 3, [vars_dict["vmZone"] for _, _, vars_dict in vectorized_timeline(entry)])
+
+
+    def test_random_int_bounds(self):
+        def entry(to: int) -> dict:
+            return _entry({"num": {"sourceType": "random", "value": "int", "range": {"from": 0, "to": to}}}, ["num"], timedelta(seconds=10))
+        # numbers below 2^32 come from a single output of the Mersenne Twister, as in random.randrange()
+        self.assertTrue(can_vectorize(entry(2 ** 32 - 1)))
+        self.assertFalse(can_vectorize(entry(2 ** 32)))
+        for to in [2 ** 32 - 1, 2 ** 31 + 1]:
+            rng = random.Random(3)
+            expected = [rng.randrange(0, to) for _ in range(50)]
+            self.assertEqual(expected, RandomStream(random.Random(3)).randbelow(to, 50).tolist())
+
+
+    def test_variable_frequency_not_vectorized(self):
+        entry = _entry({}, [], "{interval}")
+        self.assertFalse(can_vectorize(entry))
+        entry = _entry({}, [], timedelta(seconds=10))
+        self.assertTrue(can_vectorize(entry))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import json
+import tempfile
+import unittest
+from os import environ, getpid, listdir, path
+from unittest.mock import patch
+
+from observability_testing_tool.config import executor
+from observability_testing_tool.config.common import set_batch_size, set_output, set_rate_limit, set_seed, set_workers, get_rate_limit, flags
+from observability_testing_tool.config.parser import prepare_config
+
+
+def _config() -> dict:
+    return {
+        "dataSources": {
+            "num": {"sourceType": "random", "value": "int", "range": "1~1000"},
+            "hosts": {"sourceType": "list", "value": ["a", "b", "c"]}
+        },
+        "loggingJobs": [{
+            "frequency": "1m~3m",
+            "startTime": "2025-01-01 10:00",
+            "endTime": "2025-01-01 11:00",
+            "level": "INFO",
+            "textPayload": "{host} {num}",
+            "variables": ["num", {"name": "host", "dataSource": "hosts"}],
+            "logEntries": [{}, {}, {}]
+        }],
+        "monitoringJobs": [{
+            "frequency": "5m",
+            "startTime": "2025-01-01 10:00",
+            "endTime": "2025-01-01 11:00",
+            "metricType": "test/metric",
+            "metricValue": "{num}",
+            "metricLabels": {"host": "{host}"},
+            "variables": ["num", {"name": "host", "dataSource": "hosts"}],
+            "metricEntries": [{}, {}, {}, {}]
+        }]
+    }
+
+
+def _records(directory: str) -> list:
+    records = []
+    for file_name in listdir(directory):
+        with open(path.join(directory, file_name)) as file:
+            records += [json.loads(line) for line in file]
+    return sorted(records, key=lambda record: json.dumps(record, sort_keys=True))
+
+
+class WorkerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        set_seed(5)
+        # points are grouped into requests, so that monitoring entries are interleaved
+        set_batch_size(10)
+        set_rate_limit("logging", 40)
+
+
+    def tearDown(self):
+        executor.wait_batch_jobs()
+        set_workers(1)
+        set_output("")
+        set_batch_size(0)
+        set_rate_limit("logging", 0)
+        environ.pop("OBSTOOL_MONITORING_RATE_LIMIT", None)
+        environ.pop("OBSTOOL_SEED", None)
+        flags.seed = None
+        self.directory.cleanup()
+
+
+    def _run(self, workers: int) -> str:
+        # runs the historical jobs of a fresh configuration, as a run of the tool would, into a directory of files
+        output = path.join(self.directory.name, f"output-{workers}")
+        set_output(output)
+        set_workers(workers)
+        config = _config()
+        prepare_config(config, validate=True)
+        executor._config = config
+        executor._share_rate_limits()
+        executor.run_logging_jobs()
+        executor.run_monitoring_jobs()
+        self.tasks = len(executor._pool_futures)
+        executor.wait_batch_jobs()
+        return output
+
+
+    def test_same_as_one_worker(self):
+        expected = _records(self._run(1))
+        self.assertEqual(4 * 12, len([record for record in expected if "metric" in record]))
+        self.assertEqual(expected, _records(self._run(2)))
+
+
+    def test_tasks(self):
+        clients = path.join(self.directory.name, "clients")
+
+        def setup_client(kind: str):
+            # runs in the worker processes, recording the process and the rate limit it was given
+            def setup():
+                with open(f"{clients}-{kind}-{getpid()}", "w") as file:
+                    file.write(str(get_rate_limit("logging")))
+            return setup
+
+        with patch.object(executor, "setup_logging_client", setup_client("logging")), patch.object(executor, "setup_monitoring_client", setup_client("monitoring")):
+            output = self._run(2)
+
+        # a task for each logging entry, and one for each worker for the interleaved monitoring entries
+        self.assertEqual(3 + 2, self.tasks)
+        # every worker set up clients of its own, with half of the rate limit
+        files = [file_name for file_name in listdir(self.directory.name) if file_name.startswith("clients-")]
+        pids = {file_name.rsplit("-", 1)[1] for file_name in files}
+        self.assertEqual(2, len(pids))
+        self.assertNotIn(str(getpid()), pids)
+        self.assertEqual({"clients-logging", "clients-monitoring"}, {file_name.rsplit("-", 1)[0] for file_name in files})
+        for file_name in files:
+            with open(path.join(self.directory.name, file_name)) as file:
+                self.assertEqual(20, float(file.read()))
+        # the entries are written by the workers, each to files of its own
+        self.assertLessEqual({file_name.split("-")[1] for file_name in listdir(output)}, pids)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from datetime import datetime
+
+from google.api_core.exceptions import ResourceExhausted
+
+from observability_testing_tool.config.common import set_batch_size, set_dry_run, set_endpoint, set_rate_limit
+from observability_testing_tool.obs import cloud_logging, cloud_monitoring
+from observability_testing_tool.obs.emulator import EmulatorServer
+from observability_testing_tool.obs.rate_limit import reset_buckets
+
+
+class EmulatorTests(unittest.TestCase):
+
+    def setUp(self):
+        # port 0 picks any free port
+        self.server = EmulatorServer(port=0)
+        self.server.start()
+        set_dry_run(False)
+        set_batch_size(0)
+        set_endpoint(f"localhost:{self.server.port}")
+        cloud_logging.setup_logging_client()
+        cloud_monitoring.setup_monitoring_client()
+
+
+    def tearDown(self):
+        self.server.stop()
+        set_endpoint("")
+        cloud_logging.loggingClient = None
+        cloud_logging.loggingProject = None
+        cloud_monitoring.monitoringClient = None
+
+
+    def test_log_entry(self):
+        cloud_logging.submit_log_entry("INFO", "hello", when=datetime.now(), log_name="test-log")
+        # the client adds its own instrumentation entry to the first request
+        self.assertEqual(1, self.server.stats["requests"])
+
+
+    def test_log_batch(self):
+        set_batch_size(10)
+        cloud_logging.begin_log_batch()
+        for i in range(25):
+            cloud_logging.submit_log_entry("INFO", {"i": i}, payloadStyle="json")
+        cloud_logging.end_log_batch()
+        self.assertEqual(3, self.server.stats["requests"])
+        self.assertEqual(25, self.server.stats["logEntries"])
+
+
+    def test_time_series(self):
+        cloud_monitoring.submit_gauge_metric(1.5, "test/metric", datetime.now(), project_id="my-project")
+        self.assertEqual(1, self.server.stats["timeSeries"])
+
+
+    def test_metric_descriptor(self):
+        for _ in range(2):
+            cloud_monitoring.submit_metric_descriptor("test/metric", "GAUGE", "DOUBLE", project_id="my-project")
+        # get (not found), create, then get (found)
+        self.assertEqual(3, self.server.stats["requests"])
+        self.assertEqual(1, len(self.server.descriptors))
+
+
+    def test_errors(self):
+        self.server.error_rate = 1.0
+        set_rate_limit("monitoring", 0)
+        reset_buckets()
+        try:
+            with self.assertRaises(ResourceExhausted):
+                cloud_monitoring.submit_gauge_metric(1.5, "test/metric", datetime.now(), project_id="my-project")
+        finally:
+            set_rate_limit("monitoring", 100)
+            reset_buckets()
+        self.assertEqual(0, self.server.stats["timeSeries"])
+        self.assertGreater(self.server.stats["errors"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
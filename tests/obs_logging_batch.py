@@ -0,0 +1,69 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from observability_testing_tool.config.common import set_batch_size, set_dry_run
+from observability_testing_tool.obs import cloud_logging
+
+
+class LogBatchTests(unittest.TestCase):
+
+    def setUp(self):
+        set_dry_run(False)
+        cloud_logging.loggingClient = MagicMock()
+        self.write_entries = cloud_logging.loggingClient.logging_api.write_entries
+
+
+    def tearDown(self):
+        cloud_logging.end_log_batch()
+        set_batch_size(0)
+        cloud_logging.batchMaxBytes = 10 * 1024 * 1024
+        cloud_logging.loggingClient = None
+
+
+    def _submit(self, count: int, message: str = "Test message"):
+        for _ in range(count):
+            cloud_logging.submit_log_entry("INFO", message, when=datetime.now(), log_name="projects/p/logs/test")
+
+
+    def test_batch_disabled(self):
+        set_batch_size(0)
+        self.assertFalse(cloud_logging.begin_log_batch())
+
+
+    def test_batch_by_count(self):
+        set_batch_size(10)
+        self.assertTrue(cloud_logging.begin_log_batch())
+        self._submit(25)
+        self.assertEqual(2, self.write_entries.call_count)
+        cloud_logging.end_log_batch()
+        self.assertEqual(3, self.write_entries.call_count)
+        sizes = [len(call.args[0]) for call in self.write_entries.call_args_list]
+        self.assertEqual([10, 10, 5], sizes)
+
+
+    def test_batch_by_size(self):
+        set_batch_size(1000)
+        cloud_logging.batchMaxBytes = 1000
+        cloud_logging.begin_log_batch()
+        self._submit(4, "x" * 400)
+        cloud_logging.end_log_batch()
+        sizes = [len(call.args[0]) for call in self.write_entries.call_args_list]
+        self.assertEqual([1, 1, 1, 1], sizes)
+
+
+    def test_batch_entries(self):
+        set_batch_size(1000)
+        cloud_logging.begin_log_batch()
+        self._submit(1)
+        cloud_logging.submit_log_entry_json("ERROR", {"key": "value"}, when=datetime.now(), log_name="projects/p/logs/test")
+        cloud_logging.end_log_batch()
+        entries = self.write_entries.call_args.args[0]
+        self.assertEqual("Test message", entries[0]["textPayload"])
+        self.assertEqual({"key": "value"}, entries[1]["jsonPayload"])
+        self.assertEqual("ERROR", entries[1]["severity"])
+        self.assertEqual("projects/p/logs/test", entries[1]["logName"])
+
+
+if __name__ == '__main__':
+    unittest.main()
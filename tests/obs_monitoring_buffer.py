@@ -0,0 +1,58 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from observability_testing_tool.config.common import set_batch_size, set_dry_run
+from observability_testing_tool.obs import cloud_monitoring
+
+
+class MetricBufferTests(unittest.TestCase):
+
+    def setUp(self):
+        set_dry_run(False)
+        set_batch_size(1000)
+        cloud_monitoring.monitoringClient = MagicMock()
+        self.create_time_series = cloud_monitoring.monitoringClient.create_time_series
+        cloud_monitoring.begin_metric_buffer()
+
+
+    def tearDown(self):
+        cloud_monitoring.end_metric_buffer()
+        set_batch_size(0)
+        cloud_monitoring.monitoringClient = None
+
+
+    def _requests(self):
+        return [call.kwargs["request"] for call in self.create_time_series.call_args_list]
+
+
+    def test_max_series(self):
+        when = datetime.now()
+        for i in range(450):
+            cloud_monitoring.submit_gauge_metric(1.0, "test", when, project_id="p", metric_labels={"host": f"h{i}"})
+        cloud_monitoring.end_metric_buffer()
+        self.assertEqual([200, 200, 50], [len(request["time_series"]) for request in self._requests()])
+
+
+    def test_same_series_not_in_same_request(self):
+        when = datetime.now()
+        for step in range(3):
+            for host in ["a", "b"]:
+                cloud_monitoring.submit_gauge_metric(1.0, "test", when + timedelta(minutes=step), project_id="p", metric_labels={"host": host})
+        cloud_monitoring.end_metric_buffer()
+        requests = self._requests()
+        self.assertEqual([2, 2, 2], [len(request["time_series"]) for request in requests])
+        for request in requests:
+            self.assertEqual({"a", "b"}, {series.metric.labels["host"] for series in request["time_series"]})
+
+
+    def test_requests_per_project(self):
+        when = datetime.now()
+        cloud_monitoring.submit_gauge_metric(1.0, "test", when, project_id="p1")
+        cloud_monitoring.submit_gauge_metric(1.0, "test", when, project_id="p2")
+        cloud_monitoring.end_metric_buffer()
+        self.assertEqual(["projects/p1", "projects/p2"], [request["name"] for request in self._requests()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from os import environ
+from time import monotonic, time
+from unittest.mock import MagicMock
+
+from google.api_core.exceptions import ResourceExhausted
+
+from observability_testing_tool.config import executor
+from observability_testing_tool.config.common import set_rate_limit, set_workers
+from observability_testing_tool.obs.rate_limit import TokenBucket, limited_call, reset_buckets, defaultRateLimits
+
+
+class TokenBucketTests(unittest.TestCase):
+
+    def test_burst_is_immediate(self):
+        bucket = TokenBucket(10, burst=5)
+        start = monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        self.assertLess(monotonic() - start, 0.05)
+
+
+    def test_rate(self):
+        bucket = TokenBucket(100, burst=1)
+        start = monotonic()
+        for _ in range(21):
+            bucket.acquire()
+        self.assertGreaterEqual(monotonic() - start, 0.19)
+
+
+    def test_slow_down(self):
+        bucket = TokenBucket(100)
+        bucket.slow_down()
+        self.assertEqual(50, bucket.rate)
+        bucket.slow_down()
+        self.assertEqual(25, bucket.rate)
+
+
+    def test_recovery(self):
+        bucket = TokenBucket(100)
+        bucket.recovery_interval = 0
+        bucket.slow_down()
+        bucket.acquire()
+        self.assertEqual(60, bucket.rate)
+
+
+class LimitedCallTests(unittest.TestCase):
+
+    def setUp(self):
+        set_rate_limit("logging", 1000)
+        reset_buckets()
+
+
+    def tearDown(self):
+        set_rate_limit("logging", 0)
+        reset_buckets()
+
+
+    def test_retry_when_exhausted(self):
+        fn = MagicMock(side_effect=[ResourceExhausted("quota"), "ok"])
+        self.assertEqual("ok", limited_call("logging", fn, 1, key="value"))
+        self.assertEqual(2, fn.call_count)
+
+
+    def test_give_up_when_exhausted(self):
+        fn = MagicMock(side_effect=ResourceExhausted("quota"))
+        with self.assertRaises(ResourceExhausted):
+            limited_call("logging", fn, max_attempts=3)
+        self.assertEqual(3, fn.call_count)
+
+
+def _send(calls: int) -> list:
+    # runs in a worker process
+    return [limited_call("logging", time) for _ in range(calls)]
+
+
+class WorkerRateLimitTests(unittest.TestCase):
+
+    def setUp(self):
+        set_rate_limit("logging", 20)
+        set_workers(2)
+        executor._config = {"loggingJobs": [], "monitoringJobs": [], "metricDescriptors": [], "hasLiveLoggingJobs": False, "hasLiveMonitoringJobs": False}
+
+
+    def tearDown(self):
+        executor.wait_batch_jobs()
+        set_workers(1)
+        set_rate_limit("logging", 0)
+        environ.pop("OBSTOOL_MONITORING_RATE_LIMIT", None)
+        reset_buckets()
+
+
+    def test_shared_by_workers(self):
+        executor._share_rate_limits()
+        self.assertEqual(10, executor._rate_limits["logging"])
+        pool = executor._get_pool()
+        futures = [pool.submit(_send, 20) for _ in range(2)]
+        times = sorted(call_time for future in futures for call_time in future.result())
+        # beyond the initial burst of each worker, the workers together send no more than 20 requests per second
+        bursts = 2 * 10
+        self.assertLessEqual((len(times) - bursts) / (times[-1] - times[0]), 20 * 1.1)
+
+
+    def test_shared_with_live(self):
+        set_workers(1)
+        executor._config["hasLiveMonitoringJobs"] = True
+        executor._share_rate_limits()
+        # the main process runs the historical jobs, and the live process the live ones
+        self.assertEqual(10, executor._rate_limits["logging"])
+        self.assertEqual(defaultRateLimits["monitoring"] / 2, executor._rate_limits["monitoring"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+from datetime import datetime
+
+from google.api_core.exceptions import InvalidArgument, ServiceUnavailable, PermissionDenied
+from google.protobuf.any_pb2 import Any
+from google.cloud.logging_v2.types import WriteLogEntriesPartialErrors
+
+from observability_testing_tool.config.common import set_batch_size, set_dry_run, set_endpoint, set_error_budget, set_rate_limit
+from observability_testing_tool.obs import cloud_logging, retry, stats
+from observability_testing_tool.obs.emulator import EmulatorServer
+from observability_testing_tool.obs.rate_limit import limited_call, reset_buckets
+
+
+def _partial_error(codes: dict) -> InvalidArgument:
+    errors = WriteLogEntriesPartialErrors.pb()()
+    for index, code in codes.items():
+        errors.log_entry_errors[index].code = code
+    detail = Any()
+    detail.Pack(errors)
+    return InvalidArgument("partial", details=[detail])
+
+
+class RetryTests(unittest.TestCase):
+
+    def setUp(self):
+        stats.reset()
+        retry.reset_failures()
+        self.base_delay = retry.baseDelay
+        # no waiting between attempts in tests
+        retry.baseDelay = 0
+
+
+    def tearDown(self):
+        retry.baseDelay = self.base_delay
+        retry.reset_failures()
+        set_error_budget(0)
+        stats.reset()
+
+
+    def test_backoff(self):
+        retry.baseDelay = 1
+        for attempt in range(1, 12):
+            delay = retry.backoff_delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(retry.maxDelay, 2 ** (attempt - 1)))
+
+
+    def test_partial_requeue(self):
+        sent = []
+        def write(entries):
+            sent.append(list(entries))
+            if len(sent) == 1:
+                # the second entry can be sent again, the fourth cannot
+                raise _partial_error({1: 14, 3: 3})
+
+        set_error_budget(1)
+        retry.write_log_entries(write, ["a", "b", "c", "d"], ["job1", "job1", "job2", "job2"])
+        self.assertEqual([["a", "b", "c", "d"], ["b"]], sent)
+        values = stats.snapshot()
+        self.assertEqual(1, values[("dropped_total", "job2")])
+        self.assertNotIn(("dropped_total", "job1"), values)
+
+
+    def test_budget(self):
+        def write(entries):
+            raise _partial_error({0: 3})
+
+        set_error_budget(1)
+        retry.write_log_entries(write, ["a"], ["job1"])
+        # the second entry lost goes over the budget
+        with self.assertRaises(InvalidArgument):
+            retry.write_log_entries(write, ["b"], ["job1"])
+        self.assertEqual(2, stats.snapshot()[("dropped_total", "job1")])
+
+
+    def test_whole_request(self):
+        def write(entries):
+            raise PermissionDenied("denied")
+
+        set_error_budget(5)
+        retry.write_time_series(write, ["s1", "s2"], ["mon1", "mon1"])
+        self.assertEqual(2, stats.snapshot()[("dropped_total", "mon1")])
+
+
+    def test_limited_call(self):
+        calls = []
+        def fn():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ServiceUnavailable("unavailable")
+            return "ok"
+
+        self.assertEqual("ok", limited_call("logging", fn))
+        self.assertEqual(2, stats.snapshot()[("retries_total", "logging")])
+
+
+class RejectTests(unittest.TestCase):
+
+    def setUp(self):
+        stats.reset()
+        retry.reset_failures()
+        self.base_delay = retry.baseDelay
+        retry.baseDelay = 0
+        self.server = EmulatorServer(port=0, reject_rate=0.5)
+        self.server.start()
+        set_dry_run(False)
+        set_endpoint(f"localhost:{self.server.port}")
+        set_rate_limit("logging", 0)
+        reset_buckets()
+        cloud_logging.setup_logging_client()
+
+
+    def tearDown(self):
+        self.server.stop()
+        set_endpoint("")
+        set_batch_size(0)
+        set_rate_limit("logging", 2000)
+        reset_buckets()
+        retry.baseDelay = self.base_delay
+        retry.reset_failures()
+        cloud_logging.loggingClient = None
+        cloud_logging.loggingProject = None
+        stats.reset()
+
+
+    def test_rejected_entries(self):
+        set_batch_size(100)
+        set_error_budget(100)
+        cloud_logging.begin_log_batch()
+        for i in range(100):
+            cloud_logging.submit_log_entry("INFO", {"i": i}, when=datetime.now(), payloadStyle="json", job_id="log#001/001")
+        cloud_logging.end_log_batch()
+        dropped = stats.snapshot().get(("dropped_total", "log#001/001"), 0)
+        # rejected entries are sent again until they are written or run out of attempts
+        self.assertEqual(100, self.server.stats["logEntries"] + dropped)
+        self.assertGreater(self.server.stats["rejected"], 0)
+        self.assertLess(dropped, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
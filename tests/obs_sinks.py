@@ -0,0 +1,122 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from os import listdir, path
+
+from observability_testing_tool.config.common import set_batch_size, set_dry_run, set_output, set_output_format, set_output_rotate_size
+from observability_testing_tool.obs import cloud_logging, cloud_monitoring
+from observability_testing_tool.obs.sinks import FileSink, NullSink, get_sink, close_sink
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class FileSinkTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        set_output(self.directory.name)
+        set_output_format("ndjson")
+        set_output_rotate_size(0)
+        set_batch_size(0)
+
+
+    def tearDown(self):
+        close_sink()
+        set_output("")
+        self.directory.cleanup()
+
+
+    def _files(self, prefix: str) -> list:
+        return sorted(path.join(self.directory.name, name) for name in listdir(self.directory.name) if name.startswith(prefix))
+
+
+    def _records(self, prefix: str) -> list:
+        records = []
+        for file_name in self._files(prefix):
+            with open(file_name) as file:
+                records += [json.loads(line) for line in file]
+        return records
+
+
+    def test_logs(self):
+        when = datetime(2025, 1, 1, 12, 0, 0)
+        cloud_logging.submit_log_entry("INFO", "hello", when=when, labels={"a": "b"}, log_name="test-log")
+        cloud_logging.submit_log_entry("ERROR", {"msg": "hi"}, when=when, payloadStyle="json")
+        close_sink()
+        records = self._records("logs-")
+        self.assertEqual(2, len(records))
+        self.assertEqual("hello", records[0]["textPayload"])
+        self.assertEqual("test-log", records[0]["logName"])
+        self.assertEqual({"a": "b"}, records[0]["labels"])
+        self.assertEqual({"msg": "hi"}, records[1]["jsonPayload"])
+        self.assertEqual("ERROR", records[1]["severity"])
+
+
+    def test_log_batch(self):
+        set_batch_size(10)
+        cloud_logging.begin_log_batch()
+        for i in range(25):
+            cloud_logging.submit_log_entry("INFO", f"entry {i}")
+        cloud_logging.end_log_batch()
+        close_sink()
+        self.assertEqual([f"entry {i}" for i in range(25)], [record["textPayload"] for record in self._records("logs-")])
+
+
+    def test_metrics(self):
+        when = datetime(2025, 1, 1, 12, 0, 0)
+        cloud_monitoring.submit_gauge_metric(3.5, "test/metric", when, project_id="my-project", metric_labels={"host": "h1"})
+        close_sink()
+        records = self._records("metrics-")
+        self.assertEqual(1, len(records))
+        self.assertEqual("projects/my-project", records[0]["name"])
+        self.assertEqual("custom.googleapis.com/test/metric", records[0]["metric"]["type"])
+        self.assertEqual({"host": "h1"}, records[0]["metric"]["labels"])
+        self.assertEqual(3.5, records[0]["points"][0]["value"]["doubleValue"])
+
+
+    def test_rotation(self):
+        sink = FileSink(self.directory.name, "ndjson", rotate_size=1000)
+        for i in range(100):
+            sink.write_log_entries([{"textPayload": f"entry {i}"}])
+        sink.close()
+        files = self._files("logs-")
+        self.assertGreater(len(files), 1)
+        for file_name in files[:-1]:
+            self.assertLess(path.getsize(file_name), 1100)
+        self.assertEqual(100, len(self._records("logs-")))
+
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow.parquet
+        sink = FileSink(self.directory.name, "parquet")
+        sink.write_log_entries([{"textPayload": f"entry {i}", "severity": "INFO"} for i in range(10)])
+        sink.close()
+        table = pyarrow.parquet.read_table(self._files("logs-")[0])
+        self.assertEqual(10, table.num_rows)
+        self.assertEqual(["INFO"] * 10, table.column("severity").to_pylist())
+        self.assertEqual({"textPayload": "entry 3", "severity": "INFO"}, json.loads(table.column("record")[3].as_py()))
+
+
+class SinkSelectionTests(unittest.TestCase):
+
+    def tearDown(self):
+        set_dry_run(False)
+
+
+    def test_dry_run(self):
+        set_dry_run(True)
+        self.assertIsInstance(get_sink(), NullSink)
+
+
+    def test_no_sink(self):
+        set_dry_run(False)
+        self.assertIsNone(get_sink())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from multiprocessing import Process
+from urllib.request import urlopen
+
+from google.api_core.exceptions import ResourceExhausted
+
+from observability_testing_tool.config.common import set_rate_limit
+from observability_testing_tool.obs import stats
+from observability_testing_tool.obs.rate_limit import limited_call, reset_buckets
+
+
+def _child(queue):
+    stats.reset()
+    stats.count("entries_total", "log#001/001", 5)
+    stats.report(queue)
+
+
+class StatsTests(unittest.TestCase):
+
+    def setUp(self):
+        stats.reset()
+
+
+    def tearDown(self):
+        stats.reset()
+        stats.stop_server()
+
+
+    def test_histogram(self):
+        for value in [0.00005, 0.0003, 0.0003, 20.0]:
+            stats.observe("request_seconds", "logging", value)
+        histogram = stats.snapshot()[("request_seconds", "logging")]
+        self.assertEqual(4, histogram[-1])
+        self.assertAlmostEqual(20.00065, histogram[-2])
+        self.assertEqual(1, histogram[0])
+        self.assertEqual(2, histogram[2])
+        # over the largest bucket
+        self.assertEqual(1, histogram[len(stats.timeBuckets)])
+        self.assertEqual(0.0005, stats.quantile(histogram, stats.timeBuckets, 0.5))
+
+
+    def test_merge(self):
+        stats.count("entries_total", "log#001/001", 2)
+        stats.observe("batch_size", "logging", 10)
+        merged = stats.merge(stats.snapshot(), stats.snapshot())
+        self.assertEqual(4, merged[("entries_total", "log#001/001")])
+        self.assertEqual(20, merged[("batch_size", "logging")][-2])
+        self.assertEqual(2, merged[("batch_size", "logging")][-1])
+
+
+    def test_child_process(self):
+        stats.count("entries_total", "log#001/001", 1)
+        process = Process(target=_child, args=(stats.stats_queue(),))
+        process.start()
+        process.join()
+        stats.finish_collecting()
+        self.assertEqual(6, stats.collected()[("entries_total", "log#001/001")])
+
+
+    def test_limited_call(self):
+        calls = []
+        def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ResourceExhausted("quota")
+            return "ok"
+
+        set_rate_limit("logging", 1000)
+        reset_buckets()
+        try:
+            self.assertEqual("ok", limited_call("logging", fn))
+        finally:
+            set_rate_limit("logging", 2000)
+            reset_buckets()
+        values = stats.snapshot()
+        self.assertEqual(2, values[("requests_total", "logging")])
+        self.assertEqual(1, values[("request_errors_total", "logging")])
+        self.assertEqual(1, values[("retries_total", "logging")])
+        self.assertEqual(2, values[("request_seconds", "logging")][-1])
+
+
+    def test_prometheus(self):
+        stats.count("entries_total", 'mon#"a"/001')
+        stats.observe("batch_size", "monitoring", 3)
+        port = stats.start_server(0)
+        with urlopen(f"http://localhost:{port}/metrics") as response:
+            text = response.read().decode()
+        self.assertIn('obstool_entries_total{job_id="mon#\\"a\\"/001"} 1', text)
+        self.assertIn('obstool_batch_size_bucket{api="monitoring",le="2"} 0', text)
+        self.assertIn('obstool_batch_size_bucket{api="monitoring",le="5"} 1', text)
+        self.assertIn('obstool_batch_size_bucket{api="monitoring",le="+Inf"} 1', text)
+        self.assertIn('obstool_batch_size_count{api="monitoring"} 1', text)
+
+
+    def test_summary(self):
+        stats.count("entries_total", "log#001/001", 3)
+        stats.observe("render_seconds", "log#001/001", 0.002)
+        stats.observe("batch_size", "logging", 3)
+        lines = stats.summary(stats.snapshot())
+        self.assertEqual(2, len(lines))
+        self.assertTrue(lines[0].startswith("log#001/001: 3 entries, generate -, render 2.000ms"))
+        self.assertTrue(lines[1].startswith("logging: 1 writes of 3.0 on average, 0 API requests"))
+
+
+if __name__ == '__main__':
+    unittest.main()